@@ -0,0 +1,70 @@
+import contextvars
+import threading
+
+from django.db import transaction
+
+from .models import ActivityEvent
+
+_current_request = contextvars.ContextVar('activity_request', default=None)
+_pending = threading.local()
+
+
+def get_current_actor():
+    """
+    Get the authenticated user of the request being handled, if any.
+
+    DRF authenticates inside the view and then sets the user on the Django
+    request, so it is read here, when an event is recorded.
+    """
+    request = _current_request.get()
+    user = getattr(request, 'user', None) if request is not None else None
+    return user if user is not None and user.is_authenticated else None
+
+
+class ActivityBatch:
+    """
+    Events recorded at one savepoint level of a transaction, inserted together on commit.
+    """
+
+    def __init__(self, savepoints):
+        self.savepoints = savepoints
+        self.events = []
+
+    def __call__(self):
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        ActivityEvent.objects.bulk_create(self.events)
+
+
+def record_activity(organization_id, verb, project_id=None, **data):
+    """
+    Append an event to an organization's activity log once the current transaction commits.
+
+    Events recorded in the same transaction (and savepoint) are written with
+    one INSERT after the commit, and are dropped with it on a rollback.
+    Outside a transaction the event is written at once.
+
+    Args:
+        organization_id (int): The organization whose log gets the event.
+        verb (str): One of the ActivityEvent verbs.
+        project_id (int, optional): The project the event is about.
+        **data: Verb-specific details, stored as JSON.
+    """
+    event = ActivityEvent(
+        organization_id=organization_id, verb=verb, actor=get_current_actor(), project_id=project_id, data=data
+    )
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        event.save()
+        return
+
+    # Batches are tied to a savepoint level, so a savepoint rollback discards its events with its commit hook
+    savepoints = (connection.alias, tuple(connection.savepoint_ids))
+    batch = getattr(_pending, 'batch', None)
+    if (
+        batch is None or batch.savepoints != savepoints
+        or not any(callback is batch for _, callback in connection.run_on_commit)
+    ):
+        batch = _pending.batch = ActivityBatch(savepoints)
+        transaction.on_commit(batch)
+    batch.events.append(event)
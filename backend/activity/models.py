@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class ActivityEvent(models.Model):
+    """
+    One entry of an organization's append-only activity log.
+
+    Rows are only ever inserted (see activity.log). The references are kept
+    without database constraints, so deleting a project or a user neither
+    fails nor rewrites history; the ids stay in the log.
+    """
+    PROJECT_STATUS_CHANGED = 'project.status_changed'
+    PROJECT_REASSIGNED = 'project.reassigned'
+    MEMBER_ADDED = 'member.added'
+    MEMBER_ROLE_CHANGED = 'member.role_changed'
+    MEMBER_REMOVED = 'member.removed'
+    VERB_CHOICES = [
+        (PROJECT_STATUS_CHANGED, 'Project status changed'),
+        (PROJECT_REASSIGNED, 'Project reassigned'),
+        (MEMBER_ADDED, 'Member added'),
+        (MEMBER_ROLE_CHANGED, 'Member role changed'),
+        (MEMBER_REMOVED, 'Member removed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(
+        'organizations.Organization', related_name='activity', on_delete=models.CASCADE, db_constraint=False
+    )
+    verb = models.CharField(max_length=40, choices=VERB_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False,
+        blank=True, null=True,
+    )
+    project = models.ForeignKey(
+        'projects.Project', related_name='+', on_delete=models.DO_NOTHING, db_constraint=False,
+        blank=True, null=True,
+    )
+    # Verb-specific details, e.g. {'from': 'in_progress', 'to': 'done'}
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Backs the keyset-paginated feed of an organization on (created_at, id)
+            models.Index(fields=['organization', 'created_at', 'id'], name='activity_org_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Activity events are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.verb} in organization {self.organization_id} at {self.created_at}"
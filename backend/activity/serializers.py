@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from users.serializers import UserDetailSerializer
+from .models import ActivityEvent
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    actor = UserDetailSerializer(read_only=True)
+
+    class Meta:
+        model = ActivityEvent
+        fields = ('id', 'verb', 'actor', 'project', 'data', 'created_at')
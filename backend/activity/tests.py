@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from organizations.models import Membership, Organization
+from projects.models import Project
+from .log import record_activity
+from .models import ActivityEvent
+
+User = get_user_model()
+
+
+class ActivityTestMixin:
+    """
+    An organization with an admin (its creator) and a member.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Membership.objects.create(user=self.member, organization=self.organization, role='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def record(self, count=1, **data):
+        for index in range(count):
+            record_activity(self.organization.pk, ActivityEvent.MEMBER_ADDED, user=index, **data)
+
+
+class RecordActivityTests(ActivityTestMixin, TestCase):
+
+    def test_events_of_a_transaction_are_inserted_together_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.record(3)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(ActivityEvent.objects.exists())
+
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(ActivityEvent.objects.count(), 3)
+
+    def test_each_savepoint_gets_its_own_batch(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.record(2, level='outer')
+                with transaction.atomic():
+                    self.record(2, level='inner')
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(
+            sorted(ActivityEvent.objects.values_list('data__level', flat=True)),
+            ['inner', 'inner', 'outer', 'outer'],
+        )
+
+    def test_events_are_discarded_with_a_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.record(level='kept')
+                try:
+                    with transaction.atomic():
+                        self.record(level='discarded')
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.record(level='recorded after the rollback')
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(
+            sorted(ActivityEvent.objects.values_list('data__level', flat=True)),
+            ['kept', 'recorded after the rollback'],
+        )
+
+    def test_events_are_discarded_with_a_rolled_back_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.record(2)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(ActivityEvent.objects.exists())
+
+    def test_events_outside_a_request_have_no_actor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.record()
+        self.assertIsNone(ActivityEvent.objects.get().actor)
+
+    def test_the_request_user_is_the_actor(self):
+        project = Project.objects.create(
+            name='Website', organization=self.organization, created_by=self.admin, assigned_to=self.admin
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/project/reassign/', {
+                'organization': self.organization.pk, 'from_user': self.admin.pk, 'to_user': self.member.pk,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        event = ActivityEvent.objects.get(verb=ActivityEvent.PROJECT_REASSIGNED)
+        self.assertEqual(event.actor, self.admin)
+        self.assertEqual(event.project_id, project.pk)
+        self.assertEqual(event.data, {'from': self.admin.pk, 'to': self.member.pk})
+
+
+class OrganizationActivityViewTests(ActivityTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"/activity/{self.organization.pk}/"
+        now = timezone.now()
+        self.events = [
+            ActivityEvent.objects.create(
+                organization=self.organization, verb=ActivityEvent.MEMBER_ADDED, actor=self.admin,
+                data={'user': index}, created_at=now - timedelta(minutes=index % 3),
+            )
+            for index in range(7)
+        ]
+
+    def follow(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(event['id'] for event in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_event_once_newest_first(self):
+        expected = [event.pk for event in sorted(self.events, key=lambda event: (event.created_at, event.pk), reverse=True)]
+        self.assertEqual(self.follow(f"{self.url}?page_size=3"), expected)
+
+    def test_pages_take_the_same_queries_once_the_permissions_are_cached(self):
+        first = self.client.get(self.url, {'page_size': 2})
+        # The organization, the membership and the page
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'page_size': 2})
+        with self.assertNumQueries(3):
+            self.client.get(first.data['next'])
+
+    def test_feed_can_be_narrowed_by_verb_and_project(self):
+        project = Project.objects.create(name='Website', organization=self.organization, created_by=self.admin)
+        removed = ActivityEvent.objects.create(
+            organization=self.organization, verb=ActivityEvent.MEMBER_REMOVED, project=project
+        )
+        response = self.client.get(self.url, {'verb': ActivityEvent.MEMBER_REMOVED})
+        self.assertEqual([event['id'] for event in response.data['results']], [removed.pk])
+        response = self.client.get(self.url, {'project': project.pk})
+        self.assertEqual([event['id'] for event in response.data['results']], [removed.pk])
+
+    def test_members_can_read_the_feed(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_other_users_cannot_read_the_feed(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import OrganizationActivityView
+
+urlpatterns = [
+    path("<int:organization_id>/", OrganizationActivityView.as_view(), name="organization_activity"),
+]
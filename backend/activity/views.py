@@ -0,0 +1,30 @@
+from rest_framework import generics, permissions
+
+from core.context import get_request_context
+from core.pagination import KeysetCursorPagination
+from core.permissions import CanViewOrganizationPermission
+from .models import ActivityEvent
+from .serializers import ActivityEventSerializer
+
+
+class OrganizationActivityView(generics.ListAPIView):
+    """
+    View to list an organization's activity log, newest first, one cursor-paginated page at a time.
+
+    Pages seek on the (organization, created_at, id) index, so they cost the
+    same however long the log grows. `?project=` and `?verb=` narrow the feed.
+    """
+    serializer_class = ActivityEventSerializer
+    permission_classes = [permissions.IsAuthenticated, CanViewOrganizationPermission]
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        organization = get_request_context(self.request).get_organization(self.kwargs.get('organization_id'))
+        queryset = ActivityEvent.objects.filter(organization=organization).select_related('actor')
+        project_id = self.request.query_params.get('project')
+        if project_id and project_id.isdigit():
+            queryset = queryset.filter(project_id=project_id)
+        verb = self.request.query_params.get('verb')
+        if verb:
+            queryset = queryset.filter(verb=verb)
+        return queryset
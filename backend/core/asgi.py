@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# Serve the async variants of the read views (see core.async_views)
+os.environ.setdefault("DJANGO_SERVER_INTERFACE", "asgi")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; serves the organization event streams (see core.streams)
+from core.streams import EventStreamRouter  # noqa: E402
+
+application = EventStreamRouter(django_application)
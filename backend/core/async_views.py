@@ -0,0 +1,86 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_database_executor = None
+
+
+def get_database_executor():
+    """
+    Get the thread pool that runs the ORM work of async views.
+
+    Its size (ASYNC_DATABASE_THREADS) bounds the number of database connections
+    a single ASGI process opens, so keep it below the database's connection limit.
+    """
+    global _database_executor
+    if _database_executor is None:
+        _database_executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DATABASE_THREADS, thread_name_prefix='async-db'
+        )
+    return _database_executor
+
+
+def database_sync_to_async(func):
+    """
+    Turn a sync function doing ORM work into a coroutine function run on the database thread pool.
+
+    Unlike Django's default `sync_to_async(thread_sensitive=True)`, which runs
+    every call in one shared thread, calls run in parallel on separate threads,
+    each with its own connection. Stale connections are closed before and after
+    each call, as Django does around every request.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=get_database_executor())
+
+
+def async_api_view(view_class, **initkwargs):
+    """
+    Wrap a DRF class-based view in an async view.
+
+    Django 3.2 has no async ORM and DRF views are sync, so the whole view
+    (authentication, permission checks, queries and rendering) runs on the
+    database thread pool while the event loop keeps serving other requests.
+    A slow query then holds one pool thread instead of a whole worker process.
+    """
+    sync_view = view_class.as_view(**initkwargs)
+
+    def handle(request, *args, **kwargs):
+        response = sync_view(request, *args, **kwargs)
+        # Render in the worker thread as well; serializers may still hit the database lazily
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+
+    run_view = database_sync_to_async(handle)
+
+    async def view(request, *args, **kwargs):
+        return await run_view(request, *args, **kwargs)
+
+    # Keep what DRF's as_view() exposes, for CSRF exemption and schema generation
+    view.cls = sync_view.cls
+    view.initkwargs = sync_view.initkwargs
+    view.csrf_exempt = True
+    return view
+
+
+def as_view(view_class, **initkwargs):
+    """
+    Get the URL callable of a DRF view for the server interface in use.
+
+    Under ASGI (SERVER_INTERFACE == 'asgi') the view is wrapped with
+    async_api_view; under WSGI the plain sync view is returned, as running an
+    async view there would only add an event loop per request.
+    """
+    if settings.SERVER_INTERFACE == 'asgi':
+        return async_api_view(view_class, **initkwargs)
+    return view_class.as_view(**initkwargs)
@@ -0,0 +1,91 @@
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+
+from organizations.models import Membership, Organization
+from projects.models import Comment, Project
+
+User = get_user_model()
+
+
+@dataclass
+class Dataset:
+    """
+    Handles to the rows created by generate_dataset that the benchmarks hit.
+    """
+    owner: User
+    organization: Organization
+    organizations: list = field(default_factory=list)
+    members: list = field(default_factory=list)
+    outsiders: list = field(default_factory=list)
+    projects: list = field(default_factory=list)
+
+    def token_for(self, user):
+        return Token.objects.get_or_create(user=user)[0].key
+
+
+def generate_dataset(organizations, members, projects, comments, prefix='bench'):
+    """
+    Create a synthetic tenant through the ORM so every signal (groups,
+    guardian permissions, search documents, outbox) runs as in production.
+
+    Args:
+        organizations (int): N organizations, all created by the same owner.
+        members (int): M member users, each a member of every organization,
+            plus M outsiders who belong to none.
+        projects (int): K projects per organization, assigned round-robin to the members.
+        comments (int): C comments per project.
+
+    Returns:
+        Dataset: The created rows; `organization` is the first organization.
+    """
+    # The owner is staff so the monitoring endpoints can be benchmarked too
+    owner = User.objects.create_user(
+        username=f"{prefix}-owner", email=f"{prefix}-owner@example.com", password='benchmark-password',
+        is_staff=True,
+    )
+    member_users = [
+        User.objects.create_user(
+            username=f"{prefix}-member-{index}",
+            email=f"{prefix}-member-{index}@example.com",
+            password='benchmark-password',
+            first_name='Member',
+            last_name=str(index),
+        )
+        for index in range(members)
+    ]
+    outsiders = [
+        User.objects.create_user(
+            username=f"{prefix}-outsider-{index}",
+            email=f"{prefix}-outsider-{index}@example.com",
+            password='benchmark-password',
+        )
+        for index in range(members)
+    ]
+
+    dataset = Dataset(owner=owner, organization=None, members=member_users, outsiders=outsiders)
+    for org_index in range(organizations):
+        organization = Organization.objects.create(
+            name=f"{prefix} organization {org_index}", description='Synthetic benchmark tenant', created_by=owner
+        )
+        for user in member_users:
+            Membership.objects.create(user=user, organization=organization, role=settings.USER_ROLES['MEMBER'])
+
+        for project_index in range(projects):
+            assignee = member_users[project_index % len(member_users)] if member_users else None
+            project = Project.objects.create(
+                name=f"Project {org_index}-{project_index}",
+                description=f"Synthetic project {project_index} of organization {org_index}",
+                organization=organization,
+                assigned_to=assignee,
+                created_by=owner,
+            )
+            for comment_index in range(comments):
+                Comment.objects.create(project=project, user=assignee or owner, content=f"Comment {comment_index}")
+            dataset.projects.append(project)
+        dataset.organizations.append(organization)
+
+    dataset.organization = dataset.organizations[0]
+    return dataset
@@ -0,0 +1,203 @@
+"""
+Query-count and latency regression benchmarks for every API endpoint.
+
+Each endpoint is exercised through the DRF test client against a small and a
+large synthetic dataset. A test fails when an endpoint's query count grows
+with the dataset (an N+1) or exceeds its budget in budgets.json. Endpoints the
+test client cannot exercise are listed under "excluded" there, with the reason.
+
+Run with `python manage.py test core.benchmarks` (after `makemigrations`, as
+docker-entrypoint.sh does). Set BENCHMARK_REPORT to a
+path to write the measurements as JSON, and BENCHMARK_UPDATE_BUDGETS=1 to
+rewrite budgets.json from the large-scale run.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.utils import get_anonymous_user_id
+from .data import generate_dataset
+
+BUDGETS_PATH = Path(__file__).resolve().parent / 'budgets.json'
+# budgets.json key mapping the endpoints left out of the scenario to the reason
+EXCLUDED_KEY = 'excluded'
+
+# (organizations, members, projects per organization, comments per project)
+SMALL_SCALE = (2, 3, 4, 1)
+LARGE_SCALE = (5, 8, 12, 3)
+
+
+# A request body sent as is instead of being encoded as JSON
+RawBody = namedtuple('RawBody', ['content_type', 'data'])
+
+
+def get_scenario(dataset):
+    """
+    Build the ordered list of requests to measure.
+
+    Read endpoints come first and destructive ones last so every request sees
+    the dataset in the same state at each scale.
+
+    Returns:
+        list: (name, user, method, path, payload) tuples.
+    """
+    owner = dataset.owner
+    member = dataset.members[0]
+    organization = dataset.organization
+    project = dataset.projects[0]
+    other_project = dataset.projects[1]
+    outsider = dataset.outsiders[0]
+    # Rotates and then revokes its token, so it makes no request after these
+    token_holder = dataset.members[-1]
+    return [
+        ('auth.me', owner, 'get', '/auth/me/', None),
+        ('organization.list', member, 'get', '/organization/', None),
+        ('organization.detail', owner, 'get', f'/organization/{organization.id}/', None),
+        ('organization.detail.not_modified', owner, 'get', f'/organization/{organization.id}/', None),
+        ('organization.users', owner, 'get', f'/organization/{organization.id}/users/', None),
+        ('organization.users.cached', member, 'get', f'/organization/{organization.id}/users/', None),
+        ('organization.non_members', owner, 'get', f'/organization/{organization.id}/non-members/', None),
+        ('project.list', owner, 'get', f'/project/?organization_id={organization.id}', None),
+        ('project.list.member', member, 'get', f'/project/?organization_id={organization.id}', None),
+        ('project.list.sparse', owner, 'get', f'/project/?organization_id={organization.id}&fields=id,name,status,priority', None),
+        ('project.search', owner, 'get', f'/project/?organization_id={organization.id}&search=synthetic', None),
+        ('project.comments', owner, 'get', f'/project/{project.id}/comments/', None),
+        ('project.comments.member', project.assigned_to, 'get', f'/project/{project.id}/comments/', None),
+        ('project.stats', member, 'get', f'/project/stats/{organization.id}/', None),
+        ('project.export', owner, 'get', f'/project/export/{organization.id}.csv', None),
+        ('project.detail', owner, 'get', f'/project/{project.id}/{organization.id}/', None),
+        ('project.changes', owner, 'get', f'/project/changes/{organization.id}/?since=0', None),
+        ('activity.feed', member, 'get', f'/activity/{organization.id}/', None),
+        ('project.detail.not_modified', owner, 'get', f'/project/{project.id}/{organization.id}/', None),
+        ('notifications.outbox_metrics', owner, 'get', '/notifications/outbox/metrics/', None),
+        ('metrics.database_pool', owner, 'get', '/metrics/database/', None),
+        ('schema', owner, 'get', '/?format=openapi', None),
+        ('auth.register', None, 'post', '/auth/register', {
+            'username': 'bench-new', 'email': 'bench-new@example.com', 'password': 'benchmark-password',
+            'first_name': 'New', 'last_name': 'User',
+        }),
+        ('auth.login', None, 'post', '/auth/login', {'username': owner.username, 'password': 'benchmark-password'}),
+        ('organization.create', owner, 'post', '/organization/', {'name': 'bench created organization'}),
+        ('organization.add_member', owner, 'post', '/organization/add_member', {
+            'emails': [user.email for user in dataset.outsiders] + ['bench-invitee@example.com'],
+            'organization': organization.id,
+        }),
+        ('project.create', owner, 'post', '/project/', {
+            'name': 'bench created project', 'organization': organization.id, 'assigned_to': member.id,
+        }),
+        ('project.import', owner, 'post', f'/project/import/{organization.id}/', RawBody('application/x-ndjson', ''.join(
+            f'{{"name": "bench imported project {index}", "assigned_to": {member.id}}}\n' for index in range(3)
+        ).encode())),
+        ('project.update', owner, 'patch', f'/project/{project.id}/{organization.id}/', {
+            'organization': organization.id, 'assigned_to': dataset.members[-1].id,
+        }),
+        ('project.update_status', owner, 'patch', f'/project/{project.id}/update-status/', {
+            'status': 'done', 'organization': organization.id,
+        }),
+        ('project.add_comment', owner, 'post', f'/project/{project.id}/add-comment/', {
+            'project': project.id, 'content': 'Benchmark comment',
+        }),
+        ('project.reassign', owner, 'post', '/project/reassign/', {
+            'organization': organization.id, 'from_user': dataset.members[1].id, 'to_user': member.id,
+        }),
+        ('project.delete', owner, 'delete', f'/project/{other_project.id}/{organization.id}/', None),
+        ('organization.remove_member', owner, 'post', '/organization/remove-member', {
+            'user': outsider.id, 'organization': organization.id,
+        }),
+        ('organization.leave', member, 'post', '/organization/leave-organization', {
+            'organization_id': organization.id,
+        }),
+        ('auth.token_rotate', token_holder, 'post', '/auth/token/rotate', None),
+        ('auth.logout', token_holder, 'post', '/auth/logout', None),
+    ]
+
+
+class EndpointBenchmarkTests(TestCase):
+    """
+    Compare per-endpoint query counts across dataset sizes and against the budgets.
+    """
+
+    def measure(self, scale):
+        """
+        Run the scenario against a fresh dataset of the given scale and roll it back.
+
+        Returns:
+            dict: name -> {'status', 'queries', 'time_ms', 'bytes'}.
+        """
+        results = {}
+        with transaction.atomic():
+            for alias in ('default', 'permissions', 'members', 'tokens'):
+                caches[alias].clear()
+            # Measure with warm content types and process-level lookups, as in a long-running process
+            ContentType.objects.clear_cache()
+            ContentType.objects.get_for_models(*apps.get_models())
+            get_anonymous_user_id()
+            dataset = generate_dataset(*scale)
+            etags = {}
+            for name, user, method, path, payload in get_scenario(dataset):
+                client = APIClient()
+                if user is not None:
+                    client.credentials(HTTP_AUTHORIZATION=f"Bearer {dataset.token_for(user)}")
+                headers = {}
+                if name.endswith('.not_modified'):
+                    # Revalidate the representation fetched by the previous request to the path
+                    headers['HTTP_IF_NONE_MATCH'] = etags[path]
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    if isinstance(payload, RawBody):
+                        response = client.generic(method.upper(), path, payload.data, payload.content_type, **headers)
+                    else:
+                        response = getattr(client, method)(path, payload, format='json', **headers)
+                    # Streamed responses run their queries while they are read
+                    content = b''.join(response.streaming_content) if response.streaming else response.content
+                    elapsed = time.perf_counter() - started
+                if response.has_header('ETag'):
+                    etags[path] = response['ETag']
+                results[name] = {
+                    'status': response.status_code,
+                    'queries': len(queries),
+                    'time_ms': round(elapsed * 1000, 2),
+                    'bytes': len(content),
+                }
+            transaction.set_rollback(True)
+        return results
+
+    def test_query_counts_do_not_scale_and_stay_within_budget(self):
+        small = self.measure(SMALL_SCALE)
+        large = self.measure(LARGE_SCALE)
+
+        report_path = os.getenv('BENCHMARK_REPORT')
+        if report_path:
+            Path(report_path).write_text(json.dumps({'small': small, 'large': large}, indent=2))
+        budgets = json.loads(BUDGETS_PATH.read_text())
+        excluded = budgets.pop(EXCLUDED_KEY, {})
+        if os.getenv('BENCHMARK_UPDATE_BUDGETS'):
+            budgets = {name: result['queries'] for name, result in large.items()}
+            BUDGETS_PATH.write_text(json.dumps(
+                {**budgets, EXCLUDED_KEY: excluded}, indent=2, sort_keys=True
+            ) + '\n')
+
+        for name, result in large.items():
+            with self.subTest(endpoint=name):
+                self.assertLess(result['status'], 400, f"{name} failed with status {result['status']}")
+                self.assertNotIn(name, excluded, f"{name} is measured but listed as excluded")
+                self.assertEqual(
+                    result['queries'], small[name]['queries'],
+                    f"{name} ran {small[name]['queries']} queries on the small dataset "
+                    f"but {result['queries']} on the large one",
+                )
+                self.assertIn(name, budgets, f"{name} has no query budget in {BUDGETS_PATH.name}")
+                self.assertLessEqual(
+                    result['queries'], budgets[name],
+                    f"{name} ran {result['queries']} queries, over its budget of {budgets[name]}",
+                )
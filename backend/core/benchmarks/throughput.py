@@ -0,0 +1,102 @@
+"""
+Throughput benchmark comparing running servers, e.g. the WSGI (gunicorn) and
+ASGI (uvicorn) services from docker-compose.yml.
+
+Each target gets the same read requests from a pool of concurrent clients;
+the report shows requests per second and latency percentiles per target:
+
+    python -m core.benchmarks.throughput \\
+        --target wsgi=http://localhost:8000 --target asgi=http://localhost:8001 \\
+        --token <auth token> --path '/project/?organization_id=1' --path /organization/1/ \\
+        --concurrency 64 --requests 2000
+
+Only the standard library is used, so it can run from any machine that
+reaches the servers.
+"""
+import argparse
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+
+def fetch(url, token, timeout):
+    """
+    GET `url` and return (status, seconds); status is None on connection errors.
+    """
+    request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'} if token else {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def run_target(base_url, paths, token, concurrency, requests, timeout):
+    """
+    Send `requests` GETs cycling through `paths`, `concurrency` at a time.
+
+    Returns:
+        dict: requests per second, latency percentiles in ms and the error count.
+    """
+    urls = cycle([base_url.rstrip('/') + path for path in paths])
+    jobs = [next(urls) for _ in range(requests)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda url: fetch(url, token, timeout), jobs))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(duration * 1000 for _, duration in results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'rps': requests / elapsed,
+        'p50': quantiles[49],
+        'p95': quantiles[94],
+        'p99': quantiles[98],
+        'errors': sum(1 for status, _ in results if status is None or status >= 400),
+    }
+
+
+def parse_target(value):
+    name, separator, url = value.partition('=')
+    if not separator or not url:
+        raise argparse.ArgumentTypeError("Targets look like name=http://host:port")
+    return name, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the read throughput of running API servers.")
+    parser.add_argument('--target', action='append', type=parse_target, required=True,
+                        help="name=base URL of a server to measure; repeat to compare several.")
+    parser.add_argument('--path', action='append', required=True,
+                        help="Path requested on every target; repeat to mix several endpoints.")
+    parser.add_argument('--token', default='', help="Auth token sent as 'Authorization: Bearer <token>'.")
+    parser.add_argument('--concurrency', type=int, default=64, help="Requests in flight at once.")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests sent to each target.")
+    parser.add_argument('--warmup', type=int, default=50, help="Unmeasured requests sent first to each target.")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds.")
+    args = parser.parse_args(argv)
+
+    print(f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, url in args.target:
+        if args.warmup:
+            run_target(url, args.path, args.token, args.concurrency, args.warmup, args.timeout)
+        result = run_target(url, args.path, args.token, args.concurrency, args.requests, args.timeout)
+        print(
+            f"{name:<12}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}"
+            f"{result['p99']:>10.1f}{result['errors']:>8}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
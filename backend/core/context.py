@@ -0,0 +1,98 @@
+from django.conf import settings
+
+from .utils import get_permission_resolver
+
+
+class RequestContext:
+    """
+    Per-request cache of the rows the permission classes, views and serializers
+    all need: organizations, the caller's memberships and target projects.
+
+    Each row is loaded at most once per request, so a permission check followed
+    by the view and the serializer touching the same objects runs no duplicate
+    queries.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._organizations = {}
+        self._memberships = {}
+        self._projects = {}
+
+    @property
+    def user(self):
+        return self.request.user
+
+    def get_organization(self, organization_id):
+        """
+        Get an organization by id, or None if it does not exist.
+        """
+        from organizations.models import Organization
+
+        try:
+            organization_id = int(organization_id)
+        except (TypeError, ValueError):
+            return None
+        if organization_id not in self._organizations:
+            self._organizations[organization_id] = Organization.objects.filter(id=organization_id).first()
+        return self._organizations[organization_id]
+
+    def get_membership(self, organization, user=None):
+        """
+        Get the membership of `user` (the caller by default) in the organization, or None.
+        """
+        from organizations.models import Membership
+
+        user = user or self.user
+        if not user.is_authenticated:
+            return None
+        key = (organization.pk, user.pk)
+        if key not in self._memberships:
+            membership = Membership.objects.filter(user=user, organization=organization).first()
+            self._memberships[key] = membership
+            if user == self.user:
+                # Share the caller's role with the permission resolver so it does not look it up again
+                get_permission_resolver(self.request).set_role(organization.pk, membership.role if membership else None)
+        return self._memberships[key]
+
+    def is_member(self, organization, user=None):
+        return self.get_membership(organization, user) is not None
+
+    def is_admin(self, organization, user=None):
+        membership = self.get_membership(organization, user)
+        return membership is not None and membership.role == settings.USER_ROLES['ADMIN']
+
+    def get_project(self, project_id):
+        """
+        Get a project by id with its organization and assignee joined, or None.
+        """
+        from projects.models import Project
+
+        try:
+            project_id = int(project_id)
+        except (TypeError, ValueError):
+            return None
+        if project_id not in self._projects:
+            project = Project.objects.select_related('organization', 'assigned_to').filter(id=project_id).first()
+            if project is not None:
+                self._organizations.setdefault(project.organization_id, project.organization)
+            self._projects[project_id] = project
+        return self._projects[project_id]
+
+    def get_project_permissions(self, project):
+        """
+        Get the caller's permissions on the project, as 'projects.codename'.
+        """
+        self.get_membership(project.organization)
+        return get_permission_resolver(self.request).get_permissions(project)
+
+
+def get_request_context(request):
+    """
+    Get the RequestContext attached to the request, creating it on first use.
+    """
+    context = getattr(request, '_request_context', None)
+    if context is None:
+        context = RequestContext(request)
+        request._request_context = context
+    return context
@@ -0,0 +1,81 @@
+"""
+PostgreSQL backend reusing connections from a per-process pool (core.db.pool).
+
+Django opens and closes connections as usual, but closing returns the
+connection to the pool and opening takes one from it, so requests skip the
+TCP/TLS handshake and authentication. Configure it with a 'POOL' dict in the
+DATABASES entry (see core/settings.py) and keep CONN_MAX_AGE at 0, so every
+request hands its connection back when it finishes.
+"""
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import PoolTimeout, get_connection_pool
+
+Database = base.Database
+
+
+def check_connection(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+    except Database.Error:
+        return False
+
+
+def reset_connection(connection):
+    """
+    Roll back anything left open on a returned connection; False if it is unusable.
+    """
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            connection.rollback()
+        except Database.Error:
+            return False
+    return True
+
+
+def close_connection(connection):
+    try:
+        connection.close()
+    except Database.Error:
+        pass
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self):
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'])
+        return get_connection_pool(
+            key,
+            check=check_connection,
+            reset=reset_connection,
+            close=close_connection,
+            **{option.lower(): value for option, value in settings_dict.get('POOL', {}).items()},
+        )
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection, created = self.get_pool().checkout(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as error:
+            raise Database.OperationalError(str(error)) from error
+        if not created:
+            # What Django's get_new_connection() sets for a fresh connection
+            self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().checkin(self.connection)
@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection became free within the pool's checkout timeout.
+    """
+
+
+class PooledConnection:
+    """
+    A raw DB-API connection with the bookkeeping the pool needs.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of raw database connections for one worker process.
+
+    Checkouts reuse the most recently returned idle connection, opening a new
+    one while fewer than `max_size` exist, and otherwise wait up to `timeout`
+    seconds for one to come back. Connections older than `max_lifetime` are
+    replaced, idle ones above `min_size` are closed after `max_idle` seconds,
+    and a connection idle for longer than `health_check_after` seconds is
+    checked with `check` before it is handed out.
+
+    Args:
+        check (callable): check(connection) -> bool, True if the connection works.
+        reset (callable): reset(connection) -> bool, called on checkin to clear
+            any transaction state; False if the connection must be discarded.
+        close (callable): close(connection), closing a connection quietly.
+    """
+
+    def __init__(self, check, reset, close, min_size=0, max_size=4, timeout=10.0,
+                 max_lifetime=1800.0, max_idle=300.0, health_check_after=30.0):
+        self.check = check
+        self.reset = reset
+        self.close = close
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.pid = os.getpid()
+
+        self._lock = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'reconnects': 0,
+            'health_check_failures': 0,
+            'expired': 0,
+        }
+
+    def checkout(self, connect):
+        """
+        Get a connection, opening it with `connect()` if none can be reused.
+
+        Returns:
+            tuple: (connection, created), `created` being True for a new connection.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        stale = []
+        with self._lock:
+            while True:
+                pooled = self._pop_idle(stale)
+                if pooled is not None or self._size < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection became free within {self.timeout}s.")
+                waited = True
+                self._lock.wait(remaining)
+            if pooled is None:
+                # Reserve the slot before connecting outside the lock
+                self._size += 1
+            wait_ms = (time.monotonic() - started) * 1000
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_ms_total'] += wait_ms
+                self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], wait_ms)
+        self._close_all(stale)
+
+        if pooled is not None and time.monotonic() - pooled.last_used > self.health_check_after:
+            if not self.check(pooled.connection):
+                self.close(pooled.connection)
+                with self._lock:
+                    self._stats['health_check_failures'] += 1
+                    self._stats['connections_closed'] += 1
+                    self._stats['reconnects'] += 1
+                # Keep the slot and open a replacement below
+                pooled = None
+
+        created = pooled is None
+        if created:
+            try:
+                pooled = PooledConnection(connect())
+            except BaseException:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._stats['connections_opened'] += 1
+
+        with self._lock:
+            self._in_use[id(pooled.connection)] = pooled
+        return pooled.connection, created
+
+    def checkin(self, connection):
+        """
+        Return a connection to the pool, discarding it if it is broken or too old.
+        """
+        with self._lock:
+            pooled = self._in_use.pop(id(connection), None)
+        if pooled is None:
+            # Not ours (e.g. opened before a fork); just close it
+            self.close(connection)
+            return
+
+        usable = self.reset(connection)
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            if not usable or now - pooled.created_at > self.max_lifetime:
+                if usable:
+                    self._stats['expired'] += 1
+                stale.append(pooled)
+                self._size -= 1
+            else:
+                pooled.last_used = now
+                self._idle.append(pooled)
+                self._prune_idle(now, stale)
+            self._lock.notify()
+        self._close_all(stale)
+
+    def stats(self):
+        """
+        Get the pool's counters and current sizes.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'pid': self.pid,
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            })
+        stats['wait_ms_total'] = round(stats['wait_ms_total'], 3)
+        stats['wait_ms_max'] = round(stats['wait_ms_max'], 3)
+        return stats
+
+    def _pop_idle(self, stale):
+        now = time.monotonic()
+        while self._idle:
+            pooled = self._idle.pop()
+            if now - pooled.created_at <= self.max_lifetime:
+                return pooled
+            self._stats['expired'] += 1
+            self._stats['reconnects'] += 1
+            self._size -= 1
+            stale.append(pooled)
+        return None
+
+    def _prune_idle(self, now, stale):
+        # The oldest returned connections sit at the left end
+        while len(self._idle) > self.min_size and now - self._idle[0].last_used > self.max_idle:
+            stale.append(self._idle.popleft())
+            self._size -= 1
+
+    def _close_all(self, stale):
+        for pooled in stale:
+            self.close(pooled.connection)
+        if stale:
+            with self._lock:
+                self._stats['connections_closed'] += len(stale)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(key, **options):
+    """
+    Get the process-wide pool registered under `key`, creating it on first use.
+
+    Pools are per process: a pool inherited through fork() is dropped without
+    closing its connections, which still belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def get_pool_stats():
+    """
+    Get the stats of every pool of this process, keyed by database alias.
+    """
+    with _pools_lock:
+        pools = [(key, pool) for key, pool in _pools.items() if pool.pid == os.getpid()]
+    return {key[0]: pool.stats() for key, pool in pools}
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the version stamps a representation depends on.
+    """
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """
+    Check the request's If-None-Match header against `etag` (weak comparison, as RFC 7232 requires).
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(candidate) for candidate in etags}
+
+
+def _opaque_tag(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class ConditionalRetrieveMixin:
+    """
+    Serve GETs of a retrieve view conditionally.
+
+    The view's `get_etag(instance)` builds the ETag from cheap version stamps.
+    When it matches the request's If-None-Match, the view answers 304 Not
+    Modified without serializing, which is where the heavy queries run.
+    """
+
+    def get_etag(self, instance):
+        raise NotImplementedError('ConditionalRetrieveMixin views must define get_etag()')
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(instance)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={'ETag': etag})
@@ -0,0 +1,193 @@
+"""
+Change events pushed to the clients of an organization (see core.streams).
+
+Signal handlers and bulk paths call publish_event(); once the transaction
+commits, the event goes to the configured broker, which hands it to every
+subscriber of the organization. Events only name what changed (type and
+ids), so clients fetch the changes through the regular, permission-checked
+endpoints.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Largest NOTIFY payload PostgreSQL accepts is 8000 bytes; bulk events are split below it
+MAX_NOTIFY_PAYLOAD = 7500
+
+
+class Subscription:
+    """
+    The queue of events of one subscriber, fed from any thread and read in its event loop.
+
+    The queue is bounded (EVENT_SUBSCRIBER_QUEUE_SIZE); a subscriber that falls
+    that far behind is marked as overflowed and should resynchronize.
+    """
+
+    def __init__(self, loop, organization_id):
+        self.loop = loop
+        self.organization_id = organization_id
+        self.queue = asyncio.Queue(maxsize=settings.EVENT_SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop is closed
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Deliver events to the subscribers of the current process only.
+
+    Enough when one process both handles the writes and serves the streams;
+    with several processes or nodes use a broker that crosses them, such as
+    PostgresBroker.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, organization_id, event):
+        self.deliver(organization_id, event)
+
+    def deliver(self, organization_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(organization_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    async def start(self):
+        pass
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, organization_id):
+        await self.start()
+        subscription = Subscription(asyncio.get_running_loop(), organization_id)
+        with self._lock:
+            self._subscriptions[organization_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions[organization_id]
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[organization_id]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fan events out across processes and nodes with PostgreSQL LISTEN/NOTIFY.
+
+    Events are sent with pg_notify() on the default connection. Each process
+    serving streams keeps one extra connection LISTENing on `channel`,
+    read from the event loop, and delivers what arrives to its own subscribers.
+    """
+    channel = 'organization_events'
+
+    def __init__(self):
+        if connections['default'].vendor != 'postgresql':
+            raise ImproperlyConfigured("EVENT_BROKER 'postgres' needs a PostgreSQL default database.")
+        super().__init__()
+        self._listener = None
+        self._start_lock = None
+
+    def publish(self, organization_id, event):
+        payload = json.dumps({'organization': organization_id, 'event': event})
+        if len(payload) > MAX_NOTIFY_PAYLOAD and len(event.get('ids', ())) > 1:
+            # Too large for one notification; split the ids in two
+            ids = event['ids']
+            middle = len(ids) // 2
+            self.publish(organization_id, {**event, 'ids': ids[:middle]})
+            self.publish(organization_id, {**event, 'ids': ids[middle:]})
+            return
+        with connections['default'].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._listener is None:
+                self._listener = await asyncio.get_running_loop().run_in_executor(None, self._listen)
+                asyncio.get_running_loop().add_reader(self._listener.fileno(), self._read_notifications)
+
+    def _listen(self):
+        import psycopg2
+
+        listener = psycopg2.connect(**connections['default'].get_connection_params())
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return listener
+
+    def _read_notifications(self):
+        try:
+            self._listener.poll()
+        except Exception:
+            logger.exception("Lost the event listener connection; reconnecting on the next subscription.")
+            asyncio.get_running_loop().remove_reader(self._listener.fileno())
+            self._listener = None
+            return
+        while self._listener.notifies:
+            notification = self._listener.notifies.pop(0)
+            message = json.loads(notification.payload)
+            self.deliver(message['organization'], message['event'])
+
+
+_broker = None
+
+
+def get_event_broker():
+    """
+    Get the process-wide broker of the class named by EVENT_BROKER.
+    """
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+def publish_event(organization_id, event_type, **data):
+    """
+    Send a change event to the organization's subscribers once the current transaction commits.
+
+    Args:
+        organization_id (int): The organization whose subscribers get the event.
+        event_type (str): What happened, e.g. 'project.updated'.
+        **data: What it happened to, e.g. ids=[...]; must be JSON serializable.
+    """
+    event = {'type': event_type, 'organization': organization_id, **data}
+
+    def send():
+        try:
+            get_event_broker().publish(organization_id, event)
+        except Exception:
+            # Live updates are best effort; the change itself is committed
+            logger.exception("Could not publish the %s event of organization %s.", event_type, organization_id)
+
+    transaction.on_commit(send)
@@ -0,0 +1,85 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_list(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for the `?fields=` / `?expand=` query protocol of GET requests.
+
+    `?fields=` names the fields to return; the primary key is always
+    returned. The fields in Meta.expandable_fields (nested objects, computed
+    permissions) are costly and only returned when named in `?fields=` or
+    `?expand=`. Without `?fields=`, every field is returned.
+
+    Views pass the requested fields to get_only_fields() to load only the
+    columns they need. Meta.field_sources names the model fields read by the
+    fields that are computed in Python.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """
+        Get the names of the fields a request asked for, or None for all of them.
+
+        Raises:
+            ValidationError: A requested field does not exist.
+        """
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        query_params = getattr(request, 'query_params', request.GET)
+        if FIELDS_PARAM not in query_params:
+            return None
+
+        requested = parse_field_list(query_params[FIELDS_PARAM])
+        expanded = parse_field_list(query_params.get(EXPAND_PARAM, ''))
+        expandable = set(getattr(cls.Meta, 'expandable_fields', ()))
+        errors = {}
+        unknown = requested - set(cls._get_declared_fields())
+        if unknown:
+            errors[FIELDS_PARAM] = f"Unknown field(s): {', '.join(sorted(unknown))}."
+        if expanded - expandable:
+            errors[EXPAND_PARAM] = (
+                f"Cannot expand {', '.join(sorted(expanded - expandable))}; "
+                f"expandable fields: {', '.join(sorted(expandable)) or 'none'}."
+            )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return requested | expanded | {cls.Meta.model._meta.pk.name}
+
+    @classmethod
+    def get_only_fields(cls, field_names):
+        """
+        Get the model fields backing the given serializer fields, for QuerySet.only().
+        """
+        model = cls.Meta.model
+        model_fields = {field.name for field in model._meta.concrete_fields}
+        sources = getattr(cls.Meta, 'field_sources', {})
+        declared = cls._get_declared_fields()
+        only = {model._meta.pk.name}
+        for name in field_names:
+            if name in sources:
+                only.update(sources[name])
+                continue
+            source = declared[name].source or name
+            if source.split('.')[0] in model_fields:
+                only.add(source.split('.')[0])
+        return sorted(only)
+
+    @classmethod
+    def _get_declared_fields(cls):
+        # Built without a request, so nothing is left out
+        return cls().fields
@@ -0,0 +1,176 @@
+import asyncio
+import contextvars
+import heapq
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_LENGTH = 500
+
+
+class QueryRecorder:
+    """
+    `execute_wrapper` hook counting a request's queries and their total time.
+
+    Only the slowest statements are kept (in a bounded heap) unless the request
+    was picked for a full trace, so the per-query cost stays small.
+    """
+
+    def __init__(self, keep_trace=False, slowest=None):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+        self.trace = [] if keep_trace else None
+        self.max_slowest = settings.SLOWEST_QUERIES_LOGGED if slowest is None else slowest
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            entry = (duration, self.count, sql)
+            if len(self.slowest) < self.max_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+            if self.trace is not None:
+                self.trace.append(entry)
+
+    def format_queries(self, entries):
+        return [
+            {'index': index, 'ms': round(duration * 1000, 3), 'sql': sql[:MAX_SQL_LENGTH]}
+            for duration, index, sql in entries
+        ]
+
+
+_active_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+def record_active_query(execute, sql, params, many, context):
+    """
+    `execute_wrapper` hook handing a query to the recorder of the request being handled, if any.
+
+    It is installed once on every connection, so the queries of a request are
+    recorded whichever thread runs them: the WSGI worker, the thread Django
+    runs sync views and middleware on under ASGI, or the database threads of
+    async views (see core.async_views). The recorder follows the request
+    there through a context variable, which sync_to_async carries over.
+    """
+    recorder = _active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recording(connection):
+    if record_active_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_active_query)
+
+
+@receiver(connection_created)
+def install_query_recording_on_connect(sender, connection, **kwargs):
+    """
+    Record the queries of every connection opened from now on, in any thread.
+    """
+    install_query_recording(connection)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the query count, total database time and slowest statements of every
+    request. They are logged as structured data on the 'core.instrumentation'
+    logger and returned in a `Server-Timing` header. Requests slower than
+    SLOW_REQUEST_THRESHOLD_MS that were sampled (SLOW_REQUEST_TRACE_SAMPLE_RATE)
+    also log their full query trace.
+
+    Works in both sync (WSGI) and async (ASGI) middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        # This thread's connections may have been opened before the middleware was loaded
+        for connection in connections.all():
+            install_query_recording(connection)
+        recorder = self.start_recording()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _active_recorder.set(None)
+        return self.finish_recording(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = self.start_recording()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_recorder.set(None)
+        return self.finish_recording(request, response, recorder, started)
+
+    def start_recording(self):
+        recorder = QueryRecorder(keep_trace=random.random() < settings.SLOW_REQUEST_TRACE_SAMPLE_RATE)
+        _active_recorder.set(recorder)
+        return recorder
+
+    def finish_recording(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries", app;dur={total_ms - db_ms:.2f}, total;dur={total_ms:.2f}'
+        )
+
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'queries': recorder.count,
+            'slowest_queries': recorder.format_queries(sorted(recorder.slowest, reverse=True)),
+        }
+        if total_ms >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            if recorder.trace is not None:
+                metrics['trace'] = recorder.format_queries(recorder.trace)
+            logger.warning("slow request", extra={'metrics': metrics})
+        else:
+            logger.info("request", extra={'metrics': metrics})
+        return response
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, merging in their `metrics` extra.
+    """
+
+    def format(self, record):
+        payload = {
+            'level': record.levelname,
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'metrics', {}))
+        return json.dumps(payload, default=str)
@@ -0,0 +1,168 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the full ordering key instead of using offsets.
+
+    The ordering must end with a unique column (e.g. ('-created_at', '-id')) so
+    every row has a distinct position. Each page is fetched with a
+    `WHERE (created_at, id) < (...)` style filter, so with a matching index deep
+    pages cost the same as the first one.
+
+    Views can order by other keys, including annotations, by defining
+    `get_pagination_ordering()`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = getattr(settings, 'DEFAULT_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 200)
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        self.cursor_given = position is not None
+
+        ordering = self.get_ordering(view, reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        # Fetch one extra row to know whether there is a page after this one
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor_given
+        return self.page
+
+    def get_page_size(self, request):
+        """
+        Get the page size requested by the client, capped at `max_page_size`.
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view=None, reverse=False):
+        ordering = self.ordering
+        if view is not None and hasattr(view, 'get_pagination_ordering'):
+            ordering = tuple(view.get_pagination_ordering())
+        if not reverse:
+            return ordering
+        return tuple(field[1:] if field.startswith('-') else f"-{field}" for field in ordering)
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Build the filter selecting every row that sorts strictly after `position`.
+
+        The OR expansion alone does not bound the first ordering column, so a
+        range condition on it is added: it lets the database start the index
+        scan at the cursor instead of filtering from the first row.
+        """
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f"{name}__{lookup}": position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                condition &= Q(**{previous_field.lstrip('-'): value})
+            keyset_filter |= condition
+        first = ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & keyset_filter
+
+    def decode_cursor(self, request, model):
+        """
+        Decode the cursor query parameter into a (position, reverse) pair.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.to_python(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, model, name, value):
+        try:
+            return model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            # Annotations such as search ranks are stored as plain JSON values
+            return value
+
+    def encode_cursor(self, obj, reverse=False):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = {'p': values}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Paging back past the first row lands on an empty page; restart from the top
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
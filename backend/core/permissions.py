@@ -1,10 +1,7 @@
 from rest_framework.permissions import BasePermission,SAFE_METHODS
 from rest_framework.exceptions import PermissionDenied
-from organizations.models import Organization,Membership
-from projects.models import Project
-from django.shortcuts import get_object_or_404
-from django.conf import settings
-from guardian.shortcuts import get_perms
+from django.http import Http404
+from .context import get_request_context
 from .utils import get_user_all_permissions
 
 import logging
@@ -34,20 +31,14 @@ class IsOrganizationAdmin(BasePermission):
             raise PermissionDenied("Organization ID is required.")
 
         # Validate if the organization exists
-        try:
-            organization = Organization.objects.get(id=organization_id)
-        except Organization.DoesNotExist:
+        context = get_request_context(request)
+        organization = context.get_organization(organization_id)
+        if organization is None:
             logger.warning(f"Organization with ID {organization_id} does not exist.")
             raise PermissionDenied("The specified organization does not exist.")
 
         # Check if the current user is an admin of the organization
-        admin_role = settings.USER_ROLES['ADMIN']
-        is_admin = Membership.objects.filter(
-            user=request.user, 
-            organization=organization, 
-            role=admin_role
-        ).exists()
-        if not is_admin:
+        if not context.is_admin(organization):
             logger.warning(f"User {request.user} is not an admin of organization {organization.name}.")
             raise PermissionDenied("You are not authorized to add members to this organization.")
 
@@ -99,33 +90,46 @@ class CanAddProjectPermission(BasePermission):
 
     def check_permission(self, request, permission_codename, view=None,obj=None):
         
-        organization = self.get_organization(request.data.get('organization') or (view.kwargs.get('organization_id') if view is not None else "") ) 
-        if not self.is_user_member_of_organization(request.user, organization):
+        organization = self.get_organization(request, self.get_organization_id(request, view))
+        if not self.is_user_member_of_organization(request, organization):
             logger.warning(f"User {request.user} is not a member of organization {organization.name}.")
             raise PermissionDenied("You must be a member of the organization.")
 
         user_permissions = get_user_all_permissions(request.user, organization,obj)
 
         if permission_codename in user_permissions:
-            print("it in isdee hhere")
             logger.info(f"User {request.user} has '{permission_codename}' permission in organization {organization.name}.")
             return True
 
         logger.warning(f"User {request.user} does not have '{permission_codename}' permission.")
         raise PermissionDenied(f"You do not have permission to perform this action in the organization.")
 
-    def get_organization(self, organization_id):
-        from organizations.models import Organization
+    def get_organization_id(self, request, view=None):
+        return request.data.get('organization') or (view.kwargs.get('organization_id') if view is not None else "")
+
+    def get_organization(self, request, organization_id):
         if not organization_id:
             raise PermissionDenied("Organization ID is required.")
-        try:
-            return Organization.objects.get(id=organization_id)
-        except Organization.DoesNotExist:
+        organization = get_request_context(request).get_organization(organization_id)
+        if organization is None:
             raise PermissionDenied("Organization does not exist.")
+        return organization
 
-    def is_user_member_of_organization(self, user, organization):
-        from organizations.models import Membership
-        return Membership.objects.filter(user=user, organization=organization).exists()
+    def is_user_member_of_organization(self, request, organization):
+        return get_request_context(request).is_member(organization)
+
+
+class CanImportProjectsPermission(CanAddProjectPermission):
+    """
+    Custom permission to check the 'add_project' permission in the organization of the URL.
+    The request body is not read, as bulk imports stream it.
+    """
+
+    def has_permission(self, request, view):
+        return self.check_permission(request, 'organizations.add_project', view=view)
+
+    def get_organization_id(self, request, view=None):
+        return view.kwargs.get('organization_id')
 
 
 class CanAddUserPermission(CanAddProjectPermission):
@@ -174,13 +178,11 @@ class CanUpdateProjectPermission(CanAddProjectPermission):
     """
 
     def has_permission(self, request, view):
-        print("thisis  is mad and not great")
         return True
        
     
     def has_object_permission(self, request, view, obj):
         # Use `check_permission` with the actual object in retrieve views
-        print("this is where we are")
         return self.check_permission(request, 'projects.change_project', view=view, obj=[obj])
 
 
@@ -199,13 +201,13 @@ class CanUpdateProjectStatusPermission(BasePermission):
             raise PermissionDenied("Project ID is required to add a comment.")
 
         # Fetch the project instance
-        try:
-            project = get_object_or_404(Project, id=project_id)
-        except Project.DoesNotExist:
+        context = get_request_context(request)
+        project = context.get_project(project_id)
+        if project is None:
             logger.error(f"Project with ID {project_id} does not exist. Request by user {request.user}.")
-            raise PermissionDenied("The specified project does not exist.")
-        user_permissions = get_perms(request.user, project)
-        has_permission = 'update_project_status' in user_permissions
+            raise Http404("The specified project does not exist.")
+        user_permissions = context.get_project_permissions(project)
+        has_permission = 'projects.update_project_status' in user_permissions
         if not has_permission:
             logger.warning(f"User {request.user} does not have 'update_project_status' permission for project {project}.")
     
@@ -229,17 +231,38 @@ class CanCommentOnProjectPermission(BasePermission):
             raise PermissionDenied("Project ID is required to add a comment.")
 
         # Fetch the project instance
-        try:
-            project = get_object_or_404(Project, id=project_id)
-        except Project.DoesNotExist:
+        context = get_request_context(request)
+        project = context.get_project(project_id)
+        if project is None:
             logger.error(f"Project with ID {project_id} does not exist. Request by user {request.user}.")
-            raise PermissionDenied("The specified project does not exist.")
+            raise Http404("The specified project does not exist.")
 
         # Check if the user has the 'can_comment' permission for the project
-        if 'can_comment' in get_perms(request.user, project):
+        if 'projects.can_comment' in context.get_project_permissions(project):
             logger.info(f"User {request.user} has 'can_comment' permission for project {project_id}.")
             return True
 
         # Log the permission failure for debugging
         logger.warning(f"User {request.user} does not have 'can_comment' permission for project {project_id}.")
-        raise PermissionDenied("You do not have permission to comment on this project.")
\ No newline at end of file
+        raise PermissionDenied("You do not have permission to comment on this project.")
+
+
+class CanViewProjectPermission(BasePermission):
+    """
+    Custom permission to check if the user has the 'view_project' permission
+    for the project in the URL.
+    """
+
+    def has_permission(self, request, view):
+        project_id = view.kwargs.get('project_id')
+        context = get_request_context(request)
+        project = context.get_project(project_id)
+        if project is None:
+            logger.error(f"Project with ID {project_id} does not exist. Request by user {request.user}.")
+            raise Http404("The specified project does not exist.")
+
+        if 'projects.view_project' in context.get_project_permissions(project):
+            return True
+
+        logger.warning(f"User {request.user} does not have 'view_project' permission for project {project_id}.")
+        raise PermissionDenied("You do not have permission to view this project.")
@@ -53,9 +53,12 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "projects.apps.ProjectsConfig",
     "organizations.apps.OrganizationsConfig",
+    "notifications.apps.NotificationsConfig",
+    "activity.apps.ActivityConfig",
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.QueryInstrumentationMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -63,10 +66,22 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "activity.middleware.ActivityActorMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# "asgi" when served through core.asgi (e.g. by uvicorn), which sets it before loading the settings
+SERVER_INTERFACE = os.getenv('DJANGO_SERVER_INTERFACE', 'wsgi')
+
+if SERVER_INTERFACE == 'asgi':
+    # WhiteNoise is sync-only: in an async chain Django 3.2 runs it, and everything below
+    # it, on one shared thread, which serializes requests. Static files stay on the WSGI service.
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
+# Threads running the ORM work of async views (core.async_views); each holds its own connection
+ASYNC_DATABASE_THREADS = int(os.getenv('ASYNC_DATABASE_THREADS', 32))
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
@@ -94,6 +109,61 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory backend evicts least recently used entries once MAX_ENTRIES
+# is reached. Point 'permissions' at a shared backend (e.g. Redis) when running
+# several workers so signal-driven invalidation reaches all of them; TIMEOUT
+# bounds how long a worker can serve a set invalidated elsewhere.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "permissions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "permissions",
+        "TIMEOUT": int(os.getenv('PERMISSION_CACHE_TIMEOUT', 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv('PERMISSION_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Serialized organization member lists (see organizations.members). Entries are
+# keyed by the organization's revision, so a shared backend never serves a stale
+# list; pick it with MEMBER_CACHE_BACKEND. The Redis backend needs the optional
+# django-redis package and is bounded by the server's maxmemory and eviction policy.
+MEMBER_CACHE_BACKENDS = {
+    'locmem': ("django.core.cache.backends.locmem.LocMemCache", "members"),
+    'file': ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache" / "members")),
+    'redis': ("django_redis.cache.RedisCache", "redis://localhost:6379/1"),
+}
+MEMBER_CACHE_BACKEND = os.getenv('MEMBER_CACHE_BACKEND', 'locmem')
+_member_cache_class, _member_cache_location = MEMBER_CACHE_BACKENDS[MEMBER_CACHE_BACKEND]
+CACHES["members"] = {
+    "BACKEND": _member_cache_class,
+    "LOCATION": os.getenv('MEMBER_CACHE_LOCATION', _member_cache_location),
+    "TIMEOUT": int(os.getenv('MEMBER_CACHE_TIMEOUT', 3600)),
+    "OPTIONS": {} if MEMBER_CACHE_BACKEND == 'redis' else {
+        "MAX_ENTRIES": int(os.getenv('MEMBER_CACHE_MAX_ENTRIES', 5000)),
+    },
+}
+
+# Users of authenticated tokens, without keys or password hashes (see
+# users.authentication). Deleting or rotating a token and saving its user drop
+# the entry; with several workers on the local-memory backend, TIMEOUT bounds
+# how long another worker still accepts it.
+CACHES["tokens"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "tokens",
+    "TIMEOUT": int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+    "OPTIONS": {
+        "MAX_ENTRIES": int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000)),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -141,6 +211,15 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Page size used by the keyset cursor paginator; clients may ask for up to MAX_PAGE_SIZE
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 200))
+
+# Bulk project import/export (see projects.transfer)
+PROJECT_IMPORT_BATCH_SIZE = int(os.getenv('PROJECT_IMPORT_BATCH_SIZE', 1000))  # rows per INSERT
+PROJECT_IMPORT_MAX_ERRORS = int(os.getenv('PROJECT_IMPORT_MAX_ERRORS', 100))  # invalid rows reported before giving up
+PROJECT_EXPORT_CHUNK_SIZE = int(os.getenv('PROJECT_EXPORT_CHUNK_SIZE', 2000))  # rows fetched per round trip
+
 
 # AUTHENTICATION_BACKENDS
 AUTHENTICATION_BACKENDS = [
@@ -149,6 +228,10 @@ AUTHENTICATION_BACKENDS = [
     'guardian.backends.ObjectPermissionBackend',
 ]
 
+# Seconds an API token stays valid after it is issued; 0 never expires them.
+# Logging in again replaces an expired token, POST auth/token/rotate any time.
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', 30 * 24 * 3600))
+
 
 # custom user
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -201,12 +284,20 @@ if DEBUG:
 else:
     # Use the SMTP email backend for production
     EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', EMAIL_BACKEND)
 
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
+
+# Outbound email queue drained by `manage.py send_queued_emails`
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_BACKOFF = int(os.getenv('EMAIL_OUTBOX_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+EMAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_CLAIM_TIMEOUT', 600))  # seconds before a worker's claimed emails are retried
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 30))  # days sent and failed emails are kept
 ANONYMOUS_USER_ID = -1
 
 
@@ -220,17 +311,33 @@ if DEBUG:
         }
     }
 else:
-    # Use PostgreSQL for production
+    # Use PostgreSQL for production, through a per-process connection pool (core.db.pool)
+    # so requests do not pay for the TLS handshake. Pools are per worker process:
+    # keep DATABASE_POOL_MAX_SIZE times the number of processes below max_connections.
+    DATABASE_POOL_ENABLED = os.getenv('DATABASE_POOL_ENABLED', 'True').lower() == 'true'
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': 'core.db.backends.postgresql' if DATABASE_POOL_ENABLED else 'django.db.backends.postgresql',
             'NAME': os.getenv('PGDATABASE'),
             'USER': os.getenv('PGUSER'),
             'PASSWORD': os.getenv('PGPASSWORD'),
             'HOST': os.getenv('PGHOST'),
             'PORT': os.getenv('PGPORT', 5432),
             'OPTIONS': {
-                'sslmode': 'require',
+                'sslmode': os.getenv('PGSSLMODE', 'require'),
+            },
+            # Pooled connections go back to the pool after every request; without the pool, keep them open a while
+            'CONN_MAX_AGE': 0 if DATABASE_POOL_ENABLED else int(os.getenv('CONN_MAX_AGE', 60)),
+            'POOL': {
+                'MIN_SIZE': int(os.getenv('DATABASE_POOL_MIN_SIZE', 1)),
+                # A sync WSGI worker uses one connection at a time; async views use one per database thread
+                'MAX_SIZE': int(os.getenv(
+                    'DATABASE_POOL_MAX_SIZE', ASYNC_DATABASE_THREADS if SERVER_INTERFACE == 'asgi' else 2
+                )),
+                'TIMEOUT': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+                'MAX_LIFETIME': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', 1800)),
+                'MAX_IDLE': float(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+                'HEALTH_CHECK_AFTER': float(os.getenv('DATABASE_POOL_HEALTH_CHECK_AFTER', 30)),
             },
         }
     }
@@ -267,6 +374,23 @@ CORS_ALLOW_METHODS = [
     "OPTIONS",
 ]
 
+# Change events pushed over /events/organization/<id>/ (core.events, core.streams). The
+# in-process broker only reaches streams served by the process making the change;
+# when writes and streams run in separate processes (gunicorn and uvicorn, several
+# workers or nodes), use the PostgreSQL LISTEN/NOTIFY broker.
+EVENT_BROKERS = {
+    'memory': "core.events.InProcessBroker",
+    'postgres': "core.events.PostgresBroker",
+}
+EVENT_BROKER = EVENT_BROKERS[os.getenv('EVENT_BROKER', 'memory')]
+EVENT_STREAM_HEARTBEAT = int(os.getenv('EVENT_STREAM_HEARTBEAT', 15))  # seconds between keep-alive comments
+EVENT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv('EVENT_SUBSCRIBER_QUEUE_SIZE', 1000))  # events buffered per stream
+
+# Per-request query instrumentation (core.instrumentation)
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+SLOW_REQUEST_TRACE_SAMPLE_RATE = float(os.getenv('SLOW_REQUEST_TRACE_SAMPLE_RATE', 0.1))
+SLOWEST_QUERIES_LOGGED = int(os.getenv('SLOWEST_QUERIES_LOGGED', 5))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -279,6 +403,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.instrumentation.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
@@ -286,6 +413,11 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'instrumentation': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
     },
     'loggers': {
         'django': {
@@ -293,6 +425,11 @@ LOGGING = {
             'level': 'INFO',  # Set to 'DEBUG' to see all logging messages
             'propagate': True,
         },
+        'core.instrumentation': {
+            'handlers': ['instrumentation'],
+            'level': os.getenv('INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
 
     },
 }
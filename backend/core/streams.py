@@ -0,0 +1,214 @@
+"""
+Server-sent event streams of organization changes, served by core.asgi.
+
+Django 3.2 cannot stream a response from an async view, so the stream is a
+small ASGI application that core.asgi puts in front of Django: it answers
+GET /events/organization/<id>/ itself and passes every other request on.
+"""
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from rest_framework import exceptions
+
+from .async_views import database_sync_to_async
+from .events import get_event_broker
+from .policy import filter_visible_projects
+
+EVENT_STREAM_PATH = re.compile(r'^/events/organization/(?P<organization_id>\d+)/$')
+
+
+@database_sync_to_async
+def authenticate_subscriber(key, organization_id):
+    """
+    Get the member of the organization holding the token `key`, and their role.
+
+    Returns:
+        tuple: The user and their membership role.
+
+    Raises:
+        NotAuthenticated: No token was given.
+        AuthenticationFailed: The token is invalid or expired, or its user inactive.
+        PermissionDenied: The user is not a member of the organization.
+    """
+    from organizations.models import Membership
+    from users.authentication import TokenAuthentication
+
+    if not key:
+        raise exceptions.NotAuthenticated()
+    user, _ = TokenAuthentication().authenticate_credentials(key)
+    role = Membership.objects.filter(user=user, organization_id=organization_id).values_list('role', flat=True).first()
+    if role is None:
+        raise exceptions.PermissionDenied("You are not a member of this organization.")
+    return user, role
+
+
+@database_sync_to_async
+def get_visible_project_ids(organization_id, project_ids, user, role):
+    from projects.models import Project
+
+    projects = Project.objects.filter(organization_id=organization_id, pk__in=project_ids)
+    return set(filter_visible_projects(projects, user, role).values_list('pk', flat=True))
+
+
+async def get_visible_event(event, user, role):
+    """
+    Get the part of an event the subscriber may see, or None if they may see none of it.
+
+    Project and comment events are narrowed to the projects the subscriber can
+    view (see core.policy). A deleted project can no longer be looked up, so
+    its event carries the non-admin users who could view it, which is not sent on.
+    """
+    event = dict(event)
+    viewers = event.pop('viewers', None)
+    if not event['type'].startswith(('project.', 'comment.')):
+        return event
+    if user.is_superuser or role == settings.USER_ROLES['ADMIN']:
+        return event
+
+    if event['type'] == 'project.deleted':
+        return event if viewers is not None and user.pk in viewers else None
+
+    project_ids = event['ids'] if event['type'].startswith('project.') else [event['project']]
+    visible_ids = await get_visible_project_ids(event['organization'], project_ids, user, role)
+    if event['type'].startswith('comment.'):
+        return event if visible_ids else None
+    event['ids'] = [pk for pk in project_ids if pk in visible_ids]
+    return event if event['ids'] else None
+
+
+def get_token_key(scope):
+    """
+    Read the token from the Authorization header or, as EventSource cannot set headers, the `token` parameter.
+    """
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            keyword, _, key = value.decode('latin1').partition(' ')
+            if keyword == 'Bearer':
+                return key.strip()
+    return parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+
+
+def get_cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    if origin is None:
+        return []
+    if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
+        return [(b'access-control-allow-origin', b'*')]
+    if origin.decode('latin1') in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+        return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+    return []
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+async def stream_organization_events(scope, receive, send, organization_id):
+    """
+    Send the organization's change events to a subscribed member until they disconnect.
+
+    Each event is narrowed to what the member can view (get_visible_event). A
+    comment line is sent every EVENT_STREAM_HEARTBEAT seconds to keep proxies
+    from closing an idle stream, and at the same interval the token and the
+    membership are checked again. The stream ends with a `resync` event when
+    the subscriber falls behind, with an `unauthorized` event when the token
+    is revoked, rotated or expires, the user is deactivated or the membership
+    is gone, and when the member is removed from the organization.
+    """
+    cors_headers = get_cors_headers(scope)
+    key = get_token_key(scope)
+    try:
+        user, role = await authenticate_subscriber(key, organization_id)
+    except exceptions.APIException as error:
+        await send({
+            'type': 'http.response.start',
+            'status': error.status_code,
+            'headers': [(b'content-type', b'application/json')] + cors_headers,
+        })
+        await send({'type': 'http.response.body', 'body': json.dumps({'detail': str(error.detail)}).encode()})
+        return
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async with get_event_broker().subscribe(organization_id) as subscription:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Keep nginx from buffering the stream
+                    (b'x-accel-buffering', b'no'),
+                ] + cors_headers,
+            })
+            await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+            loop = asyncio.get_running_loop()
+            authenticated_at = loop.time()
+            reauthenticate = False
+            while not disconnected.is_set():
+                if reauthenticate or loop.time() - authenticated_at >= settings.EVENT_STREAM_HEARTBEAT:
+                    try:
+                        user, role = await authenticate_subscriber(key, organization_id)
+                    except exceptions.APIException as error:
+                        event = {'type': 'unauthorized', 'detail': str(error.detail)}
+                        await send({'type': 'http.response.body', 'body': format_event(event)})
+                        return
+                    authenticated_at = loop.time()
+                    reauthenticate = False
+
+                next_event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {next_event, watcher}, timeout=settings.EVENT_STREAM_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if next_event not in done:
+                    next_event.cancel()
+                    if not disconnected.is_set():
+                        await send({'type': 'http.response.body', 'body': b': heartbeat\n\n', 'more_body': True})
+                    continue
+
+                event = next_event.result()
+                if subscription.overflowed:
+                    await send({'type': 'http.response.body', 'body': format_event({'type': 'resync'})})
+                    return
+                if event['type'] == 'membership.updated' and user.pk in event.get('users', ()):
+                    # The role decides what the member can view; read it again before the next event
+                    reauthenticate = True
+                visible_event = await get_visible_event(event, user, role)
+                if visible_event is not None:
+                    await send({'type': 'http.response.body', 'body': format_event(visible_event), 'more_body': True})
+                if event['type'] == 'membership.deleted' and user.pk in event.get('users', ()):
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+
+class EventStreamRouter:
+    """
+    ASGI application serving the event streams and handing everything else to `application`.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = EVENT_STREAM_PATH.match(scope['path'])
+            if match:
+                await stream_organization_events(scope, receive, send, int(match['organization_id']))
+                return
+        await self.application(scope, receive, send)
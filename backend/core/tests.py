@@ -0,0 +1,787 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.contrib.auth.models import Group
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from guardian.shortcuts import assign_perm
+from rest_framework import exceptions
+from rest_framework.response import Response
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from organizations.models import Membership, Organization
+from projects.models import Comment, Project
+from projects.views import ProjectListCreateView
+from users.authentication import revoke_token, rotate_token
+from .async_views import as_view, async_api_view, database_sync_to_async
+from .context import get_request_context
+from .db.pool import ConnectionPool, PoolTimeout
+from .instrumentation import QueryInstrumentationMiddleware
+from .events import InProcessBroker, PostgresBroker, Subscription
+from .policy import (
+    PROJECT_ADMIN_PERMISSIONS, PROJECT_ASSIGNEE_PERMISSIONS, filter_visible_projects, get_project_viewer_ids,
+    get_role_project_permissions,
+)
+from .streams import authenticate_subscriber, get_token_key, stream_organization_events
+
+User = get_user_model()
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+
+
+class ConnectionPoolTestMixin:
+    """
+    Builds pools on fake connect/check/reset/close callables.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.opened = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def make_pool(self, **options):
+        def close(connection):
+            connection.closed = True
+
+        return ConnectionPool(
+            check=lambda connection: connection.healthy,
+            reset=lambda connection: not connection.closed,
+            close=close,
+            **options,
+        )
+
+
+class ConnectionPoolWaitTests(ConnectionPoolTestMixin, SimpleTestCase):
+
+    def test_checkout_times_out_when_the_pool_is_exhausted(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.checkout(self.connect)
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(self.connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_the_connection_checked_in(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection, _ = pool.checkout(self.connect)
+        releaser = threading.Timer(0.05, pool.checkin, [connection])
+        releaser.start()
+        self.addCleanup(releaser.cancel)
+
+        again, created = pool.checkout(self.connect)
+        self.assertIs(again, connection)
+        self.assertFalse(created)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+
+class ConnectionPoolTests(ConnectionPoolTestMixin, SimpleTestCase):
+    """
+    Pool behaviour over time, on a fake clock.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        clock = mock.patch('core.db.pool.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_checked_in_connection_is_reused(self):
+        pool = self.make_pool()
+        connection, created = pool.checkout(self.connect)
+        self.assertTrue(created)
+        pool.checkin(connection)
+
+        again, created = pool.checkout(self.connect)
+        self.assertIs(again, connection)
+        self.assertFalse(created)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_checked_out_connections_are_not_shared(self):
+        pool = self.make_pool(max_size=2)
+        first, _ = pool.checkout(self.connect)
+        second, _ = pool.checkout(self.connect)
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()['size'], 2)
+
+    def test_connection_past_max_lifetime_is_replaced(self):
+        pool = self.make_pool(max_lifetime=60)
+        connection, _ = pool.checkout(self.connect)
+        pool.checkin(connection)
+        self.now += 61
+
+        replacement, created = pool.checkout(self.connect)
+        self.assertTrue(created)
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['expired'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_connection_past_max_lifetime_is_closed_on_checkin(self):
+        pool = self.make_pool(max_lifetime=60)
+        connection, _ = pool.checkout(self.connect)
+        self.now += 61
+        pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_above_min_size_are_pruned(self):
+        pool = self.make_pool(min_size=1, max_idle=30, max_lifetime=3600, health_check_after=3600)
+        first, _ = pool.checkout(self.connect)
+        second, _ = pool.checkout(self.connect)
+        pool.checkin(first)
+        self.now += 31
+        pool.checkin(second)
+
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(pool.stats()['idle'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_health_check_reconnects(self):
+        pool = self.make_pool(health_check_after=10)
+        connection, _ = pool.checkout(self.connect)
+        pool.checkin(connection)
+        connection.healthy = False
+        self.now += 11
+
+        replacement, created = pool.checkout(self.connect)
+        self.assertTrue(created)
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['health_check_failures'], stats['reconnects'], stats['size']), (1, 1, 1))
+
+    def test_recently_used_connection_is_not_health_checked(self):
+        pool = self.make_pool(health_check_after=10)
+        connection, _ = pool.checkout(self.connect)
+        pool.checkin(connection)
+        connection.healthy = False
+        self.now += 5
+
+        again, created = pool.checkout(self.connect)
+        self.assertIs(again, connection)
+        self.assertFalse(created)
+
+    def test_connection_failing_reset_is_discarded(self):
+        pool = self.make_pool()
+        connection, _ = pool.checkout(self.connect)
+        connection.closed = True
+        pool.checkin(connection)
+        self.assertEqual(pool.stats()['size'], 0)
+
+        _, created = pool.checkout(self.connect)
+        self.assertTrue(created)
+
+    def test_failed_connect_releases_its_slot(self):
+        pool = self.make_pool(max_size=1)
+        with self.assertRaises(OSError):
+            pool.checkout(mock.Mock(side_effect=OSError('refused')))
+        self.assertEqual(pool.stats()['size'], 0)
+
+        _, created = pool.checkout(self.connect)
+        self.assertTrue(created)
+
+
+class InProcessBrokerTests(SimpleTestCase):
+
+    def collect(self, broker, organization_id, publish):
+        async def run():
+            async with broker.subscribe(organization_id) as subscription:
+                publish()
+                await asyncio.sleep(0)
+                events = []
+                while not subscription.queue.empty():
+                    events.append(await subscription.get())
+                return events, subscription.overflowed
+
+        return async_to_sync(run)()
+
+    def test_events_reach_the_subscribers_of_their_organization_only(self):
+        broker = InProcessBroker()
+
+        def publish():
+            broker.publish(1, {'type': 'project.created', 'ids': [1]})
+            broker.publish(2, {'type': 'project.created', 'ids': [2]})
+
+        events, _ = self.collect(broker, 1, publish)
+        self.assertEqual(events, [{'type': 'project.created', 'ids': [1]}])
+
+    def test_events_published_from_another_thread_are_delivered(self):
+        broker = InProcessBroker()
+
+        def publish():
+            thread = threading.Thread(target=broker.publish, args=(1, {'type': 'organization.updated'}))
+            thread.start()
+            thread.join()
+
+        events, _ = self.collect(broker, 1, publish)
+        self.assertEqual(events, [{'type': 'organization.updated'}])
+
+    def test_ending_a_subscription_unregisters_it(self):
+        broker = InProcessBroker()
+        self.collect(broker, 1, lambda: None)
+        self.assertEqual(dict(broker._subscriptions), {})
+
+    @override_settings(EVENT_SUBSCRIBER_QUEUE_SIZE=1)
+    def test_full_queue_marks_the_subscriber_as_overflowed(self):
+        broker = InProcessBroker()
+
+        def publish():
+            broker.publish(1, {'type': 'organization.updated'})
+            broker.publish(1, {'type': 'organization.updated'})
+
+        events, overflowed = self.collect(broker, 1, publish)
+        self.assertEqual(len(events), 1)
+        self.assertTrue(overflowed)
+
+    def test_events_for_a_closed_loop_are_dropped(self):
+        loop = asyncio.new_event_loop()
+        subscription = Subscription(loop, 1)
+        loop.close()
+        subscription.put({'type': 'organization.updated'})
+
+
+class PostgresBrokerTests(SimpleTestCase):
+
+    def test_needs_a_postgresql_database(self):
+        with self.assertRaises(ImproperlyConfigured):
+            PostgresBroker()
+
+    def test_large_events_are_split_into_notifications_that_fit(self):
+        with mock.patch('core.events.connections') as connections:
+            connections['default'].vendor = 'postgresql'
+            broker = PostgresBroker()
+            broker.publish(1, {'type': 'project.updated', 'ids': list(range(2000))})
+
+        cursor = connections['default'].cursor.return_value.__enter__.return_value
+        payloads = [json.loads(call.args[1][1]) for call in cursor.execute.call_args_list]
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(len(call.args[1][1]) <= 7500 for call in cursor.execute.call_args_list))
+        self.assertEqual(
+            [pk for payload in payloads for pk in payload['event']['ids']], list(range(2000))
+        )
+        self.assertEqual({payload['organization'] for payload in payloads}, {1})
+
+
+class TokenKeyTests(SimpleTestCase):
+
+    def test_bearer_authorization_header(self):
+        scope = {'headers': [(b'authorization', b'Bearer abc')], 'query_string': b''}
+        self.assertEqual(get_token_key(scope), 'abc')
+
+    def test_token_parameter_for_clients_that_cannot_set_headers(self):
+        self.assertEqual(get_token_key({'headers': [], 'query_string': b'token=abc&x=1'}), 'abc')
+
+    def test_authorization_header_takes_precedence(self):
+        scope = {'headers': [(b'authorization', b'Bearer abc')], 'query_string': b'token=def'}
+        self.assertEqual(get_token_key(scope), 'abc')
+
+    def test_other_schemes_and_missing_tokens(self):
+        self.assertIsNone(get_token_key({'headers': [(b'authorization', b'Basic abc')], 'query_string': b''}))
+        self.assertIsNone(get_token_key({'headers': [], 'query_string': b''}))
+
+
+class EventStream:
+    """
+    A client of stream_organization_events, on a fake ASGI connection.
+    """
+
+    def __init__(self, organization_id, query_string):
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        scope = {'type': 'http', 'method': 'GET', 'headers': [], 'query_string': query_string.encode()}
+        self.task = asyncio.ensure_future(
+            stream_organization_events(scope, self.receive, self.messages.put, organization_id)
+        )
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def next_message(self):
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def next_event(self):
+        """
+        Get the next event sent, skipping comments, or None once the stream has ended.
+        """
+        while True:
+            message = await self.next_message()
+            if message['type'] != 'http.response.body':
+                continue
+            if message['body'].startswith(b'event:'):
+                return json.loads(message['body'].decode().split('data: ', 1)[1])
+            if not message.get('more_body', False):
+                return None
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+@override_settings(EVENT_BROKER='core.events.InProcessBroker')
+class EventStreamTests(TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        broker = mock.patch('core.events._broker', InProcessBroker())
+        broker.start()
+        self.addCleanup(broker.stop)
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Membership.objects.create(user=self.member, organization=self.organization, role='member')
+        self.admin_key = Token.objects.create(user=self.admin).key
+        self.member_key = Token.objects.create(user=self.member).key
+
+    async def open(self, key):
+        stream = EventStream(self.organization.pk, f"token={key}")
+        start = await stream.next_message()
+        self.assertEqual(start['status'], 200)
+        self.assertEqual((await stream.next_message())['body'], b': connected\n\n')
+        return stream
+
+    async def run_sync(self, func, *args, **kwargs):
+        return await database_sync_to_async(func)(*args, **kwargs)
+
+    def create_project(self, **fields):
+        return Project.objects.create(name='Project', organization=self.organization, created_by=self.admin, **fields)
+
+    def test_authenticate_subscriber(self):
+        authenticate = async_to_sync(authenticate_subscriber)
+        self.assertEqual(authenticate(self.member_key, self.organization.pk), (self.member, 'member'))
+        with self.assertRaises(exceptions.NotAuthenticated):
+            authenticate(None, self.organization.pk)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authenticate('not-a-key', self.organization.pk)
+        other = Organization.objects.create(name='Other', created_by=self.admin)
+        with self.assertRaises(exceptions.PermissionDenied):
+            authenticate(self.member_key, other.pk)
+
+    def test_requests_without_a_valid_token_or_membership_are_refused(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        outsider_key = Token.objects.create(user=outsider).key
+
+        async def status(query_string):
+            stream = EventStream(self.organization.pk, query_string)
+            start = await stream.next_message()
+            await stream.next_message()
+            await asyncio.wait_for(stream.task, timeout=5)
+            return start['status']
+
+        async def run():
+            return [await status(''), await status('token=not-a-key'), await status(f"token={outsider_key}")]
+
+        self.assertEqual(async_to_sync(run)(), [401, 401, 403])
+
+    def test_members_only_get_the_project_events_they_can_view(self):
+        def change():
+            # In one transaction, so the streams read the projects once the writes are done
+            with transaction.atomic():
+                hidden = self.create_project()
+                assigned = self.create_project(assigned_to=self.member)
+                Comment.objects.create(project=hidden, user=self.admin, content='Hidden')
+                Comment.objects.create(project=assigned, user=self.admin, content='Visible')
+            return hidden, assigned
+
+        async def run():
+            admin_stream = await self.open(self.admin_key)
+            member_stream = await self.open(self.member_key)
+            hidden, assigned = await self.run_sync(change)
+            admin_events = [await admin_stream.next_event() for _ in range(4)]
+            member_events = [await member_stream.next_event() for _ in range(2)]
+            await admin_stream.close()
+            await member_stream.close()
+            return hidden, assigned, admin_events, member_events
+
+        hidden, assigned, admin_events, member_events = async_to_sync(run)()
+        self.assertEqual(
+            [(event['type'], event.get('ids'), event.get('project')) for event in admin_events],
+            [
+                ('project.created', [hidden.pk], None),
+                ('project.created', [assigned.pk], None),
+                ('comment.created', [hidden.comments.get().pk], hidden.pk),
+                ('comment.created', [assigned.comments.get().pk], assigned.pk),
+            ],
+        )
+        self.assertEqual(
+            [(event['type'], event.get('project')) for event in member_events],
+            [('project.created', None), ('comment.created', assigned.pk)],
+        )
+        self.assertEqual(member_events[0]['ids'], [assigned.pk])
+
+    def test_deleted_projects_are_announced_to_the_members_who_could_view_them(self):
+        hidden = self.create_project()
+        assigned = self.create_project(assigned_to=self.member)
+        assigned_id = assigned.pk
+
+        async def run():
+            stream = await self.open(self.member_key)
+            await self.run_sync(hidden.delete)
+            await self.run_sync(assigned.delete)
+            event = await stream.next_event()
+            await stream.close()
+            return event
+
+        event = async_to_sync(run)()
+        self.assertEqual((event['type'], event['ids']), ('project.deleted', [assigned_id]))
+        self.assertNotIn('viewers', event)
+
+    def test_stream_ends_when_the_member_is_removed(self):
+        async def run():
+            stream = await self.open(self.member_key)
+            await self.run_sync(Membership.objects.filter(user=self.member).delete)
+            events = [await stream.next_event(), await stream.next_event()]
+            await asyncio.wait_for(stream.task, timeout=5)
+            return events
+
+        events = async_to_sync(run)()
+        self.assertEqual(events[0]['type'], 'membership.deleted')
+        self.assertIsNone(events[1])
+
+    def assert_stream_ends_unauthorized(self, change):
+        async def run():
+            stream = await self.open(self.member_key)
+            await self.run_sync(change)
+            event = await stream.next_event()
+            await asyncio.wait_for(stream.task, timeout=5)
+            return event
+
+        with override_settings(EVENT_STREAM_HEARTBEAT=0.05):
+            event = async_to_sync(run)()
+        self.assertEqual(event['type'], 'unauthorized')
+
+    def test_stream_ends_when_the_token_is_revoked(self):
+        self.assert_stream_ends_unauthorized(lambda: revoke_token(self.member_key))
+
+    def test_stream_ends_when_the_token_is_rotated(self):
+        self.assert_stream_ends_unauthorized(lambda: rotate_token(self.member))
+
+    def test_stream_ends_when_the_user_is_deactivated(self):
+        def deactivate():
+            self.member.is_active = False
+            self.member.save()
+
+        self.assert_stream_ends_unauthorized(deactivate)
+
+    @override_settings(EVENT_SUBSCRIBER_QUEUE_SIZE=1)
+    def test_subscriber_falling_behind_is_told_to_resync(self):
+        async def run():
+            stream = await self.open(self.admin_key)
+            from core.events import get_event_broker
+            get_event_broker().publish(self.organization.pk, {'type': 'organization.updated'})
+            get_event_broker().publish(self.organization.pk, {'type': 'organization.updated'})
+            event = await stream.next_event()
+            await asyncio.wait_for(stream.task, timeout=5)
+            return event
+
+        self.assertEqual(async_to_sync(run)()['type'], 'resync')
+
+
+class ProjectPolicyTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Membership.objects.create(user=self.member, organization=self.organization, role='member')
+        self.assigned, self.unassigned, self.shared, self.group_shared = [
+            Project.objects.create(name=name, organization=self.organization, created_by=self.admin)
+            for name in ['Assigned', 'Unassigned', 'Shared', 'Group shared']
+        ]
+        Project.objects.filter(pk=self.assigned.pk).update(assigned_to=self.member)
+        self.assigned.refresh_from_db()
+
+    def visible(self, user, role):
+        return set(filter_visible_projects(Project.objects.all(), user, role))
+
+    def test_admins_get_every_project_permission(self):
+        self.assertEqual(get_role_project_permissions(self.admin, self.unassigned, 'admin'), PROJECT_ADMIN_PERMISSIONS)
+
+    def test_superusers_get_every_project_permission_without_a_role(self):
+        self.outsider.is_superuser = True
+        self.assertEqual(get_role_project_permissions(self.outsider, self.unassigned, None), PROJECT_ADMIN_PERMISSIONS)
+
+    def test_members_get_the_assignee_permissions_of_their_projects_only(self):
+        self.assertEqual(get_role_project_permissions(self.member, self.assigned, 'member'), PROJECT_ASSIGNEE_PERMISSIONS)
+        self.assertEqual(get_role_project_permissions(self.member, self.unassigned, 'member'), set())
+
+    def test_assignees_who_left_the_organization_get_nothing(self):
+        self.assertEqual(get_role_project_permissions(self.member, self.assigned, None), set())
+
+    def test_inactive_users_get_nothing(self):
+        self.admin.is_active = False
+        self.assertEqual(get_role_project_permissions(self.admin, self.unassigned, 'admin'), set())
+
+    def test_admins_see_every_project(self):
+        self.assertEqual(self.visible(self.admin, 'admin'), {self.assigned, self.unassigned, self.shared, self.group_shared})
+
+    def test_members_see_their_projects_and_their_overrides(self):
+        group = Group.objects.create(name='Reviewers')
+        group.user_set.add(self.member)
+        assign_perm('view_project', self.member, self.shared)
+        assign_perm('view_project', group, self.group_shared)
+        # Other permissions, and other users' overrides, do not make a project visible
+        assign_perm('change_project', self.member, self.unassigned)
+        assign_perm('view_project', self.outsider, self.unassigned)
+
+        self.assertEqual(self.visible(self.member, 'member'), {self.assigned, self.shared, self.group_shared})
+
+    def test_project_seen_through_both_kinds_of_override_is_listed_once(self):
+        group = Group.objects.create(name='Reviewers')
+        group.user_set.add(self.member)
+        assign_perm('view_project', self.member, self.shared)
+        assign_perm('view_project', group, self.shared)
+
+        projects = list(filter_visible_projects(Project.objects.all(), self.member, 'member'))
+        self.assertEqual(sorted(project.pk for project in projects), sorted([self.assigned.pk, self.shared.pk]))
+
+    def test_non_members_only_see_their_overrides(self):
+        self.assertEqual(self.visible(self.outsider, None), set())
+        assign_perm('view_project', self.outsider, self.shared)
+        self.assertEqual(self.visible(self.outsider, None), {self.shared})
+
+    def test_project_viewers_are_the_assignee_and_the_overrides(self):
+        group = Group.objects.create(name='Reviewers')
+        group.user_set.add(self.admin)
+        assign_perm('view_project', self.outsider, self.assigned)
+        assign_perm('view_project', group, self.assigned)
+        self.assertEqual(
+            get_project_viewer_ids(self.assigned.pk, self.assigned.assigned_to_id),
+            {self.member.pk, self.outsider.pk, self.admin.pk},
+        )
+        self.assertEqual(get_project_viewer_ids(self.unassigned.pk, None), set())
+
+
+def get_timing_query_count(response):
+    return int(response['Server-Timing'].split('desc="', 1)[1].split(' ', 1)[0])
+
+
+class RequestContextTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        self.project = Project.objects.create(name='Website', organization=self.organization, created_by=self.admin)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.admin
+
+    def test_context_is_attached_to_the_request(self):
+        context = get_request_context(self.request)
+        self.assertIs(get_request_context(self.request), context)
+        self.assertIsNot(get_request_context(RequestFactory().get('/')), context)
+
+    def test_rows_are_loaded_once(self):
+        context = get_request_context(self.request)
+        with self.assertNumQueries(2):
+            for _ in range(2):
+                self.assertEqual(context.get_organization(str(self.organization.pk)), self.organization)
+                self.assertTrue(context.is_admin(self.organization))
+
+    def test_missing_rows_are_remembered(self):
+        context = get_request_context(self.request)
+        with self.assertNumQueries(2):
+            for _ in range(2):
+                self.assertIsNone(context.get_project(self.project.pk + 1000))
+                self.assertFalse(context.is_member(self.organization, self.outsider))
+        with self.assertNumQueries(0):
+            self.assertIsNone(context.get_organization('not-an-id'))
+
+    def test_project_brings_its_organization(self):
+        context = get_request_context(self.request)
+        with self.assertNumQueries(1):
+            project = context.get_project(self.project.pk)
+            self.assertIs(context.get_organization(self.organization.pk), project.organization)
+
+    def test_project_endpoints_load_the_project_once(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f"/project/{self.project.pk}/{self.organization.pk}/")
+        self.assertEqual(response.status_code, 200)
+        project_queries = [query for query in queries if query['sql'].startswith('SELECT "projects_project"."id"')]
+        self.assertEqual(len(project_queries), 1)
+
+    def test_missing_project_is_not_found(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        missing = self.project.pk + 1000
+        self.assertEqual(client.get(f"/project/{missing}/{self.organization.pk}/").status_code, 404)
+        response = client.put(
+            f"/project/{missing}/update-status/", {'organization': self.organization.pk, 'status': 'done'}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.client.force_login(self.user)
+
+    def test_server_timing_reports_the_request_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[-\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(get_timing_query_count(response), len(queries.captured_queries))
+
+    def test_requests_are_logged_with_their_metrics(self):
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = self.client.get('/auth/me/')
+        metrics = logs.records[-1].metrics
+        self.assertEqual((metrics['path'], metrics['status']), ('/auth/me/', 200))
+        self.assertEqual(metrics['queries'], get_timing_query_count(response))
+        self.assertLessEqual(len(metrics['slowest_queries']), 5)
+        self.assertNotIn('trace', metrics)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0, SLOW_REQUEST_TRACE_SAMPLE_RATE=1, SLOWEST_QUERIES_LOGGED=1)
+    def test_sampled_slow_requests_log_their_full_trace(self):
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/auth/me/')
+        metrics = logs.records[-1].metrics
+        self.assertEqual(logs.records[-1].getMessage(), 'slow request')
+        self.assertEqual(len(metrics['trace']), metrics['queries'])
+        self.assertEqual(len(metrics['slowest_queries']), 1)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0, SLOW_REQUEST_TRACE_SAMPLE_RATE=0)
+    def test_unsampled_slow_requests_skip_the_trace(self):
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/auth/me/')
+        self.assertNotIn('trace', logs.records[-1].metrics)
+
+
+class AsyncQueryInstrumentationTests(TransactionTestCase):
+    """
+    The middleware in an ASGI chain, where views run their queries in other threads.
+    """
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+
+    def run_middleware(self, get_response):
+        middleware = QueryInstrumentationMiddleware(get_response)
+        return async_to_sync(middleware)(RequestFactory().get('/'))
+
+    def test_queries_of_sync_views_are_recorded(self):
+        def view():
+            User.objects.count()
+            User.objects.count()
+            return HttpResponse()
+
+        async def get_response(request):
+            # As Django runs a sync view under ASGI
+            return await sync_to_async(view, thread_sensitive=True)()
+
+        self.assertEqual(get_timing_query_count(self.run_middleware(get_response)), 2)
+
+    def test_queries_of_async_views_are_recorded(self):
+        @database_sync_to_async
+        def count_users():
+            return User.objects.count()
+
+        async def get_response(request):
+            await count_users()
+            await count_users()
+            await count_users()
+            return HttpResponse()
+
+        self.assertEqual(get_timing_query_count(self.run_middleware(get_response)), 3)
+
+    def test_concurrent_requests_are_recorded_apart(self):
+        def view(count):
+            for _ in range(count):
+                User.objects.count()
+            return HttpResponse()
+
+        def make_get_response(count):
+            async def get_response(request):
+                return await database_sync_to_async(view)(count)
+            return get_response
+
+        async def run():
+            responses = await asyncio.gather(*[
+                QueryInstrumentationMiddleware(make_get_response(count))(RequestFactory().get('/'))
+                for count in (1, 2, 3)
+            ])
+            return [get_timing_query_count(response) for response in responses]
+
+        self.assertEqual(async_to_sync(run)(), [1, 2, 3])
+
+
+class ThreadNameView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    barrier = None
+
+    def get(self, request):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        return Response({'thread': threading.current_thread().name})
+
+
+class AsyncApiViewTests(TransactionTestCase):
+    """
+    DRF views wrapped for ASGI, which run on the database thread pool.
+    """
+
+    def test_views_run_and_render_on_the_database_pool(self):
+        response = async_to_sync(async_api_view(ThreadNameView))(RequestFactory().get('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_rendered)
+        self.assertTrue(json.loads(response.content)['thread'].startswith('async-db'))
+
+    def test_requests_run_in_parallel(self):
+        # Each view waits for the other, so this only returns if they run at the same time
+        view = async_api_view(ThreadNameView, barrier=threading.Barrier(2))
+
+        async def run():
+            return await asyncio.gather(view(RequestFactory().get('/')), view(RequestFactory().get('/')))
+
+        threads = {json.loads(response.content)['thread'] for response in async_to_sync(run)()}
+        self.assertEqual(len(threads), 2)
+
+    def test_views_query_the_database(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        organization = Organization.objects.create(name='Acme', created_by=admin)
+        project = Project.objects.create(name='Website', organization=organization, created_by=admin)
+        request = APIRequestFactory().get('/project/', {'organization_id': organization.pk})
+        force_authenticate(request, admin)
+
+        response = async_to_sync(async_api_view(ProjectListCreateView))(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in json.loads(response.content)['results']], [project.pk])
+
+    def test_server_interface_picks_the_view(self):
+        with override_settings(SERVER_INTERFACE='asgi'):
+            view = as_view(ThreadNameView)
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertTrue(view.csrf_exempt)
+        self.assertIs(view.cls, ThreadNameView)
+        with override_settings(SERVER_INTERFACE='wsgi'):
+            self.assertFalse(asyncio.iscoroutinefunction(as_view(ThreadNameView)))
@@ -3,6 +3,7 @@ from django.urls import path,include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .views import DatabasePoolMetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -22,5 +23,8 @@ urlpatterns = [
     path("auth/",include("users.urls")),
     path("organization/",include("organizations.urls")),
     path("project/",include("projects.urls")),
+    path("notifications/",include("notifications.urls")),
+    path("activity/",include("activity.urls")),
+    path("metrics/database/",DatabasePoolMetricsView.as_view(),name="database_pool_metrics"),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
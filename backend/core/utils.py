@@ -1,48 +1,159 @@
-from guardian.shortcuts import get_perms
-from django.contrib.auth.models import Group
+import uuid
 
 from guardian.shortcuts import get_perms
+from guardian.core import ObjectPermissionChecker
+from guardian.utils import get_anonymous_user
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from .policy import get_role_project_permissions
+
+PERMISSION_CACHE_ALIAS = 'permissions'
+
+
+def _organization_permission_version(cache, organization_id):
+    """
+    Get the current permission cache version of an organization.
+
+    The version is a random token rather than a counter so that an evicted
+    version key can never bring back entries written under an older version.
+    """
+    version_key = f"org_perms_version:{organization_id}"
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def invalidate_organization_permissions(organization_id):
+    """
+    Drop every cached permission set for an organization by bumping its version.
+
+    The bump is repeated once the surrounding transaction commits, so a request
+    reading the old rows before the commit cannot leave stale entries behind.
+    """
+    def bump():
+        caches[PERMISSION_CACHE_ALIAS].set(f"org_perms_version:{organization_id}", uuid.uuid4().hex, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_organization_permission_version(organization_id):
+    """
+    Get the token that changes whenever invalidate_organization_permissions runs for the organization.
+    """
+    return _organization_permission_version(caches[PERMISSION_CACHE_ALIAS], organization_id)
+
+
+def is_login_update(update_fields):
+    """
+    Tell whether a user post_save only recorded a login, which changes nothing users see.
+    """
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+_anonymous_user_id = None
+
+
+def get_anonymous_user_id():
+    """
+    Get the id of guardian's anonymous user, looked up once per process.
+    """
+    global _anonymous_user_id
+    if _anonymous_user_id is None:
+        _anonymous_user_id = get_anonymous_user().pk
+    return _anonymous_user_id
+
+
+def bump_revision(queryset):
+    """
+    Increment the `revision` column of every row in the queryset with a single UPDATE.
+    """
+    return queryset.update(revision=F('revision') + 1)
+
+
+def _organization_permission_key(cache, user, organization):
+    version = _organization_permission_version(cache, organization.pk)
+    return f"org_perms:{organization.pk}:{version}:{user.pk}"
+
+
+def _organization_group_names(organization):
+    return [f"{organization.name}_Admin", f"{organization.name}_Member"]
+
+
+def prefetch_user_all_permissions(user, organizations):
+    """
+    Warm the permission cache for many organizations at once.
+
+    Organizations missing from the cache are resolved with one group query and
+    one guardian query per permission table, so rendering a list of organizations
+    costs the same number of queries however long the list is.
+    """
+    cache = caches[PERMISSION_CACHE_ALIAS]
+    keys = {organization.pk: _organization_permission_key(cache, user, organization) for organization in organizations}
+    cached = cache.get_many(list(keys.values()))
+    missing = [organization for organization in organizations if keys[organization.pk] not in cached]
+    if not missing:
+        return
+
+    group_names = set(user.groups.filter(
+        name__in=[name for organization in missing for name in _organization_group_names(organization)]
+    ).values_list('name', flat=True))
+    checker = ObjectPermissionChecker(user)
+    checker.prefetch_perms(missing)
+
+    entries = {}
+    for organization in missing:
+        organization_permissions = set()
+        if group_names.intersection(_organization_group_names(organization)):
+            app_label = organization._meta.app_label
+            organization_permissions = {f"{app_label}.{perm}" for perm in checker.get_perms(organization)}
+        entries[keys[organization.pk]] = organization_permissions
+    cache.set_many(entries)
+
 
 def get_user_all_permissions(user, organization, objs=None):
     """
     Get all permissions for a user in a specific organization, including
     object-level permissions assigned to the user's groups and any specified objects.
+
+    Results are cached per user and organization (and per object) in the
+    'permissions' cache and invalidated through invalidate_organization_permissions
+    by the membership, project and guardian override signal handlers.
     """
-    all_permissions = set()
+    cache = caches[PERMISSION_CACHE_ALIAS]
+    cache_key = _organization_permission_key(cache, user, organization)
 
-    # Get the admin and member groups for the organization
-    admin_group, _ = Group.objects.get_or_create(name=f"{organization.name}_Admin")
-    member_group, _ = Group.objects.get_or_create(name=f"{organization.name}_Member")
+    organization_permissions = cache.get(cache_key)
+    if organization_permissions is None:
+        organization_permissions = set()
 
-    # Include object-level permissions if the user belongs to the admin group
-    if admin_group and admin_group in user.groups.all():
-        admin_group_permissions = get_perms(user, organization)
-        print("the prems fron object level is",admin_group_permissions)
-        all_permissions.update({f"{organization._meta.app_label}.{perm}" for perm in admin_group_permissions})
+        # Only members of the organization's admin or member group get its object-level permissions
+        if user.groups.filter(name__in=_organization_group_names(organization)).exists():
+            app_label = organization._meta.app_label
+            organization_permissions = {f"{app_label}.{perm}" for perm in get_perms(user, organization)}
+        cache.set(cache_key, organization_permissions)
 
-    # Include object-level permissions if the user belongs to the member group
-    if member_group and member_group in user.groups.all():
-        member_group_permissions = get_perms(user, organization)
-        print("the prems fron object level is member_group_permissions",member_group_permissions)
-        all_permissions.update({f"{organization._meta.app_label}.{perm}" for perm in member_group_permissions})
+    all_permissions = set(organization_permissions)
 
     # Handle additional objects to check for object-level permissions
     if objs:
+        resolver = None
         for obj in objs:
             # Ensure the object is associated with the specified organization
-            if not hasattr(obj, 'organization') or obj.organization != organization:
+            if getattr(obj, 'organization_id', None) != organization.pk:
                 raise ValueError(f"The object {obj} does not belong to the specified organization.")
 
-            # Get object-level permissions for the object
-            object_permissions = get_perms(user, obj)
-            # Format permissions as 'app_label.permission_codename'
-            obj_app_label = obj._meta.app_label
-            object_permissions = {f"{obj_app_label}.{perm}" for perm in object_permissions}
-            # Add object-level permissions to the overall set
+            obj_cache_key = f"{cache_key}:{obj._meta.label_lower}:{obj.pk}"
+            object_permissions = cache.get(obj_cache_key)
+            if object_permissions is None:
+                resolver = resolver or ObjectPermissionResolver(user)
+                object_permissions = resolver.get_permissions(obj)
+                cache.set(obj_cache_key, object_permissions)
             all_permissions.update(object_permissions)
 
-    # Print all collected permissions (for debugging purposes)
-    print(all_permissions)
     return all_permissions
 
 
@@ -67,7 +178,6 @@ def get_user_permissions_for_instance(user, objs):
     # Get object-level permissions for each provided instance
     for obj in objs:
         object_permissions = get_perms(user, obj)
-        print(object_permissions)
         # Format object-level permissions as 'app_label.permission_codename'
         app_label = obj._meta.app_label
         formatted_permissions = {f"{app_label}.{perm}" for perm in object_permissions}
@@ -75,3 +185,84 @@ def get_user_permissions_for_instance(user, objs):
         all_permissions.update(formatted_permissions)
 
     return all_permissions
+
+
+class ObjectPermissionResolver:
+    """
+    Request-scoped resolver for the object-level permissions of a single user.
+
+    Project permissions are derived from the user's membership role and the
+    project's assignee (see core.policy); guardian rows only hold explicit
+    overrides. For a batch of objects the overrides are loaded with one query
+    for the user's own rows and one for their groups' rows, and the roles with
+    one membership query, then served from memory keyed by object pk. Objects
+    that were not prefetched are looked up on demand and cached the same way.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.checker = ObjectPermissionChecker(user)
+        self._roles = {}
+
+    def prefetch(self, objs):
+        """
+        Load the permissions for every object in `objs` in bulk.
+
+        Args:
+            objs (iterable): Model instances of a single model.
+
+        Returns:
+            list: The evaluated objects, so querysets are only hit once.
+        """
+        objs = list(objs)
+        if objs:
+            self.checker.prefetch_perms(objs)
+            organization_ids = {getattr(obj, 'organization_id', None) for obj in objs}
+            organization_ids -= set(self._roles) | {None}
+            if organization_ids:
+                self._load_roles(organization_ids)
+        return objs
+
+    def set_role(self, organization_id, role):
+        """
+        Seed the user's role in an organization when the caller already loaded the membership.
+        """
+        self._roles[organization_id] = role
+
+    def get_role(self, organization_id):
+        if organization_id not in self._roles:
+            self._load_roles({organization_id})
+        return self._roles[organization_id]
+
+    def _load_roles(self, organization_ids):
+        from organizations.models import Membership
+
+        roles = {}
+        if self.user.is_authenticated:
+            roles = dict(
+                Membership.objects.filter(user=self.user, organization_id__in=organization_ids)
+                .values_list('organization_id', 'role')
+            )
+        for organization_id in organization_ids:
+            self._roles[organization_id] = roles.get(organization_id)
+
+    def get_permissions(self, obj):
+        """
+        Get the permissions the user has on `obj`, formatted as 'app_label.codename'.
+        """
+        permissions = set(self.checker.get_perms(obj))
+        if obj._meta.label == 'projects.Project':
+            permissions |= get_role_project_permissions(self.user, obj, self.get_role(obj.organization_id))
+        app_label = obj._meta.app_label
+        return {f"{app_label}.{perm}" for perm in permissions}
+
+
+def get_permission_resolver(request):
+    """
+    Get the ObjectPermissionResolver attached to the request, creating it on first use.
+    """
+    resolver = getattr(request, '_permission_resolver', None)
+    if resolver is None or resolver.user != request.user:
+        resolver = ObjectPermissionResolver(request.user)
+        request._permission_resolver = resolver
+    return resolver
@@ -0,0 +1,16 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db.pool import get_pool_stats
+
+
+class DatabasePoolMetricsView(APIView):
+    """
+    View to report the database connection pool counters of the worker process
+    that serves the request, for staff and monitoring.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_pool_stats())
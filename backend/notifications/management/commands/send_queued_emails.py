@@ -0,0 +1,43 @@
+import json
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import BATCH_SIZE, get_outbox_metrics, prune_outbox, send_queued_emails
+
+logger = logging.getLogger(__name__)
+
+# Seconds between deletions of old sent and failed emails (see prune_outbox)
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Drain the outbound email queue, sending each batch over one mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Number of emails sent per batch.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the due emails once and exit.")
+        parser.add_argument('--stats', action='store_true', help="Print the queue metrics as JSON and exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(get_outbox_metrics()))
+            return
+
+        pruned_at = None
+        while True:
+            if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                pruned = prune_outbox()
+                if pruned:
+                    logger.info(f"Deleted {pruned} old sent and failed outbound emails")
+                pruned_at = time.monotonic()
+
+            processed = send_queued_emails(batch_size=options['batch_size'])
+            if processed:
+                logger.info(f"Processed {processed} outbound emails")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
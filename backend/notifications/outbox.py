@@ -0,0 +1,191 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'EMAIL_OUTBOX_RETRY_BACKOFF', 30)
+MAX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_DELAY', 3600)
+# Seconds a worker may hold claimed emails before another worker takes them over
+CLAIM_TIMEOUT = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 600)
+# Days sent and failed emails are kept before prune_outbox() deletes them
+RETENTION_DAYS = getattr(settings, 'EMAIL_OUTBOX_RETENTION_DAYS', 30)
+PRUNE_BATCH_SIZE = 1000
+
+
+def queue_email(subject, message, from_email, recipient_list):
+    """
+    Add an email to the outbox. Takes the same arguments, in the same order, as `send_mail`.
+
+    The row is written in the caller's transaction, so the email is only sent
+    if the change that triggered it is committed.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def queue_mass_email(datatuple):
+    """
+    Add many emails to the outbox in one insert. Takes the same datatuple as `send_mass_mail`.
+    """
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipients=list(recipient_list),
+        )
+        for subject, message, from_email, recipient_list in datatuple
+    ])
+
+
+def get_retry_delay(attempts):
+    """
+    Get the exponential backoff before the next delivery attempt.
+    """
+    return timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_queued_emails(batch_size=BATCH_SIZE):
+    """
+    Claim a batch of due emails for this worker, in a transaction of its own.
+
+    The emails are marked as sending until CLAIM_TIMEOUT has passed, so other
+    workers skip them without the rows staying locked while the mail server
+    is contacted. Emails still sending after that (their worker died) are
+    claimed again. Each claim counts as a delivery attempt, so an email that
+    keeps killing its worker is marked as failed after MAX_ATTEMPTS claims.
+    """
+    now = timezone.now()
+    due = Q(status=OutboundEmail.STATUS_PENDING) | Q(status=OutboundEmail.STATUS_SENDING)
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due, next_attempt_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        exhausted = [email.pk for email in batch if email.attempts >= MAX_ATTEMPTS]
+        if exhausted:
+            logger.error(f"Giving up on {len(exhausted)} outbound emails whose worker stopped while sending them")
+            OutboundEmail.objects.filter(pk__in=exhausted).update(
+                status=OutboundEmail.STATUS_FAILED,
+                last_error=f"The worker stopped while sending; gave up after {MAX_ATTEMPTS} attempts.",
+            )
+            batch = [email for email in batch if email.pk not in exhausted]
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status=OutboundEmail.STATUS_SENDING,
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT),
+            )
+            for email in batch:
+                email.status = OutboundEmail.STATUS_SENDING
+                email.attempts += 1
+    return batch
+
+
+def send_queued_emails(batch_size=BATCH_SIZE):
+    """
+    Deliver one batch of due emails over a single mail connection.
+
+    Returns:
+        int: The number of emails processed (sent or rescheduled).
+    """
+    batch = claim_queued_emails(batch_size)
+    if not batch:
+        return 0
+
+    now = timezone.now()
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.error(f"Could not open mail connection, retrying {len(batch)} emails later: {exc}")
+        for email in batch:
+            _record_failure(email, exc, now)
+        OutboundEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+        return len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients, connection=connection
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                logger.warning(f"Failed to send outbound email {email.pk}: {exc}")
+                _record_failure(email, exc, now)
+            else:
+                email.status = OutboundEmail.STATUS_SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return len(batch)
+
+
+def _record_failure(email, exc, now):
+    # The attempt was counted when the email was claimed
+    email.last_error = str(exc)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.STATUS_FAILED
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.next_attempt_at = now + get_retry_delay(email.attempts)
+
+
+def prune_outbox(retention_days=RETENTION_DAYS):
+    """
+    Delete the sent and failed emails queued more than `retention_days` ago, in small batches.
+
+    Returns:
+        int: The number of emails deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    old = OutboundEmail.objects.filter(
+        status__in=[OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_FAILED], created_at__lt=cutoff
+    )
+    deleted = 0
+    while True:
+        ids = list(old.values_list('pk', flat=True)[:PRUNE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += OutboundEmail.objects.filter(pk__in=ids).delete()[0]
+
+
+def get_outbox_metrics():
+    """
+    Get the queue depth and health of the outbox.
+    """
+    now = timezone.now()
+    pending = Q(status=OutboundEmail.STATUS_PENDING)
+    metrics = OutboundEmail.objects.aggregate(
+        pending=Count('id', filter=pending),
+        due=Count('id', filter=pending & Q(next_attempt_at__lte=now)),
+        retrying=Count('id', filter=pending & Q(attempts__gt=0)),
+        sending=Count('id', filter=Q(status=OutboundEmail.STATUS_SENDING)),
+        failed=Count('id', filter=Q(status=OutboundEmail.STATUS_FAILED)),
+        sent=Count('id', filter=Q(status=OutboundEmail.STATUS_SENT)),
+        oldest_pending=Min('created_at', filter=pending),
+    )
+    oldest_pending = metrics.pop('oldest_pending')
+    metrics['oldest_pending_age_seconds'] = (now - oldest_pending).total_seconds() if oldest_pending else 0
+    return metrics
@@ -0,0 +1,186 @@
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from organizations.models import Organization
+from .models import OutboundEmail
+from .outbox import (
+    CLAIM_TIMEOUT, MAX_ATTEMPTS, claim_queued_emails, get_outbox_metrics, prune_outbox, queue_email, queue_mass_email,
+    send_queued_emails,
+)
+
+User = get_user_model()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('Mail server unavailable')
+
+
+class StatusRecordingEmailBackend(BaseEmailBackend):
+    """
+    Records the stored status of the emails at the time they are sent.
+    """
+    statuses = []
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            row = OutboundEmail.objects.get(subject=message.subject)
+            self.statuses.append(row.status)
+        return len(email_messages)
+
+
+class QueueEmailTests(TestCase):
+
+    def test_queue_email_takes_send_mail_arguments(self):
+        email = queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        email.refresh_from_db()
+        self.assertEqual(email.from_email, 'sender@example.com')
+        self.assertEqual(email.recipients, ['to@example.com'])
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+
+    def test_missing_sender_defaults_to_the_default_from_email(self):
+        email = queue_email('Subject', 'Body', None, ['to@example.com'])
+        self.assertEqual(email.from_email, settings.DEFAULT_FROM_EMAIL)
+
+    def test_queue_mass_email_takes_send_mass_mail_datatuple(self):
+        queue_mass_email([
+            ('First', 'Body', 'sender@example.com', ['one@example.com']),
+            ('Second', 'Body', None, ['two@example.com', 'three@example.com']),
+        ])
+        self.assertEqual(
+            list(OutboundEmail.objects.order_by('id').values_list('from_email', 'recipients')),
+            [
+                ('sender@example.com', ['one@example.com']),
+                (settings.DEFAULT_FROM_EMAIL, ['two@example.com', 'three@example.com']),
+            ],
+        )
+
+    def test_creating_an_organization_queues_an_email_to_its_creator(self):
+        user = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        Organization.objects.create(name='Acme', created_by=user)
+        email = OutboundEmail.objects.get(subject='You have created a new organization')
+        self.assertEqual(email.recipients, ['admin@example.com'])
+        self.assertEqual(email.from_email, settings.DEFAULT_FROM_EMAIL)
+
+
+class SendQueuedEmailsTests(TestCase):
+
+    def test_due_emails_are_sent_and_marked_sent(self):
+        queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        self.assertEqual(send_queued_emails(), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].from_email, 'sender@example.com')
+        self.assertEqual(mail.outbox[0].to, ['to@example.com'])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(send_queued_emails(), 0)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.StatusRecordingEmailBackend')
+    def test_emails_are_claimed_before_they_are_sent(self):
+        StatusRecordingEmailBackend.statuses = []
+        queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        send_queued_emails()
+        self.assertEqual(StatusRecordingEmailBackend.statuses, [OutboundEmail.STATUS_SENDING])
+
+    def test_claimed_emails_are_skipped_until_the_claim_expires(self):
+        email = queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status=OutboundEmail.STATUS_SENDING, next_attempt_at=timezone.now() + timedelta(seconds=CLAIM_TIMEOUT)
+        )
+        self.assertEqual(send_queued_emails(), 0)
+
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(send_queued_emails(), 1)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_SENT)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingEmailBackend')
+    def test_failed_emails_are_retried_later_then_given_up(self):
+        email = queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        self.assertEqual(send_queued_emails(), 1)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('Mail server unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(send_queued_emails(), 0)
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            send_queued_emails()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+    def test_metrics_count_emails_by_state(self):
+        queue_email('Sent', 'Body', None, ['to@example.com'])
+        send_queued_emails()
+        queue_email('Pending', 'Body', None, ['to@example.com'])
+        metrics = get_outbox_metrics()
+        self.assertEqual((metrics['sent'], metrics['pending'], metrics['due'], metrics['sending']), (1, 1, 1, 0))
+
+    def test_reclaimed_emails_count_as_attempts_until_given_up(self):
+        email = queue_email('Subject', 'Body', 'sender@example.com', ['to@example.com'])
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            # The worker claims the email and dies while sending it
+            self.assertEqual([claimed.attempts for claimed in claim_queued_emails()], [attempt])
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim_queued_emails(), [])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_FAILED, MAX_ATTEMPTS))
+        self.assertIn('stopped while sending', email.last_error)
+
+
+class PruneOutboxTests(TestCase):
+
+    def test_old_sent_and_failed_emails_are_deleted(self):
+        statuses = [OutboundEmail.STATUS_SENT, OutboundEmail.STATUS_FAILED, OutboundEmail.STATUS_PENDING]
+        for status in statuses:
+            queue_email(f"Old {status}", 'Body', None, ['to@example.com'])
+            queue_email(f"New {status}", 'Body', None, ['to@example.com'])
+        OutboundEmail.objects.filter(subject__startswith='Old').update(created_at=timezone.now() - timedelta(days=31))
+        for status in statuses:
+            OutboundEmail.objects.filter(subject__endswith=status).update(status=status)
+
+        self.assertEqual(prune_outbox(retention_days=30), 2)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('subject', flat=True)),
+            ['New failed', 'New pending', 'New sent', 'Old pending'],
+        )
+
+
+class SendQueuedEmailsCommandTests(TestCase):
+
+    def test_draining_the_queue_does_not_compute_the_metrics(self):
+        queue_email('Subject', 'Body', None, ['to@example.com'])
+        with mock.patch('notifications.management.commands.send_queued_emails.get_outbox_metrics') as metrics:
+            call_command('send_queued_emails', '--once')
+        metrics.assert_not_called()
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_SENT)
+
+    def test_old_emails_are_pruned(self):
+        queue_email('Old', 'Body', None, ['to@example.com'])
+        OutboundEmail.objects.update(status=OutboundEmail.STATUS_SENT, created_at=timezone.now() - timedelta(days=365))
+        call_command('send_queued_emails', '--once')
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_stats_prints_the_metrics(self):
+        queue_email('Subject', 'Body', None, ['to@example.com'])
+        output = io.StringIO()
+        call_command('send_queued_emails', '--stats', stdout=output)
+        self.assertEqual(json.loads(output.getvalue())['pending'], 1)
@@ -0,0 +1,15 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .outbox import get_outbox_metrics
+
+
+class OutboxMetricsView(APIView):
+    """
+    View to report the outbound email queue depth, for staff and monitoring.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_outbox_metrics())
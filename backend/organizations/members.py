@@ -0,0 +1,41 @@
+from django.core.cache import caches
+
+MEMBER_CACHE_ALIAS = 'members'
+
+
+def get_member_list_key(organization, kind):
+    """
+    Build the cache key of one serialized member list of an organization.
+
+    The organization's revision is bumped by the Membership signals (and by
+    the bulk paths that bypass them), so a membership change moves readers to
+    a new key instead of deleting entries; old keys age out of the cache.
+    """
+    return f"org_members:{organization.pk}:{organization.revision}:{kind}"
+
+
+def get_member_list(organization, kind, build):
+    """
+    Get a serialized member list of an organization, building and caching it on a miss.
+
+    Args:
+        organization (Organization): The organization, with its current `revision`.
+        kind (str): Which representation is cached, e.g. 'users'.
+        build (callable): build() -> the serialized data, called on a miss.
+    """
+    cache = caches[MEMBER_CACHE_ALIAS]
+    key = get_member_list_key(organization, kind)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data)
+    return data
+
+
+def get_uncached_organizations(organizations, kind):
+    """
+    Get the organizations whose member list of the given kind is not cached, with one cache round trip.
+    """
+    keys = {get_member_list_key(organization, kind): organization for organization in organizations}
+    cached = caches[MEMBER_CACHE_ALIAS].get_many(list(keys))
+    return [organization for key, organization in keys.items() if key not in cached]
@@ -9,6 +9,10 @@ class Organization(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, related_name='created_organizations', on_delete=models.CASCADE)
+    # Bumped whenever the organization's detail payload may change (members, memberships); used for ETags
+    revision = models.PositiveIntegerField(default=1, editable=False)
+    # Last revision handed out to a change of its projects or comments; see projects.sync
+    sync_revision = models.PositiveBigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
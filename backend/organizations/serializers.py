@@ -1,8 +1,20 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from guardian.shortcuts import get_perms
+from .members import get_member_list, get_uncached_organizations
 from .models import Organization, Membership,PendingMembership
-from core.utils import get_user_all_permissions
+from core.utils import bump_revision, get_user_all_permissions, invalidate_organization_permissions, prefetch_user_all_permissions
+from notifications.outbox import queue_mass_email
+from activity.log import record_activity
+from activity.models import ActivityEvent
+from core.events import publish_event
 from django.db.models.signals import post_save
 
 User = get_user_model()
@@ -63,6 +75,25 @@ class PendingMembershipSerializer(serializers.ModelSerializer):
         return data
     
 class AddMembersSerializer(serializers.Serializer):
+    """
+    Invite a batch of emails to an organization.
+
+    Emails that already belong to a member or have a pending invitation are
+    skipped, existing users become members right away and everyone else gets
+    a pending membership and an invitation email through the outbox. All lookups and inserts are
+    set-based, so the cost does not grow with one query per email.
+    """
+    ADDED = 'added'
+    INVITED = 'invited'
+    ALREADY_MEMBER = 'already_member'
+    ALREADY_INVITED = 'already_invited'
+    STATUS_LABELS = [
+        (ADDED, 'added'),
+        (INVITED, 'invited'),
+        (ALREADY_MEMBER, 'already a member'),
+        (ALREADY_INVITED, 'already invited'),
+    ]
+
     emails = serializers.ListField(
         child=serializers.EmailField(),
         allow_empty=False,
@@ -70,41 +101,101 @@ class AddMembersSerializer(serializers.Serializer):
     )
     organization = serializers.PrimaryKeyRelatedField(queryset=Organization.objects.all())
 
-    def validate(self, data):
+    def validate_emails(self, emails):
         """
-        Check if each user in the list is already a member or has a pending invitation.
+        Normalize the emails to lowercase and drop duplicates, keeping their order.
         """
-        emails = data.get('emails')
-        organization = data.get('organization')
-        
-
-        # Validate each email
-        for email in emails:
-            if Membership.objects.filter(user__email__iexact=email, organization=organization).exists():
-                raise serializers.ValidationError(
-                    {"emails": f"The user with email {email} is already a member of this organization."}
-                )
-            if PendingMembership.objects.filter(email__iexact=email, organization=organization).exists():
-                raise serializers.ValidationError(
-                    {"emails": f"The user with email {email} has already been invited to join the organization."}
-                )
-
-        return data
+        return list(dict.fromkeys(email.strip().lower() for email in emails))
 
     def create(self, validated_data):
         """
-        Create pending memberships for each email.
+        Create memberships for existing users and pending memberships for the rest.
+
+        Returns:
+            list: One {'email', 'status'} result per requested email.
         """
         emails = validated_data.get('emails')
         organization = validated_data.get('organization')
-        created_memberships = []
+        role = settings.USER_ROLES['MEMBER']
+
+        with transaction.atomic():
+            member_emails = set(
+                Membership.objects.filter(organization=organization)
+                .annotate(email_lower=Lower('user__email'))
+                .filter(email_lower__in=emails)
+                .values_list('email_lower', flat=True)
+            )
+            pending_emails = set(
+                PendingMembership.objects.filter(organization=organization)
+                .annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails)
+                .values_list('email_lower', flat=True)
+            )
+            remaining = [email for email in emails if email not in member_emails and email not in pending_emails]
+            users = {
+                user.email_lower: user
+                for user in User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=remaining)
+            }
 
-        for email in emails:
-            # Save each membership individually to ensure primary key assignment and signal triggering
-            membership = PendingMembership.objects.create(email=email, organization=organization, role="member")
-            created_memberships.append(membership)
+            new_members = [users[email] for email in remaining if email in users]
+            invited_emails = [email for email in remaining if email not in users]
 
-        return created_memberships
+            # Bulk inserts skip the Membership/PendingMembership signals, so do their work here
+            Membership.objects.bulk_create([
+                Membership(user=user, organization=organization, role=role) for user in new_members
+            ])
+            if new_members:
+                member_group, _ = Group.objects.get_or_create(name=f"{organization.name}_Member")
+                member_group.user_set.add(*new_members)
+                invalidate_organization_permissions(organization.pk)
+                bump_revision(Organization.objects.filter(pk=organization.pk))
+                for user in new_members:
+                    record_activity(organization.pk, ActivityEvent.MEMBER_ADDED, user=user.pk, role=role)
+                publish_event(organization.pk, 'membership.created', users=[user.pk for user in new_members])
+
+            PendingMembership.objects.bulk_create([
+                PendingMembership(email=email, organization=organization, role=role) for email in invited_emails
+            ])
+
+            messages = [
+                (
+                    'You have been added to an organization',
+                    f'Hello {user.username},\n\nYou have been added as a {role} to the organization: {organization.name}.',
+                    settings.DEFAULT_FROM_EMAIL,
+                    [user.email],
+                )
+                for user in new_members
+            ] + [
+                (
+                    'You have been invited to be added to an organization',
+                    f'Hello dear,\n\nYou have been invited to be added as a {role} to the organization: {organization.name}. Register on the platform to join the organization.',
+                    settings.DEFAULT_FROM_EMAIL,
+                    [email],
+                )
+                for email in invited_emails
+            ]
+            queue_mass_email(messages)
+
+        statuses = {email: self.ALREADY_MEMBER for email in member_emails}
+        statuses.update({email: self.ALREADY_INVITED for email in pending_emails})
+        statuses.update({user.email_lower: self.ADDED for user in new_members})
+        statuses.update({email: self.INVITED for email in invited_emails})
+        return [{'email': email, 'status': statuses[email]} for email in emails]
+
+    @classmethod
+    def describe(cls, results):
+        """
+        Summarize the results of create() in a sentence, e.g. "2 added, 1 already a member."
+
+        Returns:
+            tuple: The message, and whether any membership or invitation was created.
+        """
+        counts = Counter(result['status'] for result in results)
+        summary = ', '.join(f"{counts[status]} {label}" for status, label in cls.STATUS_LABELS if counts[status])
+        created = bool(counts[cls.ADDED] or counts[cls.INVITED])
+        if not created:
+            return f"No memberships created: {summary}.", False
+        return f"{summary[0].upper()}{summary[1:]}.", True
 
 class RemoveMembershipSerializer(serializers.Serializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
@@ -122,6 +213,34 @@ class LeaveOrganizationSerializer(serializers.Serializer):
             raise serializers.ValidationError("The specified organization does not exist.")
         return value
 
+def get_memberships_prefetch():
+    """
+    Prefetch for an organization's memberships with their users, shared by the
+    organization list and detail views.
+    """
+    return Prefetch('user_memberships', queryset=Membership.objects.select_related('user').order_by('id'))
+
+
+class OrganizationListSerializer(serializers.ListSerializer):
+    """
+    List serializer that warms the current user's permission cache for the
+    whole list of organizations before they are serialized.
+    """
+
+    def to_representation(self, data):
+        request = self.context.get('request')
+        data = list(data.all() if isinstance(data, Manager) else data)
+        if request and request.user.is_authenticated:
+            prefetch_user_all_permissions(request.user, data)
+        # Load the memberships of the organizations whose member lists are not cached in one query
+        prefetch_related_objects(
+            [organization for organization in get_uncached_organizations(data, 'detail')
+             if 'user_memberships' not in getattr(organization, '_prefetched_objects_cache', {})],
+            get_memberships_prefetch(),
+        )
+        return super().to_representation(data)
+
+
 class OrganizationDetailSerializer(serializers.ModelSerializer):
     users = serializers.SerializerMethodField(read_only=True)
     user_permissions = serializers.SerializerMethodField(read_only=True)
@@ -131,13 +250,34 @@ class OrganizationDetailSerializer(serializers.ModelSerializer):
         model = Organization
         fields = ('id', 'name', 'description', 'created_at', 'created_by', 'users', 'user_permissions','user_memberships')
         read_only_fields = ('created_by', 'created_at')
+        list_serializer_class = OrganizationListSerializer
+
+    def get_memberships(self, obj):
+        """
+        Get the organization's memberships from the prefetch cache, loading it if the view did not.
+        """
+        if 'user_memberships' not in getattr(obj, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([obj], get_memberships_prefetch())
+        return obj.user_memberships.all()
+
+    def get_member_lists(self, obj):
+        """
+        Get the serialized users and memberships of the organization from the member list cache.
+        """
+        def build():
+            memberships = self.get_memberships(obj)
+            return {
+                'users': UserSerializer([membership.user for membership in memberships], many=True).data,
+                'user_memberships': MembershipSerializer(memberships, many=True).data,
+            }
+
+        return get_member_list(obj, 'detail', build)
 
     def get_users(self, obj):
         """
         Get all users who are members of the specified organization.
         """
-        users = User.objects.filter(memberships__organization=obj)
-        return UserSerializer(users, many=True).data
+        return self.get_member_lists(obj)['users']
 
     def get_user_permissions(self, obj):
         """
@@ -152,5 +292,4 @@ class OrganizationDetailSerializer(serializers.ModelSerializer):
         """
         Get the list of memberships for this organization.
         """
-        memberships = obj.user_memberships.all()  # Access the related memberships
-        return MembershipSerializer(memberships, many=True).data
\ No newline at end of file
+        return self.get_member_lists(obj)['user_memberships']
\ No newline at end of file
@@ -1,16 +1,24 @@
+import logging
+
 from django.db.models.signals import post_save,pre_save,post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
-from django.core.mail import send_mail
+from notifications.outbox import queue_email
 from django.conf import settings
+from guardian.models import GroupObjectPermission, UserObjectPermission
 from guardian.shortcuts import assign_perm, remove_perm
 from projects.models import Project
+from core.utils import bump_revision, invalidate_organization_permissions, is_login_update
+from activity.log import record_activity
+from activity.models import ActivityEvent
+from core.events import publish_event
 from .models import Organization, Membership,PendingMembership
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Organization)
@@ -30,13 +38,17 @@ def create_admin_membership(sender, instance, created, **kwargs):
             role=settings.USER_ROLES['ADMIN']
         )
         # Send an email notification to the organization creator
-        send_mail(
+        queue_email(
             'You have created a new organization',
             f'Hello {instance.created_by.username},\n\nYou have successfully created the organization: {instance.name}. You are now the admin of this organization.',
             settings.DEFAULT_FROM_EMAIL,
             [instance.created_by.email],
-            fail_silently=False,
         )
+    else:
+        # Group names are derived from the organization, so drop any cached permission sets
+        invalidate_organization_permissions(instance.pk)
+        bump_revision(Organization.objects.filter(pk=instance.pk))
+        publish_event(instance.pk, 'organization.updated')
 
 @receiver(post_save, sender=Membership)
 def handle_membership_creation(sender, instance, created, **kwargs):
@@ -54,13 +66,11 @@ def handle_membership_creation(sender, instance, created, **kwargs):
             instance.user.groups.add(member_group)
         
             # Send an email notification if the user is added as a member
-            print("send mail side")
-            send_mail(
+            queue_email(
                 'You have been added to an organization',
                 f'Hello {instance.user.username},\n\nYou have been added as a {instance.role} to the organization: {instance.organization.name}.',
                 settings.DEFAULT_FROM_EMAIL,
                 [instance.user.email],
-                fail_silently=False,
             )
         # assign_perm('organizations.remove_user', instance.user ,instance.user)
 
@@ -80,6 +90,12 @@ def handle_membership_update(sender, instance, **kwargs):
         member_group = Group.objects.get(name=f"{instance.organization.name}_Member")
 
         if previous_role != instance.role:
+            invalidate_organization_permissions(instance.organization_id)
+            record_activity(
+                instance.organization_id, ActivityEvent.MEMBER_ROLE_CHANGED,
+                user=instance.user_id, **{'from': previous_role, 'to': instance.role}
+            )
+
             # The role has changed; update the group membership accordingly
             if previous_role == settings.USER_ROLES['ADMIN']:
                 instance.user.groups.remove(admin_group)
@@ -102,10 +118,11 @@ def handle_membership_deletion(sender, instance, **kwargs):
 
     # Remove the user from both groups
     instance.user.groups.remove(admin_group, member_group)
+    invalidate_organization_permissions(instance.organization_id)
 
 
 from django.db import transaction
-from django.core.mail import send_mail
+from notifications.outbox import queue_email
 from django.conf import settings
 from django.contrib.auth.models import Group
 from django.dispatch import receiver
@@ -124,14 +141,14 @@ def handle_membership_creation(sender, instance, created, **kwargs):
             instance.user.groups.add(member_group)
         elif instance.role == settings.USER_ROLES['MEMBER']:
             instance.user.groups.add(member_group)
+        invalidate_organization_permissions(instance.organization_id)
 
         # Send an email notification if the user is added as a member
-        send_mail(
+        queue_email(
             'You have been added to an organization',
             f'Hello {instance.user.username},\n\nYou have been added as a {instance.role} to the organization: {instance.organization.name}.',
             settings.DEFAULT_FROM_EMAIL,
             [instance.user.email],
-            fail_silently=False,
         )
 
 @receiver(post_save, sender=PendingMembership)
@@ -152,16 +169,15 @@ def process_pending_membership(sender, instance, created, **kwargs):
                 instance.delete()
         except User.DoesNotExist:
             # Send invitation email if the user doesn't exist
-            send_mail(
+            queue_email(
                 'You have been invited to be added to an organization',
                 f'Hello dear,\n\nYou have been invited to be added as a {instance.role} to the organization: {instance.organization.name}. Register on the platform to join the organization.',
                 settings.DEFAULT_FROM_EMAIL,
                 [instance.email],
-                fail_silently=False,
             )
         except Exception as e:
             # Optional: log any unexpected errors for debugging
-            print(f"Error processing pending membership: {e}")
+            logger.error(f"Error processing pending membership: {e}")
 
             
 
@@ -180,3 +196,78 @@ def assign_pending_memberships_to_user(sender, instance, created, **kwargs):
             )
             # Optionally, delete the pending membership after conversion
             pending_membership.delete()
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def bump_organization_revision(sender, instance, **kwargs):
+    """
+    Give the organization a new revision when its member list changes, which changes its detail ETag.
+    """
+    bump_revision(Organization.objects.filter(pk=instance.organization_id))
+
+
+@receiver(post_save, sender=User)
+def bump_member_organizations_revision(sender, instance, created, **kwargs):
+    """
+    Organization details embed their members, so a profile edit changes them.
+    """
+    if not created and not is_login_update(kwargs.get('update_fields')):
+        bump_revision(Organization.objects.filter(user_memberships__user=instance))
+
+
+@receiver(post_save, sender=Membership)
+def record_member_added(sender, instance, created, **kwargs):
+    """
+    Log a new member in the organization's activity feed.
+    """
+    if created:
+        record_activity(instance.organization_id, ActivityEvent.MEMBER_ADDED, user=instance.user_id, role=instance.role)
+
+
+@receiver(post_delete, sender=Membership)
+def record_member_removed(sender, instance, **kwargs):
+    """
+    Log a removed member in the organization's activity feed.
+    """
+    record_activity(instance.organization_id, ActivityEvent.MEMBER_REMOVED, user=instance.user_id, role=instance.role)
+
+
+@receiver(post_save, sender=Membership)
+def publish_membership_change(sender, instance, created, **kwargs):
+    """
+    Tell the organization's event stream subscribers about a new member or a role change.
+    """
+    publish_event(
+        instance.organization_id, 'membership.created' if created else 'membership.updated', users=[instance.user_id]
+    )
+
+
+@receiver(post_delete, sender=Membership)
+def publish_membership_deletion(sender, instance, **kwargs):
+    """
+    Tell the organization's event stream subscribers about a removed member; the member's own stream ends.
+    """
+    publish_event(instance.organization_id, 'membership.deleted', users=[instance.user_id])
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def invalidate_permissions_on_override_change(sender, instance, **kwargs):
+    """
+    Drop the cached permission sets of the organization whose object gained or lost a guardian row.
+
+    Covers the explicit per-object overrides written with assign_perm() and
+    remove_perm(), on the organization itself or on one of its projects.
+    """
+    model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+    if model is Organization:
+        organization_id = int(instance.object_pk)
+    elif model is Project:
+        organization_id = Project.objects.filter(pk=instance.object_pk).values_list('organization_id', flat=True).first()
+    else:
+        return
+    if organization_id is not None:
+        invalidate_organization_permissions(organization_id)
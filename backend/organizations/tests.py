@@ -1,3 +1,272 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from guardian.shortcuts import assign_perm, remove_perm
+from rest_framework.test import APIClient
+
+from core.utils import PERMISSION_CACHE_ALIAS
+from notifications.models import OutboundEmail
+from .members import MEMBER_CACHE_ALIAS
+from .models import Membership, Organization, PendingMembership
+
+User = get_user_model()
+
+
+class OrganizationTestMixin:
+    """
+    An organization with an admin (its creator) and a member.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Membership.objects.create(user=self.member, organization=self.organization, role='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class OrganizationDetailETagTests(OrganizationTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"/organization/{self.organization.pk}/"
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_a_member_joins(self):
+        etag = self.get_etag()
+        newcomer = User.objects.create_user(username='newcomer', email='newcomer@example.com', password='test-password')
+        Membership.objects.create(user=newcomer, organization=self.organization, role='member')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_changes_when_a_member_edits_their_profile(self):
+        etag = self.get_etag()
+        self.member.first_name = 'Grace'
+        self.member.save()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_logins_do_not_change_the_etag(self):
+        etag = self.get_etag()
+        self.member.last_login = timezone.now()
+        self.member.save(update_fields=['last_login'])
+        self.assertEqual(self.get_etag(), etag)
+
+
+class NonMemberListTests(OrganizationTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"/organization/{self.organization.pk}/non-members/"
+
+    def follow(self, url):
+        usernames = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            usernames.extend(user['username'] for user in response.data['results'])
+            url = response.data['next']
+        return usernames
+
+    def test_pages_cover_every_non_member_by_username(self):
+        for username in ['dave', 'Carol', 'erin', 'bob', 'alice']:
+            User.objects.create_user(username=username, email=f"{username.lower()}@example.com", password='test-password')
+        self.assertEqual(self.follow(f"{self.url}?page_size=2"), ['alice', 'bob', 'Carol', 'dave', 'erin'])
+
+    def test_search_matches_username_or_email_prefixes(self):
+        User.objects.create_user(username='grace', email='hopper@example.com', password='test-password')
+        User.objects.create_user(username='hopkins', email='h@example.com', password='test-password')
+        User.objects.create_user(username='ada', email='ada@example.com', password='test-password')
+        self.assertEqual(self.follow(f"{self.url}?search=HOP"), ['grace', 'hopkins'])
+        self.assertEqual(self.follow(f"{self.url}?search=race"), [])
+
+    def test_search_results_are_paginated(self):
+        for index in range(5):
+            User.objects.create_user(username=f"sam{index}", email=f"sam{index}@example.com", password='test-password')
+        self.assertEqual(self.follow(f"{self.url}?search=sam&page_size=2"), [f"sam{index}" for index in range(5)])
+
+
+class OrganizationListTests(OrganizationTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for alias in [MEMBER_CACHE_ALIAS, PERMISSION_CACHE_ALIAS]:
+            self.addCleanup(caches[alias].clear)
+
+    def list_organizations(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/organization/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def cold_list_organizations(self):
+        for alias in [MEMBER_CACHE_ALIAS, PERMISSION_CACHE_ALIAS]:
+            caches[alias].clear()
+        return self.list_organizations()
+
+    def test_queries_do_not_grow_with_the_organizations(self):
+        few, _ = self.cold_list_organizations()
+        for index in range(3):
+            organization = Organization.objects.create(name=f"Team {index}", created_by=self.admin)
+            Membership.objects.create(user=self.member, organization=organization, role='member')
+        many, data = self.cold_list_organizations()
+        self.assertEqual(many, few)
+        self.assertEqual(len(data), 4)
+        for organization in data:
+            self.assertEqual(
+                sorted(user['email'] for user in organization['users']), ['admin@example.com', 'member@example.com']
+            )
+            self.assertIn('organizations.view_organization', organization['user_permissions'])
+
+    def test_cached_lists_only_query_the_organizations(self):
+        Organization.objects.create(name='Other', created_by=self.admin)
+        self.list_organizations()
+        count, data = self.list_organizations()
+        self.assertEqual(count, 1)
+        self.assertEqual(len(data), 2)
+
+    def test_member_only_sees_their_organizations(self):
+        Organization.objects.create(name='Other', created_by=self.admin)
+        self.client.force_authenticate(self.member)
+        _, data = self.list_organizations()
+        self.assertEqual([organization['name'] for organization in data], ['Acme'])
+        self.assertNotIn('organizations.add_user', data[0]['user_permissions'])
+
+
+class OrganizationPermissionOverrideTests(OrganizationTestMixin, TestCase):
+
+    def create_project(self):
+        return self.client.post('/project/', {'name': 'Website', 'organization': self.organization.pk}, format='json')
+
+    def test_granted_and_removed_overrides_apply_to_the_next_request(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.create_project().status_code, 403)
+
+        assign_perm('add_project', self.member, self.organization)
+        self.assertEqual(self.create_project().status_code, 201)
+
+        remove_perm('add_project', self.member, self.organization)
+        self.assertEqual(self.create_project().status_code, 403)
+
+
+class AddMembersTests(OrganizationTestMixin, TestCase):
+
+    def add_members(self, emails):
+        return self.client.post(
+            '/organization/add_member', {'emails': emails, 'organization': self.organization.pk}, format='json'
+        )
+
+    def test_each_email_gets_a_status(self):
+        User.objects.create_user(username='grace', email='Grace@Example.com', password='test-password')
+        PendingMembership.objects.create(email='pending@example.com', organization=self.organization, role='member')
+        OutboundEmail.objects.all().delete()
+
+        response = self.add_members([
+            'GRACE@example.com', 'member@EXAMPLE.com', 'Pending@example.com', 'new@example.com', 'grace@example.com',
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['results'], [
+            {'email': 'grace@example.com', 'status': 'added'},
+            {'email': 'member@example.com', 'status': 'already_member'},
+            {'email': 'pending@example.com', 'status': 'already_invited'},
+            {'email': 'new@example.com', 'status': 'invited'},
+        ])
+        self.assertEqual(response.data['message'], "1 added, 1 invited, 1 already a member, 1 already invited.")
+        self.assertTrue(Membership.objects.filter(user__username='grace', organization=self.organization).exists())
+        self.assertEqual(
+            sorted(PendingMembership.objects.values_list('email', flat=True)), ['new@example.com', 'pending@example.com']
+        )
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipients', flat=True)), [['Grace@example.com'], ['new@example.com']]
+        )
+
+    def test_emails_are_queued_in_one_call(self):
+        User.objects.create_user(username='grace', email='grace@example.com', password='test-password')
+        with mock.patch('organizations.serializers.queue_mass_email') as queue_mass_email:
+            self.add_members(['grace@example.com', 'one@example.com', 'two@example.com'])
+        queue_mass_email.assert_called_once()
+        self.assertEqual(len(queue_mass_email.call_args.args[0]), 3)
+
+    def test_nothing_to_do_is_reported(self):
+        PendingMembership.objects.create(email='pending@example.com', organization=self.organization, role='member')
+        response = self.add_members(['member@example.com', 'admin@example.com', 'pending@example.com'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['already_member', 'already_member', 'already_invited'],
+        )
+        self.assertEqual(response.data['message'], "No memberships created: 2 already a member, 1 already invited.")
+
+
+class MemberListCacheTests(OrganizationTestMixin, TestCase):
+
+    def setUp(self):
+        caches[MEMBER_CACHE_ALIAS].clear()
+        self.addCleanup(caches[MEMBER_CACHE_ALIAS].clear)
+        super().setUp()
+        self.url = f"/organization/{self.organization.pk}/users/"
+        self.newcomer = User.objects.create_user(username='newcomer', email='newcomer@example.com', password='test-password')
+
+    def member_emails(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return sorted(user['email'] for user in response.data)
+
+    def detail_emails(self):
+        response = self.client.get(f"/organization/{self.organization.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return sorted(user['email'] for user in response.data['users'])
+
+    def test_cached_list_skips_the_member_query(self):
+        self.member_emails()
+        # Only the organization is loaded
+        with self.assertNumQueries(1):
+            self.assertEqual(self.member_emails(), ['admin@example.com', 'member@example.com'])
+
+    def test_added_member_is_listed(self):
+        self.member_emails()
+        self.detail_emails()
+        Membership.objects.create(user=self.newcomer, organization=self.organization, role='member')
+        expected = ['admin@example.com', 'member@example.com', 'newcomer@example.com']
+        self.assertEqual(self.member_emails(), expected)
+        self.assertEqual(self.detail_emails(), expected)
+
+    def test_removed_member_is_no_longer_listed(self):
+        self.member_emails()
+        self.detail_emails()
+        response = self.client.post(
+            '/organization/remove-member', {'organization': self.organization.pk, 'user': self.member.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.member_emails(), ['admin@example.com'])
+        self.assertEqual(self.detail_emails(), ['admin@example.com'])
+
+    def test_member_leaving_is_no_longer_listed(self):
+        self.member_emails()
+        self.client.force_authenticate(self.member)
+        response = self.client.post('/organization/leave-organization', {'organization_id': self.organization.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.member_emails(), ['admin@example.com'])
 
-# Create your tests here.
+    def test_other_organizations_keep_their_entries(self):
+        other = Organization.objects.create(name='Other', created_by=self.admin)
+        other_url = f"/organization/{other.pk}/users/"
+        self.client.get(other_url)
+        Membership.objects.create(user=self.newcomer, organization=self.organization, role='member')
+        with self.assertNumQueries(1):
+            self.client.get(other_url)
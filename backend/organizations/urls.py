@@ -1,4 +1,5 @@
 from django.urls import path
+from core.async_views import as_view
 from .views import OrganizationListCreateView,AddMemberView,RemoveMemberView,LeaveOrganizationView,ListOrganizationUsersView,OrganizationDetailView,ListUsersNotInOrganizationView
 
 urlpatterns=[
@@ -8,5 +9,5 @@ urlpatterns=[
     path("leave-organization",LeaveOrganizationView.as_view(),name="leave_organization"),
     path('<int:organization_id>/users/', ListOrganizationUsersView.as_view(), name='list_organization_users'),
     path('<int:organization_id>/non-members/', ListUsersNotInOrganizationView.as_view(), name='list_organization_not_users'),
-    path('<int:organization_id>/', OrganizationDetailView.as_view(), name='organization_detail'),
+    path('<int:organization_id>/', as_view(OrganizationDetailView), name='organization_detail'),
 ]
\ No newline at end of file
@@ -1,13 +1,21 @@
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.contrib.auth import get_user_model
 from rest_framework import generics, permissions,serializers,status
 from rest_framework.response import Response
+from core.context import get_request_context
+from core.etags import ConditionalRetrieveMixin, make_etag
 from core.permissions import IsOrganizationAdmin,IsOrganizationAdminOrSelf,CanAddProjectPermission,CanRemoveUserPermission,CanAddUserPermission,CanViewOrganizationPermission
+from core.pagination import KeysetCursorPagination
+from core.utils import get_anonymous_user_id, get_organization_permission_version
+from .members import get_member_list
 from .models import Organization, Membership
 from users.serializers import UserDetailSerializer
 from .serializers import  MembershipSerializer,PendingMembershipSerializer,RemoveMembershipSerializer,LeaveOrganizationSerializer,OrganizationDetailSerializer,AddMembersSerializer
-from guardian.utils import get_anonymous_user
 
 
 User = get_user_model()
@@ -23,10 +31,13 @@ class OrganizationListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         # Return organizations where the current user is a member
+        # The serializer loads the memberships of the organizations missing from the member list cache
         return Organization.objects.filter(user_memberships__user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        # The organization, its admin membership and the queued emails are committed together
+        with transaction.atomic():
+            serializer.save(created_by=self.request.user)
     
 
 class AddMemberView(generics.CreateAPIView):
@@ -39,8 +50,11 @@ class AddMemberView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response({"message": "Pending memberships created successfully."}, status=status.HTTP_201_CREATED)
+        results = serializer.save()
+        message, created = serializer.describe(results)
+        return Response(
+            {"message": message, "results": results}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
 
 class RemoveMemberView(generics.CreateAPIView):
@@ -86,44 +100,92 @@ class ListOrganizationUsersView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserDetailSerializer
 
-    def get_queryset(self):
+    def get_organization(self):
         # Get the organization ID from the request parameters
         organization_id = self.kwargs.get('organization_id')
 
-        organization = get_object_or_404(Organization, id=organization_id)
+        return get_object_or_404(Organization, id=organization_id)
+
+    def get_queryset(self, organization=None):
+        return User.objects.filter(memberships__organization=organization or self.get_organization())
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the member list from the member list cache, keyed by the organization's revision.
+        """
+        organization = self.get_organization()
+        data = get_member_list(
+            organization, 'users', lambda: self.get_serializer(self.get_queryset(organization), many=True).data
+        )
+        return Response(data)
+
+
+def prefix_filter(field, prefix):
+    """
+    Match rows whose `field` starts with `prefix`.
 
-        return User.objects.filter(memberships__organization=organization)
+    The range condition lets the database seek an ordinary index on the
+    column; LIKE prefix lookups can only use one built with a pattern operator
+    class. The startswith keeps the match exact under any collation.
+    """
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper_bound, f'{field}__startswith': prefix})
 
 
 class ListUsersNotInOrganizationView(generics.ListAPIView):
     """
-    View to list all users not in a specific organization, excluding anonymous users.
+    View to list the users not in a specific organization, excluding the anonymous user.
+
+    Users come in pages ordered by lowercase username, and `?search=` keeps
+    those whose username or email starts with the given text. Both are served
+    by the lowercase indexes on the user table and members are left out with a
+    NOT EXISTS anti-join, so a page costs the same however many users there are.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserDetailSerializer
+    pagination_class = KeysetCursorPagination
+
+    def get_pagination_ordering(self):
+        return ('username_lower', 'id')
 
     def get_queryset(self):
         # Get the organization ID from the request parameters
         organization_id = self.kwargs.get('organization_id')
         organization = get_object_or_404(Organization, id=organization_id)
 
-        # Get the anonymous user instance
-        anonymous_user = get_anonymous_user()
+        memberships = Membership.objects.filter(organization=organization, user=OuterRef('pk'))
+        queryset = User.objects.annotate(
+            username_lower=Lower('username'), email_lower=Lower('email')
+        ).filter(~Exists(memberships)).exclude(id=get_anonymous_user_id()).only(
+            'id', 'username', 'email', 'first_name', 'last_name'
+        )
 
-        # Exclude users who are part of the organization and the anonymous user
-        return User.objects.exclude(
-            memberships__organization=organization
-        ).exclude(id=anonymous_user.id)
+        search = self.request.query_params.get('search', '').strip().lower()
+        if search:
+            queryset = queryset.filter(prefix_filter('username_lower', search) | prefix_filter('email_lower', search))
+        return queryset
 
 
-class OrganizationDetailView(generics.RetrieveAPIView):
+class OrganizationDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     """
     View to get organization details, the list of users, and the permissions
     the current user has in the organization.
+
+    Responses carry an ETag, and a matching If-None-Match gets a 304 before
+    the member list is loaded.
     """
     permission_classes = [permissions.IsAuthenticated,CanViewOrganizationPermission]
     serializer_class = OrganizationDetailSerializer
 
     def get_object(self):
-        organization_id = self.kwargs.get('organization_id')
-        return get_object_or_404(Organization, id=organization_id)
\ No newline at end of file
+        # The permission check has already loaded the organization into the request context
+        organization = get_request_context(self.request).get_organization(self.kwargs.get('organization_id'))
+        if organization is None:
+            raise Http404("No Organization matches the given query.")
+        return organization
+
+    def get_etag(self, organization):
+        return make_etag(
+            'organization', organization.pk, organization.revision,
+            get_organization_permission_version(organization.pk), self.request.user.pk,
+        )
\ No newline at end of file
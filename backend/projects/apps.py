@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProjectsConfig(AppConfig):
@@ -7,3 +8,4 @@ class ProjectsConfig(AppConfig):
 
     def ready(self):
         import projects.signals
+        post_migrate.connect(projects.signals.install_search_backend, sender=self)
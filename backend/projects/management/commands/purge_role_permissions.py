@@ -0,0 +1,61 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from core.policy import PROJECT_ADMIN_PERMISSIONS, PROJECT_ASSIGNEE_PERMISSIONS
+from core.utils import invalidate_organization_permissions
+from organizations.models import Organization
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the per-project guardian rows that older releases wrote for organization "
+        "admins and assignees. Those permissions are now derived from roles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be deleted.")
+
+    def handle(self, *args, **options):
+        content_type = ContentType.objects.get_for_model(Project)
+        group_rows = 0
+        user_rows = 0
+
+        with transaction.atomic():
+            for organization in Organization.objects.only('id', 'name').iterator():
+                projects = list(
+                    Project.objects.filter(organization=organization).values_list('pk', 'assigned_to_id')
+                )
+                if not projects:
+                    continue
+
+                admin_rows = GroupObjectPermission.objects.filter(
+                    content_type=content_type,
+                    object_pk__in=[str(pk) for pk, _ in projects],
+                    group__name=f"{organization.name}_Admin",
+                    permission__codename__in=PROJECT_ADMIN_PERMISSIONS,
+                )
+                assignee_rows = UserObjectPermission.objects.none()
+                for pk, assigned_to_id in projects:
+                    if assigned_to_id:
+                        assignee_rows |= UserObjectPermission.objects.filter(
+                            content_type=content_type,
+                            object_pk=str(pk),
+                            user_id=assigned_to_id,
+                            permission__codename__in=PROJECT_ASSIGNEE_PERMISSIONS,
+                        )
+
+                if options['dry_run']:
+                    group_rows += admin_rows.count()
+                    user_rows += assignee_rows.count()
+                    continue
+                group_rows += admin_rows.delete()[0]
+                user_rows += assignee_rows.delete()[0]
+                invalidate_organization_permissions(organization.pk)
+
+        action = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {group_rows} admin group rows and {user_rows} assignee rows."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.stats import count_projects, get_stored_counts, rebuild_project_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-organization project counters from the project table, or check them with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only compare the counters with the projects and report drift.")
+        parser.add_argument('--organization', type=int, action='append', dest='organizations',
+                            help="Limit to this organization id; repeat for several.")
+
+    def handle(self, *args, **options):
+        organization_ids = options['organizations']
+
+        if not options['check']:
+            written = rebuild_project_stats(organization_ids)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} project counters."))
+            return
+
+        expected = count_projects(organization_ids)
+        stored = get_stored_counts(organization_ids)
+        drift = sorted(key for key in expected.keys() | stored.keys() if expected.get(key, 0) != stored.get(key, 0))
+        for organization_id, status, priority in drift:
+            self.stdout.write(
+                f"organization {organization_id} {status}/{priority}: "
+                f"stored {stored.get((organization_id, status, priority), 0)}, "
+                f"actual {expected.get((organization_id, status, priority), 0)}"
+            )
+        if drift:
+            raise CommandError(f"{len(drift)} project counters are out of date; run rebuild_project_stats to fix them.")
+        self.stdout.write(self.style.SUCCESS("All project counters match the projects."))
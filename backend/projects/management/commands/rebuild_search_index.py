@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from projects.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every project."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of projects indexed per batch.")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.install()
+
+        batch_size = options['batch_size']
+        batch = []
+        total = 0
+        for project in Project.objects.select_related('assigned_to').iterator(chunk_size=batch_size):
+            batch.append(project)
+            if len(batch) >= batch_size:
+                backend.update(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            backend.update(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} projects with {type(backend).__name__}."))
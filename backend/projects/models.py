@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from organizations.models import Organization
+from .search import SearchVectorIndex
 
 class Project(models.Model):
     # Convert the dictionary to a list of tuples
@@ -15,12 +17,30 @@ class Project(models.Model):
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='assigned_projects', on_delete=models.SET_NULL, blank=True, null=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='created_projects', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Full-text document maintained by projects.search on PostgreSQL; unused on other databases
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    # The organization's sync revision at the project's last change (projects.sync): set on every save,
+    # comment and assignee profile edit; used for ETags and for the changes feed
+    revision = models.PositiveBigIntegerField(default=0, editable=False)
 
     class Meta:
         permissions = [
             ("update_project_status", "Can update the status of the project"),
             ("can_comment", "Can add comments to the project"),
         ]
+        indexes = [
+            # Backs the keyset pagination of the project list on (created_at, id)
+            models.Index(fields=['organization', 'created_at', 'id'], name='project_org_created_idx'),
+            # Backs the changes feed, which reads the projects changed after a revision
+            models.Index(fields=['organization', 'revision'], name='project_org_revision_idx'),
+            # Backs full-text search on PostgreSQL (projects.search)
+            SearchVectorIndex(fields=['search_vector'], name='project_search_vector_gin'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the sync revision taken in pre_save and the row write in one transaction (see projects.sync)
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -32,5 +52,56 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the per-project comment feed and the comment annotations of the project list
+            models.Index(fields=['project', 'created_at', 'id'], name='comment_project_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the comment and the new revision of its project in one transaction (see projects.sync)
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Comment by {self.user} on {self.project}"
+
+
+class ProjectTombstone(models.Model):
+    """
+    Marker of a project deleted from (or moved out of) an organization, for the changes feed.
+
+    Takes a revision from the same counter as project changes, so clients
+    syncing from a revision learn about deletions in order with the updates.
+    """
+    organization = models.ForeignKey(Organization, related_name='project_tombstones', on_delete=models.CASCADE)
+    project_id = models.BigIntegerField()
+    revision = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'revision'], name='tombstone_org_revision_idx'),
+        ]
+
+    def __str__(self):
+        return f"Project {self.project_id} deleted from {self.organization_id} at revision {self.revision}"
+
+
+class OrganizationProjectStats(models.Model):
+    """
+    Number of projects of an organization per (status, priority) pair.
+
+    Maintained incrementally by the project signals (see projects.stats), so
+    dashboards read a handful of rows instead of counting projects.
+    """
+    organization = models.ForeignKey(Organization, related_name='project_stats', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Project.PRIORITY_CHOICES)
+    project_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('organization', 'status', 'priority')
+
     def __str__(self):
-        return f"Comment by {self.user} on {self.project}"
\ No newline at end of file
+        return f"{self.organization} - {self.status}/{self.priority}: {self.project_count}"
@@ -0,0 +1,197 @@
+import logging
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection
+from django.db.models import F, FloatField, Index, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+logger = logging.getLogger(__name__)
+
+# Letters, digits and underscores only; everything else separates search terms
+SEARCH_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = 'projects_project_fts'
+
+
+def get_search_terms(query):
+    """
+    Split a raw search string into the terms that are matched as prefixes.
+    """
+    return SEARCH_TERM_PATTERN.findall(query.lower())
+
+
+def get_project_document(project):
+    """
+    Get the (name, description, people) texts indexed for a project.
+    """
+    user = project.assigned_to
+    people = ''
+    if user is not None:
+        people = ' '.join(filter(None, [user.username, user.email, user.first_name, user.last_name]))
+    return project.name or '', project.description or '', people
+
+
+class SearchVectorIndex(GinIndex):
+    """
+    GIN index of `Project.search_vector`, declared on the model so migrations manage it.
+
+    Other databases get a plain index instead: the column is unused there,
+    and they cannot create GIN indexes.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class IcontainsSearchBackend:
+    """
+    Fallback backend for databases without full-text support: unindexed `icontains` matching.
+    """
+    rank_annotation = None
+
+    def install(self):
+        pass
+
+    def update(self, projects):
+        pass
+
+    def remove(self, project_ids):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(assigned_to__username__icontains=query) |
+            Q(assigned_to__email__icontains=query) |
+            Q(assigned_to__first_name__icontains=query) |
+            Q(assigned_to__last_name__icontains=query)
+        )
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search on PostgreSQL using the `Project.search_vector` column and its GIN index.
+
+    Project names are weighted above descriptions and assignee details when ranking.
+    """
+    rank_annotation = 'search_rank'
+
+    def install(self):
+        # The GIN index is declared on the model (SearchVectorIndex)
+        pass
+
+    def update(self, projects):
+        from django.contrib.postgres.search import SearchVector
+        from .models import Project
+
+        # Name and description are read from the row itself, so one UPDATE covers
+        # every project sharing the same assignee details
+        project_ids_by_people = {}
+        for project in projects:
+            people = get_project_document(project)[2]
+            project_ids_by_people.setdefault(people, []).append(project.pk)
+
+        for people, project_ids in project_ids_by_people.items():
+            Project.objects.filter(pk__in=project_ids).update(
+                search_vector=(
+                    SearchVector('name', weight='A') +
+                    SearchVector('description', weight='B') +
+                    SearchVector(Value(people, output_field=TextField()), weight='B')
+                )
+            )
+
+    def remove(self, project_ids):
+        # The vector lives on the project row and goes away with it
+        pass
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        terms = get_search_terms(query)
+        if not terms:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        search_query = SearchQuery(' & '.join(f"{term}:*" for term in terms), search_type='raw')
+        # Cast the real returned by ts_rank to double precision so it round-trips through cursors exactly
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+
+
+class SqliteSearchBackend:
+    """
+    Full-text search on SQLite using an FTS5 shadow table keyed by project id.
+    """
+    rank_annotation = 'search_rank'
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(name, description, people, tokenize='unicode61')"
+            )
+
+    def update(self, projects):
+        rows = [(project.pk, *get_project_document(project)) for project in projects]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, people) VALUES (%s, %s, %s, %s)", rows
+            )
+
+    def remove(self, project_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in project_ids])
+
+    def search(self, queryset, query):
+        terms = get_search_terms(query)
+        if not terms:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        table = queryset.model._meta.db_table
+        # bm25() is lower for better matches; negate it so higher ranks come first like on PostgreSQL
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    Get the search backend matching the default database, falling back to
+    `icontains` matching when full-text search is not available.
+    """
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and _sqlite_supports_fts5():
+            _backend = SqliteSearchBackend()
+        else:
+            _backend = IcontainsSearchBackend()
+    return _backend
+
+
+def _sqlite_supports_fts5():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            return bool(cursor.fetchone()[0])
+    except Exception:
+        logger.warning("Could not detect FTS5 support; project search falls back to icontains.")
+        return False
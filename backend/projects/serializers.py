@@ -1,18 +1,44 @@
 from rest_framework import serializers
-from core.utils import get_user_permissions_for_instance 
-from organizations.models import Membership
+from core.context import get_request_context
+from core.fieldsets import SparseFieldsetMixin
+from core.utils import get_permission_resolver
+from django.contrib.auth import get_user_model
+from organizations.models import Membership, Organization
 from .models import Project,Comment
 from users.serializers import UserDetailSerializer
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(serializers.ListSerializer):
+    """
+    List serializer that loads the user's permissions for the whole page of
+    projects in bulk before the individual projects are serialized.
+    """
+
+    def to_representation(self, data):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and 'user_permissions' in self.child.fields:
+            data = get_permission_resolver(request).prefetch(data)
+        return super().to_representation(data)
+
+
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Project representation; GETs can ask for a subset with `?fields=` and `?expand=` (see core.fieldsets).
+    """
     user_permissions = serializers.SerializerMethodField(read_only=True)
     user = UserDetailSerializer(read_only=True, source='assigned_to')
+    # Annotated by the project list view; left out of responses where the annotations are missing
+    comment_count = serializers.IntegerField(read_only=True)
+    last_comment_at = serializers.DateTimeField(read_only=True)
     class Meta:
         model = Project
-        fields = '__all__'
+        exclude = ['search_vector', 'revision']
         extra_fields = ['user_permissions','user']
         read_only_fields = ['created_by']
+        list_serializer_class = ProjectListSerializer
+        expandable_fields = ['user', 'user_permissions']
+        # Model fields read by the permission resolver (role and assignee permissions)
+        field_sources = {'user_permissions': ['organization', 'assigned_to']}
 
     def get_user_permissions(self, obj):
         """
@@ -20,7 +46,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return get_user_permissions_for_instance(request.user, obj)
+            return get_permission_resolver(request).get_permissions(obj)
         return []
     
     def validate(self, data):
@@ -36,7 +62,11 @@ class ProjectSerializer(serializers.ModelSerializer):
 
         # If assigned_user is provided, ensure they are part of the organization
         if assigned_user:
-            is_member = Membership.objects.filter(user=assigned_user, organization=organization).exists()
+            request = self.context.get('request')
+            if request is not None:
+                is_member = get_request_context(request).is_member(organization, assigned_user)
+            else:
+                is_member = Membership.objects.filter(user=assigned_user, organization=organization).exists()
             if not is_member:
                 raise serializers.ValidationError({"assigned_to": "The user must be a member of the organization to be assigned to this project."})
 
@@ -57,11 +87,54 @@ class ProjectStatusSerializer(serializers.ModelSerializer):
         return data
 
 class CommentSerializer(serializers.ModelSerializer):
+    author = UserDetailSerializer(read_only=True, source='user')
     class Meta:
         model = Comment
-        fields = ['id', 'project', 'user', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'project', 'user', 'author', 'content', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at', 'user']
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class ProjectImportSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one row of a bulk project import (see projects.transfer).
+    Assignees are checked against the organization's members, passed in the
+    context as a {user id: user} dict, so validating rows runs no queries.
+    """
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Project
+        fields = ['name', 'description', 'status', 'priority', 'assigned_to']
+
+    def validate_assigned_to(self, value):
+        if value is None:
+            return None
+        user = self.context['members'].get(value)
+        if user is None:
+            raise serializers.ValidationError("The user must be a member of the organization to be assigned to this project.")
+        return user
+
+
+class ReassignProjectsSerializer(serializers.Serializer):
+    """
+    Serializer for moving the projects of one assignee to another member of the organization.
+    """
+    organization = serializers.PrimaryKeyRelatedField(queryset=Organization.objects.all())
+    from_user = serializers.PrimaryKeyRelatedField(queryset=get_user_model().objects.all())
+    to_user = serializers.PrimaryKeyRelatedField(queryset=get_user_model().objects.all(), allow_null=True)
+    projects = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, data):
+        """
+        Ensure the new assignee is a different user and a member of the organization.
+        """
+        to_user = data['to_user']
+        if to_user is not None:
+            if to_user == data['from_user']:
+                raise serializers.ValidationError({"to_user": "The projects are already assigned to this user."})
+            if not get_request_context(self.context['request']).is_member(data['organization'], to_user):
+                raise serializers.ValidationError({"to_user": "The user must be a member of the organization to be assigned to its projects."})
+        return data
@@ -0,0 +1,83 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from guardian.models import UserObjectPermission
+
+from activity.log import record_activity
+from activity.models import ActivityEvent
+from core.events import publish_event
+from core.policy import PROJECT_ASSIGNEE_PERMISSIONS
+from core.utils import invalidate_organization_permissions
+from .models import Project
+from .search import get_search_backend
+from .sync import allocate_revisions, update_with_revisions
+
+
+def reassign_projects(organization, from_user, to_user, project_ids=None):
+    """
+    Move the projects assigned to `from_user` in an organization to `to_user` in one transaction.
+
+    The projects are updated with one UPDATE per batch, so the per-instance project
+    signals do not run; their work is done here in bulk instead: the previous
+    assignee's explicit permission rows are deleted with one query, the
+    organization's permission cache is invalidated once, the search
+    documents are reindexed as a batch, new sync revisions are set in
+    the same UPDATE, the activity events are inserted together on commit and one
+    change event names all the moved projects. The new assignee needs no
+    rows, as assignee permissions are derived from roles (see core.policy).
+
+    Args:
+        organization (Organization): The organization whose projects are moved.
+        from_user (User): The current assignee.
+        to_user (User or None): The new assignee, or None to unassign the projects.
+        project_ids (list, optional): Only move these projects. Ids that are not
+            assigned to `from_user` in the organization are reported as skipped.
+
+    Returns:
+        dict: A summary with the moved and skipped project ids and the number
+        of permission rows removed.
+    """
+    with transaction.atomic():
+        queryset = Project.objects.filter(organization=organization, assigned_to=from_user)
+        if project_ids is not None:
+            queryset = queryset.filter(pk__in=project_ids)
+        # Lock the rows so a concurrent edit cannot reassign them halfway through
+        moved_ids = list(queryset.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        removed_permissions = 0
+        if moved_ids:
+            # The UPDATE moves the projects and gives each its own sync revision (see projects.sync)
+            first_revision = allocate_revisions(organization.pk, len(moved_ids))
+            update_with_revisions(Project.objects.all(), moved_ids, first_revision, assigned_to=to_user)
+
+            content_type = ContentType.objects.get_for_model(Project)
+            removed_permissions, _ = UserObjectPermission.objects.filter(
+                user=from_user,
+                content_type=content_type,
+                object_pk__in=[str(pk) for pk in moved_ids],
+                permission__codename__in=PROJECT_ASSIGNEE_PERMISSIONS,
+            ).delete()
+
+            invalidate_organization_permissions(organization.pk)
+            get_search_backend().update(Project.objects.filter(pk__in=moved_ids).select_related('assigned_to'))
+            to_user_id = to_user.pk if to_user is not None else None
+            for pk in moved_ids:
+                record_activity(
+                    organization.pk, ActivityEvent.PROJECT_REASSIGNED, project_id=pk,
+                    **{'from': from_user.pk, 'to': to_user_id}
+                )
+            publish_event(organization.pk, 'project.updated', ids=moved_ids)
+
+    skipped_ids = []
+    if project_ids is not None:
+        moved = set(moved_ids)
+        skipped_ids = sorted({pk for pk in project_ids if pk not in moved})
+
+    return {
+        'organization': organization.pk,
+        'from_user': from_user.pk,
+        'to_user': to_user.pk if to_user is not None else None,
+        'reassigned': len(moved_ids),
+        'projects': moved_ids,
+        'skipped': skipped_ids,
+        'permissions_removed': removed_permissions,
+    }
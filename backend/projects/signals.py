@@ -1,75 +1,246 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from django.contrib.auth.models import Group
-from guardian.shortcuts import assign_perm, remove_perm
-from .models import Project
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from guardian.models import UserObjectPermission
+from core.policy import PROJECT_ASSIGNEE_PERMISSIONS, delete_project_object_permissions, get_project_viewer_ids
+from core.utils import invalidate_organization_permissions, is_login_update
+from activity.log import record_activity
+from activity.models import ActivityEvent
+from core.events import publish_event
+from organizations.models import Organization
+from .models import Comment, Project, ProjectTombstone
+from .search import get_search_backend
+from .stats import adjust_project_stats
+from .sync import add_tombstones, allocate_revisions, stamp_project_queryset, stamp_projects
 
+User = get_user_model()
 
-@receiver(post_save, sender=Project)
-def assign_project_group_permissions(sender, instance, created, **kwargs):
+
+@receiver(pre_save, sender=Project)
+def remember_previous_project_state(sender, instance, **kwargs):
     """
-    Assign permissions to the 'Admin' and 'Member' groups, and to the assigned user.
+    Load the stored assignee, organization, status and priority of a project
+    being updated, for the receivers below that react to changes.
     """
-    # Get the groups for the organization
-    admin_group = Group.objects.get(name=f"{instance.organization.name}_Admin")
-    member_group = Group.objects.get(name=f"{instance.organization.name}_Member")
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = Project.objects.filter(pk=instance.pk).values(
+            'assigned_to_id', 'organization_id', 'status', 'priority', 'revision'
+        ).first()
 
-    if created:
-        # Assign permissions to admin group for the project instance
-        assign_perm('view_project', admin_group, instance)
-        assign_perm('change_project', admin_group, instance)
-        assign_perm('delete_project', admin_group, instance)
-        assign_perm('update_project_status', admin_group, instance)
-        assign_perm('can_comment', admin_group, instance)
 
-        # Assign 'change_project' and 'update_project_status' permissions to the assigned user
-        if instance.assigned_to:
-            assign_perm('view_project', instance.assigned_to, instance)
-            assign_perm('update_project_status', instance.assigned_to, instance)
-            assign_perm('can_comment', instance.assigned_to, instance)
+@receiver(pre_save, sender=Project)
+def bump_project_revision(sender, instance, update_fields=None, **kwargs):
+    """
+    Give a saved project the next sync revision of its organization, which
+    changes its detail ETag and lists it in the changes feed (see projects.sync).
+    """
+    instance.revision = allocate_revisions(instance.organization_id)
+    if instance._previous_state is not None and update_fields is not None and 'revision' not in update_fields:
+        # A partial save would not write the new revision; set it in the database instead
+        Project.objects.filter(pk=instance.pk).update(revision=instance.revision)
+
 
 @receiver(pre_save, sender=Project)
 def update_project_assigned_permissions(sender, instance, **kwargs):
     """
-    Update permissions when the assigned user changes.
+    Drop the previous assignee's permissions when the assigned user changes.
+
+    Assignees get their project permissions from core.policy, so only guardian
+    rows written for the previous assignee (explicit or legacy) are removed.
     """
     # Check if this is an update (not a new instance)
     if instance.pk:
-        # Get the existing project from the database
-        previous_instance = Project.objects.get(pk=instance.pk)
-        previous_assigned_user = previous_instance.assigned_to
+        # Get the existing assignee from the database
+        previous_state = instance._previous_state
+        previous_assigned_user_id = previous_state['assigned_to_id'] if previous_state else None
 
         # If the assigned user has changed, update the permissions accordingly
-        if previous_assigned_user != instance.assigned_to:
-            # Remove permissions from the previous assigned user
-            if previous_assigned_user:
-                remove_perm('view_project', previous_assigned_user, instance)
-                remove_perm('update_project_status', previous_assigned_user, instance)
-                remove_perm('can_comment', previous_assigned_user, instance)
-
-            # Assign permissions to the new assigned user
-            if instance.assigned_to:
-                assign_perm('view_project', instance.assigned_to, instance)
-                assign_perm('update_project_status', instance.assigned_to, instance)
-                assign_perm('can_comment', instance.assigned_to, instance)
+        if previous_assigned_user_id != instance.assigned_to_id:
+            if previous_assigned_user_id:
+                content_type = ContentType.objects.get_for_model(Project)
+                UserObjectPermission.objects.filter(
+                    user_id=previous_assigned_user_id,
+                    content_type=content_type,
+                    object_pk=str(instance.pk),
+                    permission__codename__in=PROJECT_ASSIGNEE_PERMISSIONS,
+                ).delete()
+
+            invalidate_organization_permissions(instance.organization_id)
+
+
+@receiver(post_save, sender=Project)
+def update_project_stats(sender, instance, created, **kwargs):
+    """
+    Move the project between the organization's status/priority counters.
+    """
+    bucket = (instance.organization_id, instance.status, instance.priority)
+    previous_state = getattr(instance, '_previous_state', None)
+    if not created and previous_state is not None:
+        previous_bucket = (previous_state['organization_id'], previous_state['status'], previous_state['priority'])
+        if previous_bucket == bucket:
+            return
+        adjust_project_stats(*previous_bucket, -1)
+    adjust_project_stats(*bucket, 1)
+
+
+@receiver(post_save, sender=Project)
+def record_project_activity(sender, instance, created, **kwargs):
+    """
+    Log status changes and reassignments in the organization's activity feed.
+    """
+    previous_state = getattr(instance, '_previous_state', None)
+    if created or previous_state is None:
+        return
+    if previous_state['status'] != instance.status:
+        record_activity(
+            instance.organization_id, ActivityEvent.PROJECT_STATUS_CHANGED, project_id=instance.pk,
+            **{'from': previous_state['status'], 'to': instance.status}
+        )
+    if previous_state['assigned_to_id'] != instance.assigned_to_id:
+        record_activity(
+            instance.organization_id, ActivityEvent.PROJECT_REASSIGNED, project_id=instance.pk,
+            **{'from': previous_state['assigned_to_id'], 'to': instance.assigned_to_id}
+        )
+
 
 @receiver(post_delete, sender=Project)
 def remove_project_permissions(sender, instance, **kwargs):
     """
     Remove all permissions for the project when it is deleted.
     """
-    # Get the groups for the organization
-    admin_group = Group.objects.get(name=f"{instance.organization.name}_Admin")
-
-    # Remove permissions for the admin and member groups for the project instance
-    remove_perm('view_project', admin_group, instance)
-    remove_perm('change_project', admin_group, instance)
-    remove_perm('delete_project', admin_group, instance)
-    remove_perm('update_project_status', admin_group, instance)
-    remove_perm('can_comment', admin_group, instance)
-
-    # Remove permissions from the assigned user
-    if instance.assigned_to:
-        remove_perm('view_project', instance.assigned_to, instance)
-        remove_perm('update_project_status', instance.assigned_to, instance)
-        remove_perm('can_comment', instance.assigned_to, instance)
+    delete_project_object_permissions([instance.pk])
+    invalidate_organization_permissions(instance.organization_id)
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_from_stats(sender, instance, **kwargs):
+    """
+    Take a deleted project out of the organization's status/priority counters.
+    """
+    adjust_project_stats(instance.organization_id, instance.status, instance.priority, -1)
+
+
+@receiver(post_save, sender=Project)
+def add_tombstone_on_move(sender, instance, created, **kwargs):
+    """
+    Tell clients syncing the previous organization that a moved project left it.
+    """
+    previous_state = getattr(instance, '_previous_state', None)
+    if not created and previous_state is not None and previous_state['organization_id'] != instance.organization_id:
+        add_tombstones(previous_state['organization_id'], [instance.pk])
+
+
+@receiver(post_delete, sender=Project)
+def add_tombstone_on_delete(sender, instance, **kwargs):
+    """
+    Tell clients syncing the organization that the project was deleted.
+    """
+    add_tombstones(instance.organization_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Organization)
+def drop_tombstones_of_deleted_organization(sender, instance, **kwargs):
+    """
+    Delete the tombstones the organization's projects left as they were deleted along with it.
+
+    The cascade deletes the projects before the organization and collects its
+    tombstones before either, so those rows would still point at the deleted
+    organization when the foreign keys are checked at commit.
+    """
+    ProjectTombstone.objects.filter(organization_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Project)
+def publish_project_change(sender, instance, created, **kwargs):
+    """
+    Tell the organization's event stream subscribers about a new or changed project.
+    """
+    publish_event(instance.organization_id, 'project.created' if created else 'project.updated', ids=[instance.pk])
+    previous_state = getattr(instance, '_previous_state', None)
+    if previous_state is not None and previous_state['organization_id'] != instance.organization_id:
+        # The project left its previous organization
+        publish_event(
+            previous_state['organization_id'], 'project.deleted', ids=[instance.pk],
+            viewers=sorted(get_project_viewer_ids(instance.pk, previous_state['assigned_to_id'])),
+        )
+
+
+@receiver(pre_delete, sender=Project)
+def remember_project_viewers(sender, instance, **kwargs):
+    """
+    Load who could view a project being deleted, before its guardian rows go with it.
+    """
+    instance._viewer_ids = get_project_viewer_ids(instance.pk, instance.assigned_to_id)
+
+
+@receiver(post_delete, sender=Project)
+def publish_project_deletion(sender, instance, **kwargs):
+    """
+    Tell the organization's event stream subscribers about a deleted project, and so about its comments.
+
+    A deleted project can no longer be checked against the streams' subscribers,
+    so the event names the users who could view it (see core.streams).
+    """
+    publish_event(
+        instance.organization_id, 'project.deleted', ids=[instance.pk],
+        viewers=sorted(getattr(instance, '_viewer_ids', ())),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_change(sender, instance, created, **kwargs):
+    """
+    Tell the organization's event stream subscribers about a new or edited comment.
+
+    Comments are only deleted with their project, which is announced instead;
+    a Comment post_delete receiver would also stop Django from deleting a
+    project's comments with a single query.
+    """
+    publish_event(
+        instance.project.organization_id, 'comment.created' if created else 'comment.updated',
+        ids=[instance.pk], project=instance.project_id,
+    )
+
+
+@receiver(post_save, sender=Comment)
+def bump_commented_project_revision(sender, instance, **kwargs):
+    """
+    List a commented project in the changes feed; its comment count and last comment date changed.
+    """
+    stamp_projects(instance.project.organization_id, [instance.project_id])
+
+
+def install_search_backend(sender, **kwargs):
+    """
+    Create the database objects the search backend needs (the SQLite FTS5 table) after migrations.
+    """
+    get_search_backend().install()
+
+
+@receiver(post_save, sender=Project)
+def update_project_search_document(sender, instance, **kwargs):
+    """
+    Keep the project's full-text search document in sync with its fields.
+    """
+    get_search_backend().update([instance])
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_search_document(sender, instance, **kwargs):
+    """
+    Drop the project's full-text search document when it is deleted.
+    """
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def update_assigned_projects_search_documents(sender, instance, created, **kwargs):
+    """
+    Reindex the projects assigned to a user when their name or email may have changed.
+    """
+    if not created and not is_login_update(kwargs.get('update_fields')):
+        get_search_backend().update(instance.assigned_projects.select_related('assigned_to'))
+        # Project details embed the assignee
+        stamp_project_queryset(instance.assigned_projects.all())
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import OrganizationProjectStats, Project
+
+
+def adjust_project_stats(organization_id, status, priority, delta):
+    """
+    Add `delta` to the project counter of one (organization, status, priority) bucket.
+
+    The counter is updated in the database with an F() expression, so
+    concurrent saves never overwrite each other's changes. It stops at 0: a
+    drifted counter is fixed by rebuild_project_stats, not by failing the save.
+    """
+    counters = OrganizationProjectStats.objects.filter(organization_id=organization_id, status=status, priority=priority)
+    if counters.update(project_count=Greatest(F('project_count') + delta, 0)) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            OrganizationProjectStats.objects.create(
+                organization_id=organization_id, status=status, priority=priority, project_count=delta
+            )
+    except IntegrityError:
+        # Another transaction created the bucket first
+        counters.update(project_count=F('project_count') + delta)
+
+
+def count_projects(organization_ids=None):
+    """
+    Count projects from the project table.
+
+    Returns:
+        dict: (organization_id, status, priority) -> number of projects.
+    """
+    projects = Project.objects.all()
+    if organization_ids is not None:
+        projects = projects.filter(organization_id__in=organization_ids)
+    rows = projects.order_by().values('organization_id', 'status', 'priority').annotate(total=Count('pk'))
+    return {(row['organization_id'], row['status'], row['priority']): row['total'] for row in rows}
+
+
+def get_stored_counts(organization_ids=None):
+    """
+    Read the maintained counters, in the same shape as count_projects (empty buckets left out).
+    """
+    counters = OrganizationProjectStats.objects.filter(project_count__gt=0)
+    if organization_ids is not None:
+        counters = counters.filter(organization_id__in=organization_ids)
+    rows = counters.values_list('organization_id', 'status', 'priority', 'project_count')
+    return {(organization_id, status, priority): total for organization_id, status, priority, total in rows}
+
+
+def rebuild_project_stats(organization_ids=None):
+    """
+    Replace the counters with fresh counts from the project table.
+
+    Returns:
+        int: The number of counter rows written.
+    """
+    with transaction.atomic():
+        counts = count_projects(organization_ids)
+        counters = OrganizationProjectStats.objects.all()
+        if organization_ids is not None:
+            counters = counters.filter(organization_id__in=organization_ids)
+        counters.delete()
+        OrganizationProjectStats.objects.bulk_create([
+            OrganizationProjectStats(organization_id=organization_id, status=status, priority=priority, project_count=total)
+            for (organization_id, status, priority), total in counts.items()
+        ])
+    return len(counts)
+
+
+def get_project_stats(organization):
+    """
+    Get an organization's project counts by status and by priority from its counters.
+    """
+    by_status = dict.fromkeys(settings.PROJECT_STATUS_CHOICES, 0)
+    by_priority = dict.fromkeys(settings.PROJECT_PRIORITY_CHOICES, 0)
+    rows = OrganizationProjectStats.objects.filter(organization=organization).values_list('status', 'priority', 'project_count')
+    for status, priority, total in rows:
+        by_status[status] = by_status.get(status, 0) + total
+        by_priority[priority] = by_priority.get(priority, 0) + total
+    return {
+        'organization': organization.pk,
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_priority': by_priority,
+    }
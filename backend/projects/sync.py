@@ -0,0 +1,147 @@
+"""
+Per-organization revisions of project changes, for clients that sync deltas.
+
+Every change to a project (its save, a comment on it, an edit of its
+assignee's profile) gives it the next value of its organization's
+`sync_revision` counter, and every deletion leaves a ProjectTombstone with
+one. A client that has seen revision N fetches what changed after it (see
+get_changes) instead of the whole project list.
+
+The counter row stays locked from the allocation until the transaction
+ends, so revisions of an organization become visible in the order they
+were handed out: once revision N is visible, every revision below it is too.
+Callers must allocate and write in the same transaction.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveBigIntegerField, Value, When
+
+from organizations.models import Organization
+from .models import Project, ProjectTombstone
+
+# Projects given their revisions by one UPDATE (one CASE branch each)
+REVISION_UPDATE_BATCH_SIZE = 500
+
+
+def allocate_revisions(organization_id, count=1):
+    """
+    Reserve `count` consecutive sync revisions of an organization.
+
+    Returns:
+        int: The first reserved revision, or None if the organization no longer exists.
+    """
+    if connection.vendor == 'postgresql':
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {quote(Organization._meta.db_table)} SET sync_revision = sync_revision + %s "
+                f"WHERE id = %s RETURNING sync_revision",
+                [count, organization_id],
+            )
+            row = cursor.fetchone()
+        last = row[0] if row else None
+    else:
+        counters = Organization.objects.filter(pk=organization_id)
+        if not counters.update(sync_revision=F('sync_revision') + count):
+            return None
+        last = counters.values_list('sync_revision', flat=True).get()
+    return None if last is None else last - count + 1
+
+
+def update_with_revisions(queryset, project_ids, first_revision, **fields):
+    """
+    Update the projects of `project_ids` in the queryset, giving the n-th of them revision `first_revision + n`.
+
+    A CASE expression maps each id to its revision, so a batch of projects
+    takes one UPDATE whatever their ids. `fields` are set on every project.
+    """
+    for start in range(0, len(project_ids), REVISION_UPDATE_BATCH_SIZE):
+        batch = project_ids[start:start + REVISION_UPDATE_BATCH_SIZE]
+        revisions = Case(
+            *[When(pk=pk, then=Value(first_revision + start + offset)) for offset, pk in enumerate(batch)],
+            output_field=PositiveBigIntegerField(),
+        )
+        queryset.filter(pk__in=batch).update(revision=revisions, **fields)
+
+
+def stamp_projects(organization_id, project_ids):
+    """
+    Give each of the organization's projects in `project_ids` its own new revision.
+    """
+    if not project_ids:
+        return
+    project_ids = list(project_ids)
+    with transaction.atomic(savepoint=False):
+        first = allocate_revisions(organization_id, len(project_ids))
+        if first is not None:
+            update_with_revisions(Project.objects.filter(organization_id=organization_id), project_ids, first)
+
+
+def stamp_project_queryset(queryset):
+    """
+    Give every project of the queryset a new revision, organization by organization.
+    """
+    with transaction.atomic(savepoint=False):
+        projects = {}
+        for project_id, organization_id in queryset.order_by().values_list('pk', 'organization_id'):
+            projects.setdefault(organization_id, []).append(project_id)
+        for organization_id, project_ids in projects.items():
+            stamp_projects(organization_id, project_ids)
+
+
+def add_tombstones(organization_id, project_ids):
+    """
+    Record the deletion of projects from an organization, each with its own revision.
+    """
+    if not project_ids:
+        return
+    first = allocate_revisions(organization_id, len(project_ids))
+    if first is None:
+        # The organization is already deleted. (One deleted along with its projects still exists
+        # here; projects.signals.drop_tombstones_of_deleted_organization removes its tombstones.)
+        return
+    ProjectTombstone.objects.bulk_create([
+        ProjectTombstone(organization_id=organization_id, project_id=project_id, revision=first + offset)
+        for offset, project_id in enumerate(project_ids)
+    ])
+
+
+def get_changes(organization, projects, since, limit):
+    """
+    Get what changed in an organization after revision `since`, at most `limit` projects and tombstones each.
+
+    Args:
+        organization (Organization): The organization, freshly loaded.
+        projects (QuerySet): The organization's projects the caller can view.
+        since (int): The last revision the client has seen.
+        limit (int): The page size.
+
+    Returns:
+        dict: 'revision', the revision to pass as `since` next time;
+        'projects', the changed projects the caller can view, in revision
+        order; 'deleted', the ids of the projects deleted or no longer
+        visible to the caller; and 'has_more', True if the page stopped
+        before the current revision.
+    """
+    # Everything up to the organization's revision, read before the rows, is committed (see the module docstring)
+    revision = organization.sync_revision
+    changed = list(
+        Project.objects.filter(organization=organization, revision__gt=since, revision__lte=revision)
+        .order_by('revision').values_list('pk', 'revision')[:limit + 1]
+    )
+    tombstones = list(
+        ProjectTombstone.objects.filter(organization=organization, revision__gt=since, revision__lte=revision)
+        .order_by('revision').values_list('project_id', 'revision')[:limit + 1]
+    )
+    has_more = False
+    for rows in (changed, tombstones):
+        if len(rows) > limit:
+            # Stop the page where either list runs out, so no revision in between is skipped
+            revision = min(revision, rows[limit - 1][1])
+            has_more = True
+    changed_ids = [pk for pk, row_revision in changed if row_revision <= revision]
+
+    visible = list(projects.filter(pk__in=changed_ids).order_by('revision')) if changed_ids else []
+    visible_ids = {project.pk for project in visible}
+    deleted = [project_id for project_id, row_revision in tombstones if row_revision <= revision]
+    deleted.extend(pk for pk in changed_ids if pk not in visible_ids)
+    return {'revision': revision, 'projects': visible, 'deleted': deleted, 'has_more': has_more}
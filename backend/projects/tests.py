@@ -1,3 +1,778 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from guardian.models import GroupObjectPermission, UserObjectPermission
+from guardian.shortcuts import assign_perm, remove_perm
+from rest_framework.test import APIClient
+
+from core.utils import ObjectPermissionResolver
+from organizations.models import Membership, Organization
+from .models import Comment, OrganizationProjectStats, Project, ProjectTombstone
+from .services import reassign_projects
+from .stats import count_projects, get_stored_counts, rebuild_project_stats
+from .sync import stamp_projects
+
+User = get_user_model()
+
+
+class ProjectTestMixin:
+    """
+    An organization with an admin (its creator) and a member, and helpers to add projects.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Membership.objects.create(user=self.member, organization=self.organization, role='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_projects(self, count, **fields):
+        return [
+            Project.objects.create(name=f"Project {index}", organization=self.organization, created_by=self.admin, **fields)
+            for index in range(count)
+        ]
+
+    def follow(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(project['id'] for project in response.data['results'])
+            url = response.data['next']
+        return ids
+
+
+class ProjectListPaginationTests(ProjectTestMixin, TestCase):
+
+    def list_url(self, **params):
+        query = '&'.join(f"{key}={value}" for key, value in {'organization_id': self.organization.pk, **params}.items())
+        return f"/project/?{query}"
+
+    def test_pages_cover_every_project_once_newest_first(self):
+        projects = self.create_projects(7)
+        ids = self.follow(self.list_url(page_size=3))
+        self.assertEqual(ids, [project.pk for project in reversed(projects)])
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        projects = self.create_projects(5)
+        Project.objects.update(created_at=timezone.now() - timedelta(days=1))
+        ids = self.follow(self.list_url(page_size=2))
+        self.assertEqual(ids, sorted((project.pk for project in projects), reverse=True))
+
+    def test_previous_link_returns_the_previous_page(self):
+        self.create_projects(6)
+        first = self.client.get(self.list_url(page_size=2))
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([p['id'] for p in back.data['results']], [p['id'] for p in first.data['results']])
+
+    def test_cursor_bounds_the_leading_ordering_column(self):
+        self.create_projects(3)
+        first = self.client.get(self.list_url(page_size=1))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        page_query = next(query['sql'] for query in queries.captured_queries if 'FROM "projects_project"' in query['sql'])
+        self.assertIn('"projects_project"."created_at" <=', page_query)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.list_url(cursor='not-a-cursor'))
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectSearchTests(ProjectTestMixin, TestCase):
+
+    def search(self, query, **params):
+        return self.client.get('/project/', {'organization_id': self.organization.pk, 'search': query, **params})
+
+    def test_terms_match_as_prefixes_of_every_field(self):
+        self.member.first_name = 'Grace'
+        self.member.save()
+        Project.objects.create(name='Website redesign', organization=self.organization, created_by=self.admin)
+        Project.objects.create(
+            name='Mobile app', description='Ship the iOS build', organization=self.organization,
+            created_by=self.admin, assigned_to=self.member,
+        )
+        self.assertEqual([p['name'] for p in self.search('redes').data['results']], ['Website redesign'])
+        self.assertEqual([p['name'] for p in self.search('ios').data['results']], ['Mobile app'])
+        self.assertEqual([p['name'] for p in self.search('grace').data['results']], ['Mobile app'])
+        self.assertEqual(self.search('nothing').data['results'], [])
+
+    def test_name_matches_rank_above_description_matches(self):
+        Project.objects.create(
+            name='Roadmap', description='Launch plan', organization=self.organization, created_by=self.admin
+        )
+        Project.objects.create(name='Launch', organization=self.organization, created_by=self.admin)
+        self.assertEqual([p['name'] for p in self.search('launch').data['results']], ['Launch', 'Roadmap'])
+
+    def test_results_are_paginated(self):
+        projects = self.create_projects(5)
+        ids = self.follow(f"/project/?organization_id={self.organization.pk}&search=project&page_size=2")
+        self.assertEqual(sorted(ids), sorted(project.pk for project in projects))
+
+    def test_renamed_project_is_found_by_its_new_name(self):
+        project = self.create_projects(1)[0]
+        project.name = 'Quarterly report'
+        project.save()
+        self.assertEqual([p['id'] for p in self.search('quarterly').data['results']], [project.pk])
+        self.assertEqual(self.search('project').data['results'], [])
+
+
+class ProjectStatsTests(ProjectTestMixin, TestCase):
+
+    def assertCountersMatchProjects(self):
+        self.assertEqual(get_stored_counts(), count_projects())
+
+    def test_counters_follow_creation_updates_and_deletion(self):
+        first, second, third = self.create_projects(3)
+        second.status = 'done'
+        second.save()
+        third.priority = 'high'
+        third.save()
+        first.delete()
+        self.assertCountersMatchProjects()
+
+        response = self.client.get(f"/project/stats/{self.organization.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['by_status']['done'], 1)
+        self.assertEqual(response.data['by_status']['in_progress'], 1)
+        self.assertEqual(response.data['by_status']['canceled'], 0)
+        self.assertEqual(response.data['by_priority'], {'low': 1, 'mid': 0, 'high': 1})
+
+    def test_saving_an_unchanged_project_does_not_count_it_twice(self):
+        project = self.create_projects(1)[0]
+        project.description = 'Edited'
+        project.save()
+        self.assertEqual(get_stored_counts(), {(self.organization.pk, 'in_progress', 'low'): 1})
+
+    def test_moving_a_project_moves_it_between_organizations(self):
+        other = Organization.objects.create(name='Other', created_by=self.admin)
+        project = self.create_projects(1)[0]
+        project.organization = other
+        project.save()
+        self.assertEqual(get_stored_counts(), {(other.pk, 'in_progress', 'low'): 1})
+
+    def test_stats_need_membership(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        self.client.force_authenticate(outsider)
+        response = self.client.get(f"/project/stats/{self.organization.pk}/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_drifted_counters_stop_at_zero(self):
+        project = self.create_projects(1)[0]
+        OrganizationProjectStats.objects.update(project_count=0)
+        project.delete()
+        self.assertEqual(OrganizationProjectStats.objects.get().project_count, 0)
+
+    def test_rebuild_restores_drifted_counters(self):
+        self.create_projects(2, status='done')
+        OrganizationProjectStats.objects.update(project_count=7)
+        rebuild_project_stats([self.organization.pk])
+        self.assertCountersMatchProjects()
+
+
+class ProjectCommentTests(ProjectTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_projects(1, assigned_to=self.member)[0]
+        self.comments_url = f"/project/{self.project.pk}/comments/"
+
+    def add_comments(self, project, count):
+        authors = [self.admin, self.member]
+        return [
+            Comment.objects.create(project=project, user=authors[index % 2], content=f"Comment {index}")
+            for index in range(count)
+        ]
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_feed_pages_cover_every_comment_once_newest_first(self):
+        comments = self.add_comments(self.project, 5)
+        self.add_comments(self.create_projects(1)[0], 2)
+        # Ties on created_at are broken by id
+        Comment.objects.update(created_at=timezone.now() - timedelta(days=1))
+        ids = self.follow(f"{self.comments_url}?page_size=2")
+        self.assertEqual(ids, sorted((comment.pk for comment in comments), reverse=True))
+
+    def test_feed_pages_take_the_same_queries_whatever_their_authors(self):
+        self.add_comments(self.project, 6)
+        self.client.get(self.comments_url)
+        small, _ = self.count_queries(f"{self.comments_url}?page_size=1")
+        large, response = self.count_queries(f"{self.comments_url}?page_size=3")
+        self.assertEqual(large, small)
+        next_page, _ = self.count_queries(response.data['next'])
+        self.assertEqual(next_page, small)
+        self.assertEqual(response.data['results'][0]['author']['email'], 'member@example.com')
+
+    def test_feed_needs_view_permission(self):
+        other = self.create_projects(1)[0]
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.comments_url).status_code, 200)
+        self.assertEqual(self.client.get(f"/project/{other.pk}/comments/").status_code, 403)
+        self.assertEqual(self.client.get(f"/project/{other.pk + 1000}/comments/").status_code, 404)
+
+    def test_list_reports_comment_stats(self):
+        quiet = self.create_projects(1)[0]
+        comments = self.add_comments(self.project, 3)
+        Comment.objects.filter(pk=comments[1].pk).update(created_at=timezone.now() + timedelta(hours=1))
+        results = {
+            project['id']: project
+            for project in self.client.get(f"/project/?organization_id={self.organization.pk}").data['results']
+        }
+        self.assertEqual(results[self.project.pk]['comment_count'], 3)
+        self.assertEqual(
+            results[self.project.pk]['last_comment_at'],
+            Comment.objects.get(pk=comments[1].pk).created_at.isoformat().replace('+00:00', 'Z'),
+        )
+        self.assertEqual(results[quiet.pk]['comment_count'], 0)
+        self.assertIsNone(results[quiet.pk]['last_comment_at'])
+
+    def test_comment_stats_add_no_queries_per_project(self):
+        list_url = f"/project/?organization_id={self.organization.pk}"
+        self.add_comments(self.project, 2)
+        self.client.get(list_url)
+        few, _ = self.count_queries(list_url)
+        for project in self.create_projects(4):
+            self.add_comments(project, 2)
+        many, response = self.count_queries(list_url)
+        self.assertEqual(many, few)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class ProjectDetailETagTests(ProjectTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_projects(1)[0]
+        self.url = f"/project/{self.project.pk}/{self.organization.pk}/"
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_etag_changes_when_the_project_changes(self):
+        etag = self.get_etag()
+        self.project.name = 'Renamed'
+        self.project.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_the_project_is_commented(self):
+        etag = self.get_etag()
+        Comment.objects.create(project=self.project, user=self.admin, content='Looks good')
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_etag_changes_when_the_membership_changes(self):
+        etag = self.get_etag()
+        membership = Membership.objects.get(user=self.member)
+        membership.role = 'admin'
+        membership.save()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_etag_differs_between_users(self):
+        other_admin = User.objects.create_user(username='other', email='other@example.com', password='test-password')
+        Membership.objects.create(user=other_admin, organization=self.organization, role='admin')
+        etag = self.get_etag()
+        self.client.force_authenticate(other_admin)
+        self.assertNotEqual(self.get_etag(), etag)
+
+
+    def test_etag_depends_on_the_requested_fields(self):
+        etag = self.get_etag()
+        sparse = self.client.get(self.url, {'fields': 'id,name'})
+        self.assertEqual(set(sparse.data), {'id', 'name'})
+        self.assertNotEqual(sparse['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=sparse['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # The same fields in another order or spelled with the primary key are the same representation
+        same = self.client.get(self.url, {'fields': 'name, id'}, HTTP_IF_NONE_MATCH=sparse['ETag'])
+        self.assertEqual(same.status_code, 304)
+        self.assertEqual(self.client.get(self.url, {'fields': 'name'})['ETag'], sparse['ETag'])
+
+    def test_etag_depends_on_the_expanded_fields(self):
+        plain = self.client.get(self.url, {'fields': 'id,name'})['ETag']
+        expanded = self.client.get(self.url, {'fields': 'id,name', 'expand': 'user_permissions'})
+        self.assertIn('user_permissions', expanded.data)
+        self.assertNotEqual(expanded['ETag'], plain)
+
+
+class ProjectPermissionOverrideTests(ProjectTestMixin, TestCase):
+    """
+    The project detail needs 'change_project', which members only get through an override.
+    """
+
+    def test_granted_and_removed_overrides_apply_to_the_next_request(self):
+        project = self.create_projects(1)[0]
+        url = f"/project/{project.pk}/{self.organization.pk}/"
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        assign_perm('change_project', self.member, project)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('projects.change_project', response.data['user_permissions'])
+
+        remove_perm('change_project', self.member, project)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_group_override_applies_to_the_next_request(self):
+        project = self.create_projects(1)[0]
+        url = f"/project/{project.pk}/{self.organization.pk}/"
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        assign_perm('change_project', Group.objects.get(name='Acme_Member'), project)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ProjectPagePermissionTests(ProjectTestMixin, TestCase):
+    """
+    The permissions of a page of projects are resolved in bulk (see core.utils.ObjectPermissionResolver).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.group = Group.objects.get(name='Acme_Member')
+        self.client.force_authenticate(self.member)
+
+    def create_shared_projects(self, count):
+        projects = self.create_projects(count, assigned_to=self.member)
+        for index, project in enumerate(projects):
+            assign_perm('change_project', self.member if index % 2 else self.group, project)
+        return projects
+
+    def list_permissions(self):
+        url = f"/project/?organization_id={self.organization.pk}&expand=user_permissions&page_size=50"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), {project['id']: set(project['user_permissions']) for project in response.data['results']}
+
+    def test_page_queries_do_not_grow_with_the_projects(self):
+        self.create_shared_projects(2)
+        self.list_permissions()
+        few, _ = self.list_permissions()
+        self.create_shared_projects(8)
+        many, permissions = self.list_permissions()
+        self.assertEqual(many, few)
+        self.assertEqual(len(permissions), 10)
+
+    def test_page_combines_roles_and_overrides(self):
+        by_group, by_user = self.create_shared_projects(2)
+        unassigned = self.create_projects(1)[0]
+        assign_perm('view_project', self.member, unassigned)
+        _, permissions = self.list_permissions()
+        assignee = {'projects.view_project', 'projects.update_project_status', 'projects.can_comment'}
+        self.assertEqual(permissions[by_group.pk], assignee | {'projects.change_project'})
+        self.assertEqual(permissions[by_user.pk], assignee | {'projects.change_project'})
+        self.assertEqual(permissions[unassigned.pk], {'projects.view_project'})
+
+    def test_prefetched_projects_need_no_more_queries(self):
+        projects = self.create_shared_projects(3)
+        resolver = ObjectPermissionResolver(self.member)
+        resolver.prefetch(Project.objects.all())
+        with self.assertNumQueries(0):
+            for project in projects:
+                self.assertIn('projects.change_project', resolver.get_permissions(project))
+
+
+class ProjectSparseFieldsetTests(ProjectTestMixin, TestCase):
+
+    def list_url(self, **params):
+        return '/project/?' + '&'.join(f"{key}={value}" for key, value in {'organization_id': self.organization.pk, **params}.items())
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.list_url(fields='id,nope'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nope', str(response.data['fields']))
+        response = self.client.get(self.list_url(fields='id', expand='name'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+    def test_only_the_requested_fields_are_returned(self):
+        self.create_projects(2, assigned_to=self.member)
+        response = self.client.get(self.list_url(fields='id,name'))
+        self.assertEqual([set(project) for project in response.data['results']], [{'id', 'name'}] * 2)
+        response = self.client.get(self.list_url(fields='name', expand='user'))
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'user'})
+        self.assertEqual(response.data['results'][0]['user']['username'], 'member')
+
+    def test_only_the_backing_columns_are_selected(self):
+        self.create_projects(2, description='Long text')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url(fields='id,name'))
+        page_query = next(query['sql'] for query in queries.captured_queries if 'FROM "projects_project"' in query['sql'])
+        self.assertIn('"projects_project"."name"', page_query)
+        self.assertNotIn('"projects_project"."description"', page_query)
+        self.assertNotIn('"projects_comment"', page_query)
+        self.assertNotIn('JOIN', page_query)
+
+    def test_sparse_pages_follow_the_cursor(self):
+        projects = self.create_projects(5)
+        ids = []
+        url = self.list_url(fields='name', page_size=2)
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all(set(project) == {'id', 'name'} for project in response.data['results']))
+            ids.extend(project['id'] for project in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, [project.pk for project in reversed(projects)])
+
+    def test_sparse_search_results_follow_the_cursor(self):
+        for name in ['Website redesign', 'Website launch', 'Website audit']:
+            Project.objects.create(name=name, organization=self.organization, created_by=self.admin)
+        Project.objects.create(name='Mobile app', organization=self.organization, created_by=self.admin)
+        names = []
+        url = self.list_url(fields='name', search='website', page_size=2)
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all(set(project) == {'id', 'name'} for project in response.data['results']))
+            names.extend(project['name'] for project in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(names), ['Website audit', 'Website launch', 'Website redesign'])
+
+
+class ProjectTransferTests(ProjectTestMixin, TestCase):
+
+    def import_projects(self, body, content_type):
+        return self.client.post(f"/project/import/{self.organization.pk}/", data=body, content_type=content_type)
+
+    def export_projects(self, export_format):
+        response = self.client.get(f"/project/export/{self.organization.pk}.{export_format}")
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_import_creates_the_projects(self):
+        body = (
+            "name,description,status,priority,assigned_to\n"
+            f"Website,New landing page,done,high,{self.member.pk}\n"
+            "Mobile app,,,,\n"
+        )
+        response = self.import_projects(body, 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+
+        website = Project.objects.get(name='Website')
+        self.assertEqual((website.status, website.priority, website.assigned_to), ('done', 'high', self.member))
+        mobile = Project.objects.get(name='Mobile app')
+        self.assertEqual((mobile.status, mobile.priority, mobile.created_by), ('in_progress', 'low', self.admin))
+        self.assertNotEqual(website.revision, mobile.revision)
+        self.assertEqual(get_stored_counts(), count_projects())
+        search = self.client.get('/project/', {'organization_id': self.organization.pk, 'search': 'landing'})
+        self.assertEqual([p['id'] for p in search.data['results']], [website.pk])
+
+    @override_settings(PROJECT_IMPORT_BATCH_SIZE=2)
+    def test_ndjson_import_spans_batches(self):
+        body = ''.join(json.dumps({'name': f"Project {index}"}) + '\n' for index in range(5))
+        response = self.import_projects(body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Project.objects.count(), 5)
+
+    @override_settings(PROJECT_IMPORT_BATCH_SIZE=2)
+    def test_invalid_rows_are_reported_and_nothing_is_created(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+        lines = [
+            {'name': 'Valid'},
+            {'name': 'Valid too'},
+            {'name': 'Bad status', 'status': 'unknown'},
+            {'name': 'Outsider', 'assigned_to': outsider.pk},
+        ]
+        body = ''.join(json.dumps(line) + '\n' for line in lines) + 'not json\n'
+        response = self.import_projects(body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4, 5])
+        self.assertFalse(Project.objects.exists())
+        self.assertEqual(get_stored_counts(), {})
+
+    def test_import_needs_a_supported_content_type(self):
+        self.assertEqual(self.import_projects('name\nWebsite\n', 'text/plain').status_code, 415)
+
+    def test_members_cannot_import(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.import_projects('name\nWebsite\n', 'text/csv').status_code, 403)
+
+    def test_csv_export_lists_every_project(self):
+        projects = self.create_projects(3)
+        rows = list(csv.DictReader(io.StringIO(self.export_projects('csv'))))
+        self.assertEqual([int(row['id']) for row in rows], [project.pk for project in projects])
+        self.assertEqual(rows[0]['name'], 'Project 0')
+        self.assertEqual(rows[0]['created_by'], str(self.admin.pk))
+
+    def test_ndjson_export_round_trips_through_import(self):
+        self.create_projects(2, description='Exported', priority='mid')
+        exported = self.export_projects('ndjson')
+        rows = [json.loads(line) for line in exported.splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Project 0', 'Project 1'])
+
+        Project.objects.all().delete()
+        body = ''.join(
+            json.dumps({key: row[key] for key in ('name', 'description', 'status', 'priority', 'assigned_to')}) + '\n'
+            for row in rows
+        )
+        self.assertEqual(self.import_projects(body, 'application/x-ndjson').status_code, 201)
+        self.assertEqual(
+            list(Project.objects.order_by('name').values_list('name', 'description', 'priority')),
+            [('Project 0', 'Exported', 'mid'), ('Project 1', 'Exported', 'mid')],
+        )
+
+    def test_members_export_only_the_projects_they_can_view(self):
+        mine = self.create_projects(1, assigned_to=self.member)[0]
+        self.create_projects(2)
+        self.client.force_authenticate(self.member)
+        rows = [json.loads(line) for line in self.export_projects('ndjson').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [mine.pk])
+
+
+class ProjectChangesTests(ProjectTestMixin, TestCase):
+
+    def get_changes(self, since, **params):
+        response = self.client.get(f"/project/changes/{self.organization.pk}/", {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_list_what_changed_after_a_revision(self):
+        first, second = self.create_projects(2)
+        revision = self.get_changes(0)['revision']
+
+        second.name = 'Renamed'
+        second.save()
+        Comment.objects.create(project=first, user=self.admin, content='Noted')
+        changes = self.get_changes(revision)
+        self.assertEqual([p['id'] for p in changes['projects']], [second.pk, first.pk])
+        self.assertEqual(changes['deleted'], [])
+        self.assertEqual(self.get_changes(changes['revision'])['projects'], [])
+
+    def test_deleted_and_moved_projects_leave_tombstones(self):
+        deleted, moved = self.create_projects(2)
+        deleted_id = deleted.pk
+        revision = self.get_changes(0)['revision']
+
+        deleted.delete()
+        moved.organization = Organization.objects.create(name='Other', created_by=self.admin)
+        moved.save()
+        changes = self.get_changes(revision)
+        self.assertEqual(changes['projects'], [])
+        self.assertEqual(changes['deleted'], [deleted_id, moved.pk])
+
+    def test_pages_stop_at_the_page_size(self):
+        projects = self.create_projects(5)
+        seen, since = [], 0
+        while True:
+            changes = self.get_changes(since, page_size=2)
+            seen.extend(p['id'] for p in changes['projects'])
+            since = changes['revision']
+            if not changes['has_more']:
+                break
+        self.assertEqual(seen, [project.pk for project in projects])
+
+    def test_projects_hidden_from_a_member_are_reported_deleted(self):
+        project = self.create_projects(1, assigned_to=self.member)[0]
+        self.client.force_authenticate(self.member)
+        revision = self.get_changes(0)['revision']
+
+        project.assigned_to = self.admin
+        project.save()
+        self.assertEqual(self.get_changes(revision)['deleted'], [project.pk])
+
+
+class ProjectRevisionTests(ProjectTestMixin, TestCase):
+
+    def get_sync_revision(self):
+        self.organization.refresh_from_db()
+        return self.organization.sync_revision
+
+    def test_stamped_projects_take_one_revision_each_whatever_their_ids(self):
+        projects = self.create_projects(3)
+        Project.objects.filter(pk=projects[1].pk).delete()
+        sparse = [projects[0].pk, projects[2].pk, projects[2].pk + 1000]
+        before = self.get_sync_revision()
+
+        stamp_projects(self.organization.pk, sparse)
+        self.assertEqual(self.get_sync_revision(), before + 3)
+        revisions = sorted(Project.objects.values_list('revision', flat=True))
+        self.assertEqual(revisions, [before + 1, before + 2])
+
+    def test_reassigned_projects_take_consecutive_revisions(self):
+        projects = self.create_projects(3, assigned_to=self.admin)
+        Project.objects.filter(pk=projects[1].pk).delete()
+        before = self.get_sync_revision()
+
+        reassign_projects(self.organization, self.admin, self.member)
+        self.assertEqual(self.get_sync_revision(), before + 2)
+        self.assertEqual(
+            list(Project.objects.order_by('pk').values_list('assigned_to', 'revision')),
+            [(self.member.pk, before + 1), (self.member.pk, before + 2)],
+        )
+
+
+class ReassignProjectsTests(ProjectTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.colleague = User.objects.create_user(username='colleague', email='colleague@example.com', password='test-password')
+        Membership.objects.create(user=self.colleague, organization=self.organization, role='member')
+
+    def reassign(self, **data):
+        return self.client.post('/project/reassign/', {'organization': self.organization.pk, **data}, format='json')
+
+    def visible_ids(self, user):
+        self.client.force_authenticate(user)
+        return sorted(self.follow(f"/project/?organization_id={self.organization.pk}"))
+
+    def test_ids_not_assigned_to_the_user_are_skipped(self):
+        mine = self.create_projects(2, assigned_to=self.member)
+        other = self.create_projects(1, assigned_to=self.admin)[0]
+        summary = reassign_projects(
+            self.organization, self.member, self.colleague, [mine[0].pk, other.pk, other.pk + 1000]
+        )
+        self.assertEqual(summary['projects'], [mine[0].pk])
+        self.assertEqual(summary['skipped'], [other.pk, other.pk + 1000])
+        self.assertEqual(
+            list(Project.objects.order_by('pk').values_list('assigned_to', flat=True)),
+            [self.colleague.pk, self.member.pk, self.admin.pk],
+        )
+
+    def test_projects_can_be_unassigned(self):
+        projects = self.create_projects(2, assigned_to=self.member)
+        response = self.reassign(from_user=self.member.pk, to_user=None)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['to_user'])
+        self.assertEqual(response.data['projects'], [project.pk for project in projects])
+        self.assertFalse(Project.objects.filter(assigned_to__isnull=False).exists())
+
+    def test_targets_must_be_another_member(self):
+        self.create_projects(1, assigned_to=self.member)
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='test-password')
+
+        for to_user in [outsider, self.member]:
+            response = self.reassign(from_user=self.member.pk, to_user=to_user.pk)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('to_user', response.data)
+        self.assertFalse(Project.objects.exclude(assigned_to=self.member).exists())
+
+    def test_members_cannot_reassign(self):
+        self.create_projects(1, assigned_to=self.member)
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.reassign(from_user=self.member.pk, to_user=self.colleague.pk).status_code, 403)
+
+    def test_permissions_and_visibility_follow_the_new_assignee(self):
+        projects = self.create_projects(2, assigned_to=self.member)
+        ids = sorted(project.pk for project in projects)
+        # A row an older release wrote for the assignee
+        assign_perm('view_project', self.member, projects[0])
+        self.assertEqual(self.visible_ids(self.member), ids)
+        self.assertEqual(self.visible_ids(self.colleague), [])
+
+        self.client.force_authenticate(self.admin)
+        response = self.reassign(from_user=self.member.pk, to_user=self.colleague.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['permissions_removed'], 1)
+        self.assertFalse(UserObjectPermission.objects.filter(user=self.member).exists())
+        self.assertEqual(self.visible_ids(self.member), [])
+        self.assertEqual(self.visible_ids(self.colleague), ids)
+
+
+class PurgeRolePermissionsTests(ProjectTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_projects(1, assigned_to=self.member)[0]
+        admin_group = Group.objects.get(name='Acme_Admin')
+        # Rows older releases wrote on every project
+        for codename in ['view_project', 'change_project', 'delete_project', 'update_project_status', 'can_comment']:
+            assign_perm(codename, admin_group, self.project)
+        for codename in ['view_project', 'update_project_status', 'can_comment']:
+            assign_perm(codename, self.member, self.project)
+        # Explicit overrides, which stay
+        self.viewer = User.objects.create_user(username='viewer', email='viewer@example.com', password='test-password')
+        assign_perm('view_project', self.viewer, self.project)
+        assign_perm('change_project', self.member, self.project)
+
+    def purge(self, *args):
+        output = io.StringIO()
+        call_command('purge_role_permissions', *args, stdout=output)
+        return output.getvalue()
+
+    def remaining_rows(self):
+        return (
+            sorted(UserObjectPermission.objects.values_list('user__username', 'permission__codename')),
+            GroupObjectPermission.objects.filter(content_type__model='project').count(),
+        )
+
+    def test_dry_run_only_counts_the_rows(self):
+        before = self.remaining_rows()
+        self.assertIn("Would delete 5 admin group rows and 3 assignee rows.", self.purge('--dry-run'))
+        self.assertEqual(self.remaining_rows(), before)
+
+    def test_role_rows_are_deleted_and_overrides_kept(self):
+        self.assertIn("Deleted 5 admin group rows and 3 assignee rows.", self.purge())
+        self.assertEqual(
+            self.remaining_rows(), ([('member', 'change_project'), ('viewer', 'view_project')], 0)
+        )
+
+    def test_roles_still_grant_the_purged_permissions(self):
+        self.purge()
+        url = f"/project/{self.project.pk}/{self.organization.pk}/"
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class CascadingDeletionTests(TransactionTestCase):
+    """
+    Deletions that take projects with them, checked through the foreign keys at commit.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='test-password')
+        self.organization = Organization.objects.create(name='Acme', created_by=self.admin)
+        Project.objects.create(name='Website', organization=self.organization, created_by=self.admin)
+
+    def test_deleting_an_organization_deletes_its_projects(self):
+        self.organization.delete()
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(ProjectTombstone.objects.exists())
+
+    def test_deleting_a_user_deletes_their_organizations_and_projects(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='test-password')
+        other = Organization.objects.create(name='Other', created_by=member)
+        Membership.objects.create(user=self.admin, organization=other, role='member')
+        kept = Project.objects.create(name='Kept', organization=other, created_by=member)
+        removed = Project.objects.create(name='Removed', organization=other, created_by=self.admin)
+
+        self.admin.delete()
+        self.assertEqual(list(Project.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(list(ProjectTombstone.objects.values_list('organization', 'project_id')), [(other.pk, removed.pk)])
@@ -0,0 +1,208 @@
+"""
+Bulk project import and export.
+
+Imports read CSV or NDJSON rows from the request stream and insert them in
+batches with bulk_create; exports stream the rows of a queryset read with
+.iterator(). Neither holds more than a batch of projects in memory.
+"""
+import codecs
+import csv
+import io
+import json
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.events import publish_event
+from .models import Project
+from .search import get_search_backend
+from .serializers import ProjectImportSerializer
+from .stats import adjust_project_stats
+from .sync import allocate_revisions
+
+User = get_user_model()
+
+# Request content type -> import format
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+# Export format -> response content type
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+EXPORT_FIELDS = ('id', 'name', 'description', 'status', 'priority', 'assigned_to', 'created_by', 'created_at')
+# Bytes of output gathered before a chunk is handed to the server
+EXPORT_WRITE_SIZE = 64 * 1024
+# Exports spooled to a file (under ASGI) stay in memory up to this size
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def decode_lines(stream):
+    """
+    Decode a binary stream of UTF-8 lines, dropping a leading byte order mark.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for line in stream:
+        yield decoder.decode(line)
+
+
+def read_rows(lines, import_format):
+    """
+    Parse import rows, yielding (line number, row) pairs.
+
+    Empty CSV cells are left out so the model defaults apply; NDJSON lines
+    that are not valid JSON are passed on as text and fail validation.
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, line
+
+
+def import_projects(organization, created_by, rows):
+    """
+    Create projects in an organization from (line number, row) pairs, all or nothing.
+
+    Rows are validated a batch at a time against the organization's members,
+    loaded once, and inserted with bulk_create, so the per-project signals do
+    not run; their work is done here per batch instead: the status/priority
+    counters are adjusted once per bucket and the search documents are
+    indexed together. New projects need no permission rows, as permissions
+    are derived from roles (see core.policy).
+
+    Args:
+        organization (Organization): The organization receiving the projects.
+        created_by (User): The user recorded as the creator of every project.
+        rows (iterable): (line number, row) pairs, see read_rows().
+
+    Returns:
+        dict: The number of projects created and, if any row was invalid (in
+        which case nothing is created), the errors of the first
+        PROJECT_IMPORT_MAX_ERRORS invalid rows with their line numbers.
+    """
+    members = {user.pk: user for user in User.objects.filter(memberships__organization=organization)}
+    errors = []
+    created = 0
+
+    def flush(batch):
+        nonlocal created
+        serializer = ProjectImportSerializer(data=[row for _, row in batch], many=True, context={'members': members})
+        if not serializer.is_valid():
+            errors.extend(
+                {'line': line, 'errors': row_errors}
+                for (line, _), row_errors in zip(batch, serializer.errors) if row_errors
+            )
+            return
+        if errors:
+            # Nothing will be saved; the batch was only validated for the report
+            return
+        projects = [Project(organization=organization, created_by=created_by, **data) for data in serializer.validated_data]
+        create_projects(organization, projects)
+        created += len(projects)
+
+    with transaction.atomic():
+        batch = []
+        for line, row in rows:
+            batch.append((line, row))
+            if len(batch) >= settings.PROJECT_IMPORT_BATCH_SIZE:
+                flush(batch)
+                batch = []
+                if len(errors) >= settings.PROJECT_IMPORT_MAX_ERRORS:
+                    break
+        else:
+            if batch:
+                flush(batch)
+        if errors:
+            transaction.set_rollback(True)
+
+    return {
+        'organization': organization.pk,
+        'created': 0 if errors else created,
+        'errors': errors[:settings.PROJECT_IMPORT_MAX_ERRORS],
+    }
+
+
+def create_projects(organization, projects):
+    """
+    Insert new projects of an organization with one INSERT and do the work of their post_save signals in bulk.
+    """
+    if not projects:
+        return []
+    first_revision = allocate_revisions(organization.pk, len(projects))
+    for offset, project in enumerate(projects):
+        project.revision = first_revision + offset
+    if connection.features.can_return_rows_from_bulk_insert:
+        created = Project.objects.bulk_create(projects)
+    else:
+        # The backend cannot return ids from a bulk insert (SQLite); read the new rows back
+        last_id = Project.objects.filter(organization=organization).aggregate(last=Max('pk'))['last'] or 0
+        Project.objects.bulk_create(projects)
+        created = list(
+            Project.objects.filter(organization=organization, pk__gt=last_id).select_related('assigned_to')
+        )
+
+    buckets = Counter((project.organization_id, project.status, project.priority) for project in created)
+    for bucket, count in buckets.items():
+        adjust_project_stats(*bucket, count)
+    get_search_backend().update(created)
+    publish_event(organization.pk, 'project.created', ids=[project.pk for project in created])
+    return created
+
+
+def export_projects(queryset, export_format):
+    """
+    Yield the projects of a queryset as CSV (with a header line) or NDJSON text.
+
+    Rows are read with .iterator(), PROJECT_EXPORT_CHUNK_SIZE at a time, and
+    written out in chunks of about EXPORT_WRITE_SIZE bytes.
+    """
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.PROJECT_EXPORT_CHUNK_SIZE)
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        write = writer.writerow
+    else:
+        def write(values):
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), cls=DjangoJSONEncoder))
+            buffer.write('\n')
+
+    for values in rows:
+        write([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        if buffer.tell() >= EXPORT_WRITE_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def spool_export(chunks):
+    """
+    Write an export to a temporary file, in memory up to EXPORT_SPOOL_SIZE, and rewind it.
+
+    Used under ASGI, where a streaming response is consumed by the event loop
+    and so cannot run queries while it is sent.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    for chunk in chunks:
+        spooled.write(chunk.encode('utf-8'))
+    spooled.seek(0)
+    return spooled
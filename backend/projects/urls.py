@@ -1,21 +1,44 @@
 from django.urls import path
+from core.async_views import as_view
 from .views import (
     ProjectListCreateView,
     ProjectDetailView,
     UpdateProjectStatus,
     AddCommentView,
+    ProjectCommentListView,
+    ReassignProjectsView,
+    OrganizationProjectStatsView,
+    ProjectChangesView,
+    ProjectImportView,
+    ProjectExportView,
 )
 
 urlpatterns = [
     # URL for listing all projects or creating a new project
-    path('', ProjectListCreateView.as_view(), name='project-list-create'),
+    path('', as_view(ProjectListCreateView), name='project-list-create'),
 
     # URL for retrieving, updating, or deleting a specific project
-    path('<int:pk>/<int:organization_id>/', ProjectDetailView.as_view(), name='project-detail'),
+    path('<int:pk>/<int:organization_id>/', as_view(ProjectDetailView), name='project-detail'),
 
     # URL for updating the status of a project
     path('<int:project_id>/update-status/', UpdateProjectStatus.as_view(), name='update_project_status'),
 
+    # URL for listing the comments of a specific project
+    path('<int:project_id>/comments/', ProjectCommentListView.as_view(), name='project-comments'),
+
     # URL for adding a comment to a specific project
     path('<int:project_id>/add-comment/', AddCommentView.as_view(), name='project-add-comment'),
+
+    # URL for moving the projects of one assignee to another in bulk
+    path('reassign/', ReassignProjectsView.as_view(), name='project-reassign'),
+
+    # URL for the project counts of an organization by status and priority
+    path('stats/<int:organization_id>/', OrganizationProjectStatsView.as_view(), name='project-stats'),
+
+    # URL for the projects of an organization changed after a sync revision (?since=), with tombstones
+    path('changes/<int:organization_id>/', ProjectChangesView.as_view(), name='project-changes'),
+
+    # URLs for importing projects into an organization from CSV/NDJSON and exporting them
+    path('import/<int:organization_id>/', ProjectImportView.as_view(), name='project-import'),
+    path('export/<int:organization_id>.<str:export_format>', ProjectExportView.as_view(), name='project-export'),
 ]
@@ -1,53 +1,143 @@
 # views.py
-from rest_framework import generics, permissions,serializers
-from django.db.models import Q
-from guardian.shortcuts import get_objects_for_user
+import csv
+
+from django.conf import settings
+from rest_framework import generics, permissions,serializers,status
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import Project,Comment
-from .serializers import ProjectSerializer,ProjectStatusSerializer,CommentSerializer
-from core.permissions import CanAddProjectPermission,CanUpdateProjectStatusPermission,CanCommentOnProjectPermission,CanUpdateProjectPermission
-from django.shortcuts import get_object_or_404
+from .search import get_search_backend
+from .serializers import ProjectSerializer,ProjectStatusSerializer,CommentSerializer,ReassignProjectsSerializer
+from .services import reassign_projects
+from .stats import get_project_stats
+from .sync import get_changes
+from .transfer import EXPORT_CONTENT_TYPES, IMPORT_FORMATS, decode_lines, export_projects, import_projects, read_rows, spool_export
+from core.context import get_request_context
+from core.etags import ConditionalRetrieveMixin, make_etag
+from core.policy import filter_visible_projects
+from core.utils import get_organization_permission_version
+from core.pagination import KeysetCursorPagination
+from core.permissions import IsOrganizationAdmin,CanImportProjectsPermission,CanViewOrganizationPermission,CanViewProjectPermission,CanAddProjectPermission,CanUpdateProjectStatusPermission,CanCommentOnProjectPermission,CanUpdateProjectPermission
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, StreamingHttpResponse
+
+def with_comment_stats(queryset):
+    """
+    Annotate projects with `comment_count` and `last_comment_at` in the same query.
+
+    Both are correlated subqueries served by the (project, created_at) comment
+    index, so they work with any ordering or keyset filter of the outer query.
+    """
+    comments = Comment.objects.filter(project=OuterRef('pk')).order_by()
+    return queryset.annotate(
+        comment_count=Coalesce(
+            Subquery(comments.values('project').annotate(count=Count('pk')).values('count'), output_field=IntegerField()),
+            0,
+        ),
+        last_comment_at=Subquery(comments.order_by('-created_at').values('created_at')[:1]),
+    )
+
+
+def load_project_fields(queryset, fields, extra_columns=()):
+    """
+    Load only what the requested ProjectSerializer fields need.
+
+    The assignee is joined and the comment annotations are added only when
+    their fields are requested, and with `?fields=` the query selects only the
+    backing columns plus `extra_columns` (e.g. the pagination ordering).
+
+    Args:
+        queryset (QuerySet): The projects to serialize.
+        fields (set or None): The requested fields, None for all of them.
+        extra_columns (iterable): Model fields to load in any case.
+    """
+    if fields is None:
+        return with_comment_stats(queryset.select_related('assigned_to'))
+    if 'user' in fields:
+        queryset = queryset.select_related('assigned_to')
+    if fields & {'comment_count', 'last_comment_at'}:
+        queryset = with_comment_stats(queryset)
+    return queryset.only(*ProjectSerializer.get_only_fields(fields), *extra_columns)
+
 
 class ProjectListCreateView(generics.ListCreateAPIView):
     """
     View to list all projects or create a new project.
+    Projects are listed newest first, one cursor-paginated page at a time.
     """
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated,CanAddProjectPermission]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         organization_id = self.request.query_params.get('organization_id')
         search_query = self.request.query_params.get('search', '')
 
-        # Base queryset with permissions and organization filter
-        queryset = get_objects_for_user(user, 'view_project', klass=Project).filter(organization_id=organization_id)
+        # Base queryset with the organization filter, restricted to the projects the user's role lets them view
+        context = get_request_context(self.request)
+        organization = context.get_organization(organization_id)
+        if organization is None:
+            return Project.objects.none()
+        membership = context.get_membership(organization)
+        queryset = Project.objects.filter(organization=organization)
+        queryset = filter_visible_projects(queryset, user, membership.role if membership else None)
+        # The paginator reads the ordering columns (but not the search rank annotation) off the last project
+        columns = {field.name for field in Project._meta.concrete_fields}
+        ordering_columns = [name.lstrip('-') for name in self.get_pagination_ordering() if name.lstrip('-') in columns]
+        queryset = load_project_fields(queryset, ProjectSerializer.get_requested_fields(self.request), ordering_columns)
 
-        # Apply search filter if a search query is provided
+        # Apply the full-text search filter if a search query is provided
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(assigned_to__username__icontains=search_query) | 
-                Q(assigned_to__email__icontains=search_query) |
-                Q(assigned_to__first_name__icontains=search_query) | 
-                Q(assigned_to__first_name__icontains=search_query) 
-            )
+            queryset = get_search_backend().search(queryset, search_query)
 
         return queryset
+
+    def get_pagination_ordering(self):
+        """
+        Order search results by relevance, and everything else newest first.
+        """
+        rank_annotation = get_search_backend().rank_annotation
+        if self.request.query_params.get('search') and rank_annotation:
+            return (f"-{rank_annotation}", '-id')
+        return self.pagination_class.ordering
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
         
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     View to retrieve, update, or delete a project.
+
+    GET responses carry an ETag; a matching If-None-Match gets a 304.
     """
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated,CanUpdateProjectPermission]
 
+    def get_object(self):
+        """
+        Get the project through the request context so the permission checks reuse it.
+        """
+        project = get_request_context(self.request).get_project(self.kwargs.get('pk'))
+        if project is None:
+            raise Http404("No Project matches the given query.")
+        self.check_object_permissions(self.request, project)
+        return project
+
+    def get_etag(self, project):
+        # Sparse and full representations of the same revision are different bodies
+        fields = ProjectSerializer.get_requested_fields(self.request)
+        return make_etag(
+            'project', project.pk, project.revision,
+            get_organization_permission_version(project.organization_id), self.request.user.pk,
+            '*' if fields is None else ','.join(sorted(fields)),
+        )
+
 class UpdateProjectStatus(generics.UpdateAPIView):
     """
     View to update the status of a project.
@@ -64,9 +154,24 @@ class UpdateProjectStatus(generics.UpdateAPIView):
         organization_id = self.request.data.get("organization")
         if not organization_id:
             raise serializers.ValidationError({"organization": "This field is required."})
-        return get_object_or_404(Project, id=project_id)
+        project = get_request_context(self.request).get_project(project_id)
+        if project is None:
+            raise Http404("No Project matches the given query.")
+        return project
     
 
+class ProjectCommentListView(generics.ListAPIView):
+    """
+    View to list the comments of a project, newest first, one cursor-paginated page at a time.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticated, CanViewProjectPermission]
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        return Comment.objects.filter(project_id=self.kwargs.get('project_id')).select_related('user')
+
+
 class AddCommentView(generics.CreateAPIView):
     """
     View to add a comment to a project.
@@ -76,4 +181,120 @@ class AddCommentView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, CanCommentOnProjectPermission]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+
+class ReassignProjectsView(generics.CreateAPIView):
+    """
+    View to move every project (or the given projects) of one assignee to another member in bulk.
+    Only admins of the organization can reassign projects.
+    """
+    serializer_class = ReassignProjectsSerializer
+    permission_classes = [permissions.IsAuthenticated, IsOrganizationAdmin]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = reassign_projects(
+            serializer.validated_data['organization'],
+            serializer.validated_data['from_user'],
+            serializer.validated_data['to_user'],
+            serializer.validated_data.get('projects'),
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class OrganizationProjectStatsView(APIView):
+    """
+    View to get an organization's project counts by status and by priority.
+    Reads the maintained counters, so the cost does not grow with the number of projects.
+    """
+    permission_classes = [permissions.IsAuthenticated, CanViewOrganizationPermission]
+
+    def get(self, request, *args, **kwargs):
+        organization = get_request_context(request).get_organization(self.kwargs.get('organization_id'))
+        return Response(get_project_stats(organization))
+
+
+class ProjectChangesView(APIView):
+    """
+    View to get the projects of an organization changed after a sync revision, and the deleted ones.
+
+    `?since=` is the `revision` of the previous response (0 for everything).
+    Reads go through the (organization, revision) indexes, so the cost grows
+    with the number of changes, not of projects (see projects.sync). When
+    `has_more` is true, ask again with the new revision.
+    """
+    permission_classes = [permissions.IsAuthenticated, CanViewOrganizationPermission]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            raise serializers.ValidationError({"since": "A revision number is required."})
+
+        context = get_request_context(request)
+        organization = context.get_organization(self.kwargs.get('organization_id'))
+        membership = context.get_membership(organization)
+        projects = filter_visible_projects(
+            Project.objects.filter(organization=organization), request.user, membership.role if membership else None
+        )
+        projects = load_project_fields(projects, ProjectSerializer.get_requested_fields(request))
+
+        changes = get_changes(organization, projects, since, KeysetCursorPagination().get_page_size(request))
+        changes['projects'] = ProjectSerializer(changes['projects'], many=True, context={'request': request}).data
+        return Response(changes)
+
+
+class ProjectImportView(APIView):
+    """
+    View to create many projects in an organization from a CSV or NDJSON request body.
+
+    The body is read as a stream and imported in batches (see projects.transfer),
+    all or nothing: if a row is invalid, the response lists the errors and no
+    project is created.
+    """
+    permission_classes = [permissions.IsAuthenticated, CanImportProjectsPermission]
+
+    def post(self, request, *args, **kwargs):
+        import_format = IMPORT_FORMATS.get(request.content_type.split(';')[0].strip().lower())
+        if import_format is None:
+            raise UnsupportedMediaType(request.content_type)
+
+        organization = get_request_context(request).get_organization(self.kwargs.get('organization_id'))
+        rows = read_rows(decode_lines(request.stream or []), import_format)
+        try:
+            summary = import_projects(organization, request.user, rows)
+        except UnicodeDecodeError:
+            raise ParseError("The request body must be UTF-8 encoded.")
+        except csv.Error as error:
+            raise ParseError(f"Malformed CSV: {error}")
+        return Response(summary, status=status.HTTP_400_BAD_REQUEST if summary['errors'] else status.HTTP_201_CREATED)
+
+
+class ProjectExportView(APIView):
+    """
+    View to download the projects of an organization the user can view, as CSV or NDJSON.
+    The rows are streamed from the database, so memory use does not grow with the export.
+    """
+    permission_classes = [permissions.IsAuthenticated, CanViewOrganizationPermission]
+
+    def get(self, request, *args, **kwargs):
+        export_format = self.kwargs.get('export_format')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise Http404("Exports are available as csv or ndjson.")
+
+        context = get_request_context(request)
+        organization = context.get_organization(self.kwargs.get('organization_id'))
+        membership = context.get_membership(organization)
+        queryset = filter_visible_projects(
+            Project.objects.filter(organization=organization), request.user, membership.role if membership else None
+        )
+
+        chunks = export_projects(queryset, export_format)
+        if settings.SERVER_INTERFACE == 'asgi':
+            response = FileResponse(spool_export(chunks), content_type=EXPORT_CONTENT_TYPES[export_format])
+        else:
+            response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="projects-{organization.pk}.{export_format}"'
+        return response
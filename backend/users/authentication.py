@@ -1,5 +1,123 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication as BaseTokenAuth
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_ALIAS = 'tokens'
+
+
+def get_token_cache_key(key):
+    # Hash the key so a shared cache backend never holds usable credentials
+    return f"auth_token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_token_expiry(token):
+    """
+    Get when a token expires, or None if tokens never expire (AUTH_TOKEN_TTL = 0).
+    """
+    if not settings.AUTH_TOKEN_TTL:
+        return None
+    return token.created + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+
+def is_token_expired(token):
+    expiry = get_token_expiry(token)
+    return expiry is not None and expiry <= timezone.now()
+
+
+def invalidate_cached_tokens(keys):
+    """
+    Drop the cached authentications of the given token keys.
+
+    The deletion is repeated once the surrounding transaction commits, so a
+    request reading the old rows before the commit cannot leave an entry behind.
+    """
+    cache_keys = [get_token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+
+    def drop():
+        caches[TOKEN_CACHE_ALIAS].delete_many(cache_keys)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def revoke_token(key):
+    """
+    Delete a token, logging its holder out everywhere it is used.
+    """
+    Token.objects.filter(key=key).delete()
+
+
+def rotate_token(user):
+    """
+    Replace the user's token with a new one; the old key stops working at once.
+    """
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def get_login_token(user):
+    """
+    Get the token handed out on login, replacing it if it has expired.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+    if is_token_expired(token):
+        token = rotate_token(user)
+    return token
+
 
 class TokenAuthentication(BaseTokenAuth):
+    """
+    Bearer token authentication that caches each token's user.
+
+    The cache entry, stored under a hash of the key, holds the user without
+    the password hash and the token's creation time; neither the key nor the
+    password is cached. A valid token is cached for the 'tokens' cache TIMEOUT
+    (capped at its remaining lifetime), so most requests authenticate without
+    a query. The users.signals receivers drop the entry when the token is
+    deleted or rotated and when its user is saved, e.g. deactivated.
+    """
     keyword = "Bearer"
-    
\ No newline at end of file
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        cache = caches[TOKEN_CACHE_ALIAS]
+        cache_key = get_token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user, created = cached
+            token = model(key=key, user=user, created=created)
+        else:
+            try:
+                # A deferred password is loaded from the database if something reads it
+                token = model.objects.select_related('user').defer('user__password').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if token.user.is_active and not is_token_expired(token):
+                # select_related() links the user back to the token; leave the key out of the entry
+                model._meta.get_field('user').remote_field.delete_cached_value(token.user)
+                cache.set(cache_key, (token.user, token.created), self.get_cache_timeout(cache, token))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if is_token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        return (token.user, token)
+
+    def get_cache_timeout(self, cache, token):
+        timeout = cache.default_timeout
+        expiry = get_token_expiry(token)
+        if expiry is None:
+            return timeout
+        remaining = max(1, int((expiry - timezone.now()).total_seconds()))
+        return remaining if timeout is None else min(timeout, remaining)
@@ -1,8 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Back the case-insensitive prefix search and ordering of the member picker
+            models.Index(Lower('username'), 'id', name='user_username_lower_idx'),
+            models.Index(Lower('email'), 'id', name='user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.email
\ No newline at end of file
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.utils import is_login_update
+from .authentication import invalidate_cached_tokens
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """
+    Stop accepting a deleted (or rotated) token straight away.
+    """
+    invalidate_cached_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def drop_user_tokens(sender, instance, created, **kwargs):
+    """
+    Drop the cached tokens of a user whose account changed, e.g. was deactivated.
+    """
+    if not created and not is_login_update(kwargs.get('update_fields')):
+        invalidate_cached_tokens(list(Token.objects.filter(user=instance).values_list('key', flat=True)))
@@ -1,3 +1,100 @@
-from django.test import TestCase
+import pickle
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .authentication import TOKEN_CACHE_ALIAS, TokenAuthentication, get_login_token, get_token_cache_key
+
+User = get_user_model()
+
+
+@override_settings(AUTH_TOKEN_TTL=3600)
+class TokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        caches[TOKEN_CACHE_ALIAS].clear()
+        self.addCleanup(caches[TOKEN_CACHE_ALIAS].clear)
+        self.user = User.objects.create_user(username='grace', email='grace@example.com', password='test-password')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/auth/login', {'username': 'grace', 'password': 'test-password'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['token']
+
+    def get_me(self, key):
+        return self.client.get('/auth/me/', HTTP_AUTHORIZATION=f"Bearer {key}")
+
+    def assertRejected(self, key, detail):
+        response = self.get_me(key)
+        # Session authentication comes first, so DRF answers 403 rather than 401
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'], detail)
+
+    def test_cached_token_authenticates_without_queries(self):
+        key = self.login()
+        TokenAuthentication().authenticate_credentials(key)
+        with self.assertNumQueries(0):
+            user, token = TokenAuthentication().authenticate_credentials(key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, key)
+
+    def test_cache_holds_neither_the_key_nor_the_password_hash(self):
+        key = self.login()
+        TokenAuthentication().authenticate_credentials(key)
+        entry = pickle.dumps(caches[TOKEN_CACHE_ALIAS].get(get_token_cache_key(key)))
+        self.assertNotIn(key.encode(), entry)
+        self.assertNotIn(self.user.password.encode(), entry)
+
+    def test_expired_token_is_rejected_and_replaced_on_login(self):
+        key = self.login()
+        Token.objects.filter(key=key).update(created=timezone.now() - timedelta(hours=2))
+        self.assertRejected(key, 'Token has expired.')
+
+        new_key = self.login()
+        self.assertNotEqual(new_key, key)
+        self.assertEqual(self.get_me(new_key).status_code, 200)
+
+    def test_cached_token_is_rejected_once_it_expires(self):
+        key = self.login()
+        TokenAuthentication().authenticate_credentials(key)
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch('users.authentication.timezone.now', return_value=later), self.assertNumQueries(0):
+            with self.assertRaisesMessage(AuthenticationFailed, 'Token has expired.'):
+                TokenAuthentication().authenticate_credentials(key)
+
+    def test_rotation_stops_the_old_token_at_once(self):
+        key = self.login()
+        self.assertEqual(self.get_me(key).status_code, 200)
+
+        response = self.client.post('/auth/token/rotate', HTTP_AUTHORIZATION=f"Bearer {key}")
+        self.assertEqual(response.status_code, 200)
+        self.assertRejected(key, 'Invalid token.')
+        self.assertEqual(self.get_me(response.data['token']).status_code, 200)
+
+    def test_logout_revokes_the_cached_token(self):
+        key = self.login()
+        self.assertEqual(self.get_me(key).status_code, 200)
+
+        self.assertEqual(self.client.post('/auth/logout', HTTP_AUTHORIZATION=f"Bearer {key}").status_code, 204)
+        self.assertRejected(key, 'Invalid token.')
+        self.assertFalse(Token.objects.filter(key=key).exists())
+
+    def test_deactivation_drops_the_cached_token(self):
+        key = self.login()
+        self.assertEqual(self.get_me(key).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertRejected(key, 'User inactive or deleted.')
+
+    def test_login_reuses_an_unexpired_token(self):
+        key = get_login_token(self.user).key
+        self.assertEqual(self.login(), key)
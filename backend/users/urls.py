@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import UserRegisterView,UserLoginView,UserDetailView
+from .views import UserRegisterView,UserLoginView,UserDetailView,RotateTokenView,LogoutView
 
 urlpatterns = [
     path("login",UserLoginView.as_view(),name="obtain_token"),
+    path("token/rotate",RotateTokenView.as_view(),name="rotate_token"),
+    path("logout",LogoutView.as_view(),name="logout"),
     path("register",UserRegisterView.as_view(),name="register"),
     path('me/', UserDetailView.as_view(), name='user-details'),
 ]
\ No newline at end of file
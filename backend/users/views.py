@@ -2,6 +2,9 @@ from rest_framework import generics, permissions
 from django.contrib.auth import get_user_model
 from .serializers import UserRegisterSerializer,UserDetailSerializer
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .authentication import get_login_token, get_token_expiry, revoke_token, rotate_token
 
 from core.mixin import RetrieveAuthenticatedUserMixin
 
@@ -15,6 +18,34 @@ class UserRegisterView(generics.CreateAPIView):
 class UserLoginView(ObtainAuthToken):
     permission_classes = [permissions.AllowAny]
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = get_login_token(serializer.validated_data['user'])
+        return Response({'token': token.key, 'expires_at': get_token_expiry(token)})
+
+
+class RotateTokenView(APIView):
+    """
+    Replace the current user's API token; the previous one stops working immediately.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        token = rotate_token(request.user)
+        return Response({'token': token.key, 'expires_at': get_token_expiry(token)})
+
+
+class LogoutView(APIView):
+    """
+    Revoke the token the request was made with.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        revoke_token(request.auth.key)
+        return Response(status=204)
+
 class UserDetailView(RetrieveAuthenticatedUserMixin, generics.RetrieveAPIView):
     serializer_class = UserDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
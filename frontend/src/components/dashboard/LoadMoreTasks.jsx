@@ -0,0 +1,24 @@
+import React from "react";
+import { useTaskContext } from "@/context/TaskContext";
+
+// The project list is cursor-paginated; offer the next page while there is one
+const LoadMoreTasks = () => {
+  const { hasMoreTasks, fetchMoreTasks, isLoadingMore } = useTaskContext();
+
+  if (!hasMoreTasks) return null;
+
+  return (
+    <div className="flex justify-center p-4">
+      <button
+        type="button"
+        onClick={fetchMoreTasks}
+        disabled={isLoadingMore}
+        className="text-sm text-black rounded-md px-4 py-2 bg-white border shadow-sm disabled:opacity-50"
+      >
+        {isLoadingMore ? "Loading..." : "Load more tasks"}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMoreTasks;
@@ -8,6 +8,7 @@ import in_progress_icon from "../../assets/in_progress.svg";
 import plus_icon from "../../assets/plus.svg";
 import { useTaskContext } from "@/context/TaskContext";
 import { useOrganizationContext } from "@/context/OrganizationContext";
+import LoadMoreTasks from "./LoadMoreTasks";
 
 const TaskBoard = ({ onTaskClick }) => {
   const { allTasks, isLoadingAll } = useTaskContext();
@@ -50,39 +51,42 @@ const TaskBoard = ({ onTaskClick }) => {
   }, {});
 
   return (
-    <div className="flex space-x-4 p-4 overflow-auto h-full justify-between">
-      {statuses.map((status) => (
-        <div
-          key={status}
-          className="flex-shrink-0 rounded-lg flex flex-col bg-white min-w-[17rem] md:min-w-[20rem]"
-          style={getGradientBackground(status)}
-        >
+    <div className="flex flex-col h-full">
+      <div className="flex space-x-4 p-4 overflow-auto flex-1 justify-between">
+        {statuses.map((status) => (
           <div
-            className="flex items-center justify-center mb-3 p-2 rounded-md text-center m-3 py-3"
-            style={getHeaderBackground(status)}
+            key={status}
+            className="flex-shrink-0 rounded-lg flex flex-col bg-white min-w-[17rem] md:min-w-[20rem]"
+            style={getGradientBackground(status)}
           >
-            <img
-              src={statusIcons[status]}
-              alt={`${statusLabels[status]} icon`}
-              className="mr-2"
-            />
-            <span className="md:text-lg font-bold">{statusLabels[status]}</span>
+            <div
+              className="flex items-center justify-center mb-3 p-2 rounded-md text-center m-3 py-3"
+              style={getHeaderBackground(status)}
+            >
+              <img
+                src={statusIcons[status]}
+                alt={`${statusLabels[status]} icon`}
+                className="mr-2"
+              />
+              <span className="md:text-lg font-bold">{statusLabels[status]}</span>
+            </div>
+            <button className="text-sm text-black items-center mb-4 rounded-md p-2 m-3 bg-white justify-center hidden md:flex">
+              <img src={plus_icon} className="mr-2" alt="" /> Add Task
+            </button>
+            <div className="flex-1 overflow-y-auto p-2">
+              {isLoadingMain ? (
+                <ProjectListLoad /> // Render loader while loading
+              ) : (
+                <ProjectList
+                  tasks={groupedTasks[status] || []}
+                  onTaskClick={onTaskClick}
+                /> // Render actual list after loading
+              )}
+            </div>
           </div>
-          <button className="text-sm text-black items-center mb-4 rounded-md p-2 m-3 bg-white justify-center hidden md:flex">
-            <img src={plus_icon} className="mr-2" alt="" /> Add Task
-          </button>
-          <div className="flex-1 overflow-y-auto p-2">
-            {isLoadingMain ? (
-              <ProjectListLoad /> // Render loader while loading
-            ) : (
-              <ProjectList
-                tasks={groupedTasks[status] || []}
-                onTaskClick={onTaskClick}
-              /> // Render actual list after loading
-            )}
-          </div>
-        </div>
-      ))}
+        ))}
+      </div>
+      {!isLoadingMain && <LoadMoreTasks />}
     </div>
   );
 };
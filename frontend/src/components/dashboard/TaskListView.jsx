@@ -7,6 +7,7 @@ import cancel_icon from "../../assets/cancelled.svg";
 import in_progress_icon from "../../assets/in_progress.svg";
 import { useTaskContext } from "@/context/TaskContext";
 import { useOrganizationContext } from "@/context/OrganizationContext";
+import LoadMoreTasks from "./LoadMoreTasks";
 
 // Statuses and Icons
 const statuses = ["abandoned", "in_progress", "canceled", "done"];
@@ -147,6 +148,7 @@ const TaskListView = ({ onTaskClick }) => {
           </div>
         </div>
       ))}
+      {!isLoadingMain && <LoadMoreTasks />}
     </div>
   );
 };
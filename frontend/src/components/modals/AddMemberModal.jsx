@@ -15,7 +15,14 @@ import { useOrganizationContext } from "@/context/OrganizationContext";
 import { toast } from "sonner";
 
 export function AddMemberModal({ open, setOpen }) {
-  const { usersNotInOrganization } = useUserContext();
+  const {
+    usersNotInOrganization,
+    searchUsersNotInOrganization,
+    fetchMoreUsersNotInOrganization,
+    hasMoreUsersNotInOrganization,
+    isLoadingNotInOrg,
+    isLoadingMoreNotInOrg,
+  } = useUserContext();
   const { addMembersToOrganization, isLoadingAddMember } = useUserContext();
 
   const [dropdownOpen, setDropdownOpen] = useState(false);
@@ -47,6 +54,8 @@ export function AddMemberModal({ open, setOpen }) {
 
   const onSuccess = () => {
     setSelectedMembers([]);
+    setInputValue("");
+    searchUsersNotInOrganization("");
     handleOpen();
   };
 
@@ -67,9 +76,10 @@ export function AddMemberModal({ open, setOpen }) {
     );
   };
 
-  // Change input value and filter dropdown
+  // Change input value and search the users on the server
   const handleInputChange = (e) => {
     setInputValue(e.target.value);
+    searchUsersNotInOrganization(e.target.value.trim());
     setDropdownOpen(true);
   };
 
@@ -82,6 +92,7 @@ export function AddMemberModal({ open, setOpen }) {
       const newMember = { name: inputValue, email: inputValue };
       setSelectedMembers([...selectedMembers, newMember]);
       setInputValue("");
+      searchUsersNotInOrganization("");
       setDropdownOpen(false);
     } else {
       toast.error("Please enter a valid email address.");
@@ -182,47 +193,57 @@ export function AddMemberModal({ open, setOpen }) {
                           </Typography>
                         </div>
                       )}
-                    {members
-                      .filter(
-                        (member) =>
-                          member.name
-                            .toLowerCase()
-                            .includes(inputValue.toLowerCase()) ||
-                          member.email
-                            .toLowerCase()
-                            .includes(inputValue.toLowerCase()),
-                      )
-                      .map((member) => (
+                    {/* The server filters the users by the typed text */}
+                    {members.map((member) => (
+                      <div
+                        key={member.email}
+                        className={`flex items-center px-3 py-2 cursor-pointer hover:bg-gray-100 ${
+                          selectedMembers.some(
+                            (m) => m.email === member.email,
+                          )
+                            ? "bg-gray-100"
+                            : ""
+                        }`}
+                        onClick={() => handleMemberSelect(member)}
+                      >
                         <div
-                          key={member.email}
-                          className={`flex items-center px-3 py-2 cursor-pointer hover:bg-gray-100 ${
-                            selectedMembers.some(
-                              (m) => m.email === member.email,
-                            )
-                              ? "bg-gray-100"
-                              : ""
-                          }`}
-                          onClick={() => handleMemberSelect(member)}
+                          className="h-8 w-8 flex items-center justify-center rounded-full mr-3 text-white font-bold"
+                          style={{ backgroundColor: getRandomColor() }}
                         >
-                          <div
-                            className="h-8 w-8 flex items-center justify-center rounded-full mr-3 text-white font-bold"
-                            style={{ backgroundColor: getRandomColor() }}
+                          {member.name.charAt(0).toUpperCase()}
+                        </div>
+                        <div>
+                          <Typography
+                            color="blue-gray"
+                            className="font-medium"
                           >
-                            {member.name.charAt(0).toUpperCase()}
-                          </div>
-                          <div>
-                            <Typography
-                              color="blue-gray"
-                              className="font-medium"
-                            >
-                              {member.name}
-                            </Typography>
-                            <Typography color="gray" className="text-sm">
-                              {member.email}
-                            </Typography>
-                          </div>
+                            {member.name}
+                          </Typography>
+                          <Typography color="gray" className="text-sm">
+                            {member.email}
+                          </Typography>
                         </div>
-                      ))}
+                      </div>
+                    ))}
+                    {isLoadingNotInOrg && members.length === 0 && (
+                      <div className="flex justify-center py-3">
+                        <Spinner className="h-5 w-5" />
+                      </div>
+                    )}
+                    {hasMoreUsersNotInOrganization && (
+                      <div
+                        className="flex items-center justify-center px-3 py-2 cursor-pointer hover:bg-gray-100"
+                        onClick={fetchMoreUsersNotInOrganization}
+                      >
+                        {isLoadingMoreNotInOrg ? (
+                          <Spinner className="h-5 w-5" />
+                        ) : (
+                          <Typography color="gray" className="text-sm">
+                            Load more users
+                          </Typography>
+                        )}
+                      </div>
+                    )}
                   </Card>
                 )}
               </div>
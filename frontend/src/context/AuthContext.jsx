@@ -7,6 +7,7 @@ import {
   handleLoginSuccess,
   handleLogout,
 } from "@/helpers/auth";
+import { createAxiosInstance } from "@/config/axios-config";
 
 const AuthContext = createContext();
 export const useAuthContext = () => useContext(AuthContext);
@@ -41,6 +42,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    // Revoke the token on the server as well, without waiting for it; the
+    // header is set here because the stored token is cleared right away
+    createAxiosInstance()
+      .post("/auth/logout", null, { headers: { Authorization: `Bearer ${token}` } })
+      .catch(() => {});
     handleLogout();
     setToken(null);
     navigate("/login");
@@ -17,8 +17,10 @@ export const useTask = () => {
   const debouncedSearchTerm = useDebounce(search, 1000);
   const [taskDetails, setTaskDetails] = useState({});
   const [allTasks, setAllTasks] = useState([]);
+  const [nextTasksPage, setNextTasksPage] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [isLoadingAll, setIsLoadingAll] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [isLoadingCreate, setIsLoadingCreate] = useState(false);
   const [isLoadingUpdate, setIsLoadingUpdate] = useState(false);
   const [isLoadingDelete, setIsLoadingDelete] = useState(false);
@@ -56,7 +58,8 @@ export const useTask = () => {
       const response = await baseAxios.get(
         `/project/?organization_id=${organizationDetails.id}&search=${search}`,
       );
-      setAllTasks(response.data);
+      setAllTasks(response.data.results);
+      setNextTasksPage(response.data.next);
     } catch (err) {
       toast.error(err.message);
     } finally {
@@ -64,6 +67,21 @@ export const useTask = () => {
     }
   }, [baseAxios, organizationDetails?.id,debouncedSearchTerm]);
 
+  // Fetch the next page of tasks and append it to the list
+  const fetchMoreTasks = useCallback(async () => {
+    if (!nextTasksPage || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await baseAxios.get(nextTasksPage);
+      setAllTasks((prevTasks) => [...prevTasks, ...response.data.results]);
+      setNextTasksPage(response.data.next);
+    } catch (err) {
+      toast.error(err.message);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  }, [baseAxios, nextTasksPage, isLoadingMore]);
+
   useEffect(()=>{
    fetchAllTasks()
   },[debouncedSearchTerm])
@@ -191,11 +209,14 @@ useEffect(() => {
     search,
     changeTaskStatus,
     fetchAllTasks,
+    fetchMoreTasks,
+    hasMoreTasks: Boolean(nextTasksPage),
     createTask,
     updateTask,
     deleteTask,
     isLoading,
     isLoadingAll,
+    isLoadingMore,
     isLoadingCreate,
     isLoadingUpdate,
     isLoadingDelete,
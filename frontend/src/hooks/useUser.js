@@ -1,11 +1,12 @@
 import { useNavigate } from "react-router-dom";
 import { createAxiosInstance } from "@/config/axios-config";
-import { useCallback, useState, useMemo, useEffect } from "react";
+import { useCallback, useState, useMemo, useEffect, useRef } from "react";
 import { toast } from "sonner";
 import { clearToken, handleLoginSuccess } from "@/helpers/auth";
 import { useOrganizationContext } from "@/context/OrganizationContext";
 import { useAuthContext } from "@/context/AuthContext";
 import { dashboard } from "@/constants/app.routes";
+import { useDebounce } from "./use-debounce";
 
 export const useUser = () => {
   const navigate = useNavigate();
@@ -24,8 +25,13 @@ export const useUser = () => {
   const [isLoadingLogin, setIsLoadingLogin] = useState(false);
   const [usersInOrganization, setUsersInOrganization] = useState([]);
   const [usersNotInOrganization, setUsersNotInOrganization] = useState([]);
+  const [nextNonMembersPage, setNextNonMembersPage] = useState(null);
+  const [nonMemberSearch, setNonMemberSearch] = useState("");
+  const debouncedNonMemberSearch = useDebounce(nonMemberSearch, 300);
+  const nonMembersRequest = useRef(0);
   const [isLoadingInOrg, setIsLoadingInOrg] = useState(false);
   const [isLoadingNotInOrg, setIsLoadingNotInOrg] = useState(false);
+  const [isLoadingMoreNotInOrg, setIsLoadingMoreNotInOrg] = useState(false);
   const [initLoading, setInitLoading] = useState(false);
   const [isLoadingAddMember, setIsLoadingAddMember] = useState(false);
 
@@ -92,21 +98,43 @@ export const useUser = () => {
     }
   }, [baseAxios, organizationDetails?.id]);
 
-  // Fetch all users not in a specific organization
+  // Fetch the first page of users not in the organization matching the search text
   const fetchUsersNotInOrganization = useCallback(async () => {
-    if (isLoadingNotInOrg || !organizationDetails?.id) return;
+    if (!organizationDetails?.id) return;
+    // Only the response to the latest search is kept
+    const request = ++nonMembersRequest.current;
     setIsLoadingNotInOrg(true);
     try {
       const response = await baseAxios.get(
-        `/organization/${organizationDetails.id}/non-members`,
+        `/organization/${organizationDetails.id}/non-members/`,
+        { params: { search: debouncedNonMemberSearch } },
       );
-      setUsersNotInOrganization(response.data);
+      if (request !== nonMembersRequest.current) return;
+      setUsersNotInOrganization(response.data.results);
+      setNextNonMembersPage(response.data.next);
     } catch (err) {
       toast.error(err.message);
     } finally {
-      setIsLoadingNotInOrg(false);
+      if (request === nonMembersRequest.current) setIsLoadingNotInOrg(false);
     }
-  }, [baseAxios, organizationDetails?.id]);
+  }, [baseAxios, organizationDetails?.id, debouncedNonMemberSearch]);
+
+  // Fetch the next page of users not in the organization and append it to the list
+  const fetchMoreUsersNotInOrganization = useCallback(async () => {
+    if (!nextNonMembersPage || isLoadingMoreNotInOrg) return;
+    const request = nonMembersRequest.current;
+    setIsLoadingMoreNotInOrg(true);
+    try {
+      const response = await baseAxios.get(nextNonMembersPage);
+      if (request !== nonMembersRequest.current) return;
+      setUsersNotInOrganization((prevUsers) => [...prevUsers, ...response.data.results]);
+      setNextNonMembersPage(response.data.next);
+    } catch (err) {
+      toast.error(err.message);
+    } finally {
+      setIsLoadingMoreNotInOrg(false);
+    }
+  }, [baseAxios, nextNonMembersPage, isLoadingMoreNotInOrg]);
 
   // Create a new user
   const createUser = useCallback(
@@ -221,7 +249,7 @@ export const useUser = () => {
     async (emailList, onSuccess) => {
       setIsLoadingAddMember(true);
       try {
-        await baseAxios.post(`/organization/add_member`, {
+        const response = await baseAxios.post(`/organization/add_member`, {
           emails: emailList,
           organization: organizationDetails.id,
         });
@@ -230,7 +258,8 @@ export const useUser = () => {
           fetchUsersInOrganization(),
           fetchUsersNotInOrganization(),
         ]);
-        toast.success("Members added successfully");
+        // The message tells how many were added, invited or already there
+        toast.success(response.data.message);
         if (onSuccess) onSuccess();
       } catch (err) {
         handleError(err);
@@ -238,12 +267,13 @@ export const useUser = () => {
         setIsLoadingAddMember(false);
       }
     },
-    [baseAxios, organizationDetails?.id],
+    [baseAxios, organizationDetails?.id, fetchUsersInOrganization, fetchUsersNotInOrganization],
   );
   const init = useCallback(async () => {
    if (initLoading || !organizationDetails?.id || !token) {
        setUsersInOrganization([]);
        setUsersNotInOrganization([]);
+       setNextNonMembersPage(null);
        return;  // Early return if initial conditions are not met
    }
 
@@ -255,7 +285,6 @@ export const useUser = () => {
            fetchUserDetails(),
 
            fetchUsersInOrganization(),
-           fetchUsersNotInOrganization(),
        ]);
    } catch (err) {
        toast.error("Failed to initialize data");
@@ -266,7 +295,6 @@ export const useUser = () => {
    fetchUserDetails,
    fetchAllUsers,
    fetchUsersInOrganization,
-   fetchUsersNotInOrganization,
    organizationDetails?.id,
    token,
 ]);
@@ -279,6 +307,11 @@ export const useUser = () => {
     init();
   }, [init, organizationDetails.id,token]);
 
+  // Load the non-members again when the organization or the search text changes
+  useEffect(() => {
+    token && fetchUsersNotInOrganization();
+  }, [fetchUsersNotInOrganization, token]);
+
   return {
     fetchUserDetails,
     fetchAllUsers,
@@ -288,6 +321,8 @@ export const useUser = () => {
     signUpUser,
     loginUser,
     fetchUsersNotInOrganization,
+    fetchMoreUsersNotInOrganization,
+    searchUsersNotInOrganization: setNonMemberSearch,
     fetchUsersInOrganization,
     addMembersToOrganization,
     init,
@@ -297,6 +332,7 @@ export const useUser = () => {
     isLoadingAddMember,
     usersInOrganization,
     usersNotInOrganization,
+    hasMoreUsersNotInOrganization: Boolean(nextNonMembersPage),
     isLoading,
     isLoadingAll,
     isLoadingCreate,
@@ -305,6 +341,7 @@ export const useUser = () => {
     isLoadingSignUp,
     isLoadingLogin,
     isLoadingNotInOrg,
+    isLoadingMoreNotInOrg,
     isLoadingInOrg,
     initLoading,
   };